@@ -0,0 +1,104 @@
+# backend/bench.py
+#
+# BatchRepEngine throughput on synthetic sessions, vs one
+# update_multi_rep_state per session (numpy only, no camera or model).
+#   python bench.py --sessions 2000 --check
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# rep_engine, the reference tracker and the traces need the client's
+# numpy-only rep_logic and synthetic modules (see rep_engine's docstring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "client"))
+
+from rep_engine import BatchRepEngine
+from rep_logic import FEATURE_DEFAULTS, MultiRepState, update_multi_rep_state
+from synthetic import TRACE_PROFILES, synthetic_features
+
+
+def _session_traces(n_sessions, n_frames, seed=0):
+    """Per-session feature streams cut from one synthetic trace per exercise, phase-shifted."""
+    exercises = sorted(TRACE_PROFILES)
+    traces = {}
+    for k, exercise in enumerate(exercises):
+        ts, arrays = synthetic_features(exercise, seed=seed + k)
+        conf = np.random.default_rng(seed + k).uniform(0.5, 1.0, len(ts))
+        traces[exercise] = (ts, arrays, conf)
+
+    sessions = []
+    rng = np.random.default_rng(seed)
+    for s in range(n_sessions):
+        exercise = exercises[s % len(exercises)]
+        ts, arrays, conf = traces[exercise]
+        offset = int(rng.integers(0, len(ts) - n_frames))
+        sessions.append((exercise, offset))
+    return exercises, traces, sessions
+
+
+def run_benchmark(n_sessions=2000, n_frames=300, check=False):
+    exercises, traces, sessions = _session_traces(n_sessions, n_frames)
+    keys = list(FEATURE_DEFAULTS)
+
+    # (n_frames, n_sessions) feature matrices, as a server would collect per tick
+    per_tick = {key: np.empty((n_frames, n_sessions)) for key in keys}
+    conf = np.empty((n_frames, n_sessions))
+    stamps = np.empty((n_frames, n_sessions))
+    for s, (exercise, offset) in enumerate(sessions):
+        ts, arrays, c = traces[exercise]
+        window = slice(offset, offset + n_frames)
+        for key in keys:
+            per_tick[key][:, s] = arrays[key][window]
+        conf[:, s] = c[window]
+        stamps[:, s] = ts[window] + 1000.0 * s    # every session on its own clock
+
+    engine = BatchRepEngine()
+    for exercise, _ in sessions:
+        engine.add_session(exercise)
+    engine_reps = []
+    start = time.perf_counter()
+    for f in range(n_frames):
+        engine_reps += engine.tick({key: per_tick[key][f] for key in keys}, conf[f], stamps[f])
+    engine_s = time.perf_counter() - start
+    total = n_sessions * n_frames
+    print(f"[engine] {n_sessions} sessions x {n_frames} ticks: {engine_s:.2f}s → "
+          f"{total / engine_s:,.0f} session-frames/s, {len(engine_reps)} reps")
+
+    # Reference: one MultiRepState per session, per-frame Python calls
+    states = [MultiRepState() for _ in sessions]
+    frame_dicts = [[dict(zip(keys, values)) for values in zip(*(per_tick[k][f].tolist() for k in keys))]
+                   for f in range(n_frames)]
+    conf_lists = conf.tolist()
+    stamp_lists = stamps.tolist()
+    ref_reps = []
+    start = time.perf_counter()
+    for f in range(n_frames):
+        frames, cs, tss = frame_dicts[f], conf_lists[f], stamp_lists[f]
+        for s, (exercise, _) in enumerate(sessions):
+            for rep in update_multi_rep_state(states[s], frames[s], cs[s], exercise, timestamp=tss[s]):
+                rep["session_id"] = s
+                ref_reps.append(rep)
+    ref_s = time.perf_counter() - start
+    print(f"[engine] reference update_multi_rep_state: {ref_s:.2f}s → "
+          f"{total / ref_s:,.0f} session-frames/s ({ref_s / engine_s:.1f}x slower)")
+
+    if check:
+        by_session = lambda reps: sorted(reps, key=lambda r: (r["session_id"], r["rep_id"], r["limb_id"]))
+        same = by_session(engine_reps) == by_session(ref_reps)
+        print(f"[engine] summaries identical to reference: {same}")
+        return same
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the batched rep engine.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--frames", type=int, default=300, help="ticks per session")
+    parser.add_argument("--check", action="store_true",
+                        help="verify summaries against update_multi_rep_state")
+    args = parser.parse_args()
+    ok = run_benchmark(args.sessions, args.frames, args.check)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,334 @@
+# backend/rep_engine.py
+
+"""
+Server-side rep counting for many sessions at once (thin clients send
+per-frame features, the backend counts reps).
+
+BatchRepEngine keeps every session's limb states in NumPy arrays, one row per
+(session, limb). tick() takes one frame for any subset of sessions and
+advances all of their EXTENDED/FLEXED state machines, running aggregates and
+jerk rings in a single vectorized pass; only completed reps go through Python.
+
+rep_logic.update_multi_rep_state is the reference: for every session the
+engine emits the same rep summaries, bit for bit.
+
+Dependency: rep_logic is the client's own numpy-only module
+(client/rep_logic.py), shared rather than copied. This module imports it by
+name and leaves the import path alone; whoever runs the engine puts client/
+on it (PYTHONPATH, or the entry point as bench.py and tests/conftest.py do).
+Throughput and the reference check: python bench.py --sessions 2000 --check
+"""
+
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+from rep_logic import (
+    EXTENDED,
+    FLEXED,
+    JERK_LAG,
+    FEATURE_DEFAULTS,
+    compile_tracker,
+    movement_smoothness,
+)
+
+_JERK_SPAN = 3 * JERK_LAG + 1
+
+# ExerciseTracker limb sides
+_GLOBAL, _LEFT, _RIGHT = 0, 1, 2
+
+# Joint compared between sides when use_limb_delta is set
+_GATE_JOINTS = {"knee": 0, "elbow": 1, "hip": 2}
+
+
+class BatchRepEngine:
+    """
+    Struct-of-arrays rep engine.
+
+    add_session(exercise) → session id (a slot index into the tick arrays).
+    tick(features, confidence, timestamps, active) → completed reps, each a
+    rep summary dict plus "session_id".
+    close_session(session_id) → the slot stops ticking and is reused by a
+    later add_session with the same number of limbs.
+    """
+
+    # Per-row arrays and their fill values (grown together)
+    _ROW_FIELDS = {
+        # static (from the compiled tracker)
+        "session": (np.intp, -1),
+        "side": (np.int8, _GLOBAL),
+        "knee_joint": (np.bool_, True),
+        "flexed_threshold": (np.float64, 0.0),
+        "extended_threshold": (np.float64, 0.0),
+        "min_rep_duration": (np.float64, 0.0),
+        "use_limb_delta": (np.bool_, False),
+        "limb_activation_delta": (np.float64, 0.0),
+        "gate_joint": (np.int8, 0),
+        # state machine
+        "state": (np.int8, EXTENDED),
+        "rep_id": (np.int64, 0),
+        "rep_start_time": (np.float64, 0.0),
+        "last_rep_end_time": (np.float64, 0.0),
+        "has_last_rep": (np.bool_, False),
+        # running aggregates of the current rep
+        "hip_min": (np.float64, np.inf),
+        "hip_max": (np.float64, -np.inf),
+        "knee_min": (np.float64, np.inf),
+        "elbow_min": (np.float64, np.inf),
+        "torso_max": (np.float64, -np.inf),
+        "conf_sum": (np.float64, 0.0),
+        "frames": (np.int64, 0),
+        "flex_min": (np.float64, np.inf),
+        "flex_max": (np.float64, -np.inf),
+        "asym_sum": (np.float64, 0.0),
+        "jerk_sq": (np.float64, 0.0),
+        # jerk ring position
+        "ring_head": (np.intp, 0),
+        "ring_count": (np.intp, 0),
+    }
+
+    def __init__(self, capacity: int = 256):
+        self.n_rows = 0
+        self.n_sessions = 0
+        self._row_capacity = 0
+        self.limb_ids: List[str] = []                 # per row
+        self.exercise_hints: List[Optional[str]] = []  # per session
+        self.session_rows: List[List[int]] = []        # per session, in limb order
+        self.session_open: List[bool] = []
+        self._free_sessions: Dict[int, List[int]] = {}  # n_limbs → closed session ids
+        self._grow(capacity)
+
+    # ----------------- sessions -----------------
+
+    def _grow(self, capacity):
+        for name, (dtype, fill) in self._ROW_FIELDS.items():
+            new = np.full(capacity, fill, dtype=dtype)
+            if self._row_capacity:
+                new[:self.n_rows] = getattr(self, name)[:self.n_rows]
+            setattr(self, name, new)
+        x_ring = np.zeros((capacity, _JERK_SPAN))
+        t_ring = np.zeros((capacity, _JERK_SPAN))
+        if self._row_capacity:
+            x_ring[:self.n_rows] = self.x_ring[:self.n_rows]
+            t_ring[:self.n_rows] = self.t_ring[:self.n_rows]
+        self.x_ring, self.t_ring = x_ring, t_ring
+        self._row_capacity = capacity
+
+    def add_session(self, exercise_hint: Optional[str] = None,
+                    cfg: Optional[Dict[str, Any]] = None) -> int:
+        """New session with fresh limb states; returns its id (its index in tick arrays)."""
+        tracker = compile_tracker(exercise_hint, cfg)
+        free = self._free_sessions.get(len(tracker.limbs))
+        if free:
+            session_id = free.pop()
+            rows = self.session_rows[session_id]
+            self.exercise_hints[session_id] = exercise_hint
+            self.session_open[session_id] = True
+            for name, (_, fill) in self._ROW_FIELDS.items():
+                getattr(self, name)[rows] = fill
+            self.x_ring[rows] = 0.0
+            self.t_ring[rows] = 0.0
+        else:
+            session_id = self.n_sessions
+            self.n_sessions += 1
+            self.exercise_hints.append(exercise_hint)
+            self.session_open.append(True)
+            rows = []
+            for _ in tracker.limbs:
+                if self.n_rows == self._row_capacity:
+                    self._grow(2 * self._row_capacity)
+                rows.append(self.n_rows)
+                self.limb_ids.append("")
+                self.n_rows += 1
+            self.session_rows.append(rows)
+
+        gate_joint = _GATE_JOINTS[tracker.gate_joint]
+        for r, (limb_id, side, _, _) in zip(rows, tracker.limbs):
+            self.session[r] = session_id
+            self.side[r] = side
+            self.knee_joint[r] = tracker.joint == "knee"
+            self.flexed_threshold[r] = tracker.flexed_threshold
+            self.extended_threshold[r] = tracker.extended_threshold
+            self.min_rep_duration[r] = tracker.min_rep_duration
+            self.use_limb_delta[r] = tracker.use_limb_delta
+            self.limb_activation_delta[r] = tracker.limb_activation_delta
+            self.gate_joint[r] = gate_joint
+            self.limb_ids[r] = limb_id
+        return session_id
+
+    def close_session(self, session_id: int):
+        """Stop ticking this session; its rows are recycled by a later add_session."""
+        if not self.session_open[session_id]:
+            return
+        self.session_open[session_id] = False
+        rows = self.session_rows[session_id]
+        self.session[rows] = -1
+        self._free_sessions.setdefault(len(rows), []).append(session_id)
+
+    # ----------------- per-frame -----------------
+
+    def tick(
+        self,
+        features: Dict[str, np.ndarray],
+        confidence: np.ndarray,
+        timestamps: np.ndarray,
+        active: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        One frame for every session with active[session_id] set (all if None).
+        features: {key: (n_sessions,) array} with FEATURE_DEFAULTS keys;
+        confidence, timestamps: (n_sessions,). Rows of inactive (or closed)
+        sessions are left untouched, exactly like not calling
+        update_multi_rep_state.
+        """
+        n = self.n_rows
+        sess = self.session[:n]
+        open_rows = sess >= 0
+        if active is not None:
+            open_rows &= np.asarray(active)[np.maximum(sess, 0)]
+        rows = np.flatnonzero(open_rows)
+        if len(rows) == 0:
+            return []
+        sess = sess[rows]
+
+        def col(key):
+            values = features.get(key)
+            if values is None:
+                return np.full(len(rows), FEATURE_DEFAULTS[key])
+            return np.asarray(values, dtype=np.float64)[sess]
+
+        knee = self.knee_joint[rows]
+        left_angle = np.where(knee, col("left_knee_angle_frame"), col("left_elbow_angle_frame"))
+        right_angle = np.where(knee, col("right_knee_angle_frame"), col("right_elbow_angle_frame"))
+        asymmetry = np.abs(left_angle - right_angle)
+        left_flex = 180.0 - left_angle
+        right_flex = 180.0 - right_angle
+
+        side = self.side[rows]
+        is_left, is_right = side == _LEFT, side == _RIGHT
+        drive = np.where(is_left, left_flex,
+                         np.where(is_right, right_flex,
+                                  np.where(right_flex > left_flex, right_flex, left_flex)))
+
+        # Alternating-limb gating on each row's gate joint
+        gate_joint = self.gate_joint[rows]
+        left_gate = 180.0 - np.choose(gate_joint, (col("left_knee_angle_frame"),
+                                                   col("left_elbow_angle_frame"),
+                                                   col("left_hip_angle_frame")))
+        right_gate = 180.0 - np.choose(gate_joint, (col("right_knee_angle_frame"),
+                                                    col("right_elbow_angle_frame"),
+                                                    col("right_hip_angle_frame")))
+        own_gate = np.where(is_left, left_gate, right_gate)
+        other_gate = np.where(is_left, right_gate, left_gate)
+        gated = (self.use_limb_delta[rows] & (side != _GLOBAL)
+                 & (own_gate < other_gate + self.limb_activation_delta[rows]))
+        flex = np.where(gated, 0.0, drive)
+
+        now = np.asarray(timestamps, dtype=np.float64)[sess]
+        jerk_sq = self._push_jerk(rows, drive, now)
+
+        # ---------- state machine ----------
+        state = self.state[rows]
+        extended = state == EXTENDED
+        cooling = (extended & self.has_last_rep[rows]
+                   & (now - self.last_rep_end_time[rows] < self.min_rep_duration[rows]))
+        starting = extended & ~cooling & (flex > self.flexed_threshold[rows])
+        flexed = ~extended
+
+        hip = col("center_hip_y")
+        # side rows aggregate their own knee / elbow, global rows the more bent one
+        knee_min = np.where(is_left, col("left_knee_angle_frame"),
+                            np.where(is_right, col("right_knee_angle_frame"),
+                                     col("knee_min_angle_frame")))
+        elbow_min = np.where(is_left, col("left_elbow_angle_frame"),
+                             np.where(is_right, col("right_elbow_angle_frame"),
+                                      col("elbow_min_angle_frame")))
+        torso = col("torso_dev_frame")
+        conf = np.asarray(confidence, dtype=np.float64)[sess]
+
+        if starting.any():
+            r, i = rows[starting], starting
+            self.state[r] = FLEXED
+            self.rep_start_time[r] = now[i]
+            self.hip_min[r] = hip[i]
+            self.hip_max[r] = hip[i]
+            self.knee_min[r] = knee_min[i]
+            self.elbow_min[r] = elbow_min[i]
+            self.torso_max[r] = torso[i]
+            self.conf_sum[r] = conf[i]
+            self.frames[r] = 1
+            self.flex_min[r] = drive[i]
+            self.flex_max[r] = drive[i]
+            self.asym_sum[r] = asymmetry[i]
+            self.jerk_sq[r] = jerk_sq[i]
+
+        completed: List[Dict[str, Any]] = []
+        if flexed.any():
+            r, i = rows[flexed], flexed
+            # same comparisons as RunningStats.add: keep the old value unless strictly beyond
+            self.hip_min[r] = np.where(hip[i] < self.hip_min[r], hip[i], self.hip_min[r])
+            self.hip_max[r] = np.where(hip[i] > self.hip_max[r], hip[i], self.hip_max[r])
+            self.knee_min[r] = np.where(knee_min[i] < self.knee_min[r], knee_min[i], self.knee_min[r])
+            self.elbow_min[r] = np.where(elbow_min[i] < self.elbow_min[r], elbow_min[i], self.elbow_min[r])
+            self.torso_max[r] = np.where(torso[i] > self.torso_max[r], torso[i], self.torso_max[r])
+            self.conf_sum[r] += conf[i]
+            self.frames[r] += 1
+            self.flex_min[r] = np.where(drive[i] < self.flex_min[r], drive[i], self.flex_min[r])
+            self.flex_max[r] = np.where(drive[i] > self.flex_max[r], drive[i], self.flex_max[r])
+            self.asym_sum[r] += asymmetry[i]
+            self.jerk_sq[r] += jerk_sq[i]
+
+            ending = flexed & (flex < self.extended_threshold[rows])
+            if ending.any():
+                completed = self._end_reps(rows[ending], now[ending])
+        return completed
+
+    def _push_jerk(self, rows, x, t):
+        """JerkMeter.push for every row at once; returns jerk² · dt (0.0 while the ring fills)."""
+        head = self.ring_head[rows]
+        self.x_ring[rows, head] = x
+        self.t_ring[rows, head] = t
+        self.ring_head[rows] = (head + 1) % _JERK_SPAN
+        count = np.minimum(self.ring_count[rows] + 1, _JERK_SPAN)
+        self.ring_count[rows] = count
+
+        x1 = self.x_ring[rows, (head - JERK_LAG) % _JERK_SPAN]
+        x2 = self.x_ring[rows, (head - 2 * JERK_LAG) % _JERK_SPAN]
+        x3 = self.x_ring[rows, (head - 3 * JERK_LAG) % _JERK_SPAN]
+        h = (t - self.t_ring[rows, (head - 3 * JERK_LAG) % _JERK_SPAN]) / (3 * JERK_LAG)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = JERK_LAG * h
+            jerk = (x - 3.0 * x1 + 3.0 * x2 - x3) / (step * step * step)
+            return np.where((count == _JERK_SPAN) & (h > 0.0), jerk * jerk * h, 0.0)
+
+    def _end_reps(self, rows, now):
+        """FLEXED → EXTENDED for these rows; summaries for the ones long enough to count."""
+        duration = now - self.rep_start_time[rows]
+        valid = duration >= self.min_rep_duration[rows]
+
+        self.state[rows] = EXTENDED
+        self.last_rep_end_time[rows] = now
+        self.has_last_rep[rows] = True
+        self.rep_id[rows[valid]] += 1
+
+        completed = []
+        for r, d in zip(rows[valid].tolist(), duration[valid].tolist()):
+            frames = int(self.frames[r])
+            session_id = int(self.session[r])
+            completed.append({
+                "rep_id": int(self.rep_id[r]),
+                "limb_id": self.limb_ids[r],
+                "duration_s": d,
+                "hip_vertical_range": float(self.hip_max[r] - self.hip_min[r]),
+                "knee_min_angle": float(self.knee_min[r]),
+                "elbow_min_angle": float(self.elbow_min[r]),
+                "torso_max_lean_deg": float(self.torso_max[r]),
+                "left_right_asymmetry": float(self.asym_sum[r]) / frames,
+                "movement_smoothness": movement_smoothness(
+                    float(self.jerk_sq[r]), d, float(self.flex_max[r] - self.flex_min[r])
+                ),
+                "avg_confidence": float(self.conf_sum[r]) / frames,
+                "exercise_hint": self.exercise_hints[session_id],
+                "session_id": session_id,
+            })
+        return completed
@@ -0,0 +1,13 @@
+# backend/tests/conftest.py
+#
+# Backend modules import each other by bare name (run from backend/), so
+# put backend/ on the path for the tests. rep_engine and the tests also use
+# the client's numpy-only rep_logic and synthetic modules: client/ goes after
+# backend/, so backend modules win any name clash.
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(1, os.path.join(os.path.dirname(BACKEND_DIR), "client"))
@@ -0,0 +1,137 @@
+# backend/tests/test_rep_engine.py
+
+"""BatchRepEngine against one update_multi_rep_state per session (the reference)."""
+
+import math
+
+import numpy as np
+import pytest
+
+from rep_engine import BatchRepEngine
+from rep_logic import EXERCISE_CONFIG, FEATURE_DEFAULTS, MultiRepState, compile_tracker
+from synthetic import TRACE_PROFILES, synthetic_features
+
+N_TICKS = 400
+
+
+def _session_inputs(n_sessions, seed=0, nan_dropouts=False):
+    """(exercise, timestamps, features, confidence) per session, N_TICKS frames each."""
+    rng = np.random.default_rng(seed)
+    exercises = sorted(TRACE_PROFILES)
+    sessions = []
+    for s in range(n_sessions):
+        exercise = exercises[s % len(exercises)]
+        ts, arrays = synthetic_features(exercise, n_reps=30, seed=seed + s)
+        offset = int(rng.integers(0, len(ts) - N_TICKS))
+        window = slice(offset, offset + N_TICKS)
+        arrays = {key: values[window].copy() for key, values in arrays.items()}
+        if nan_dropouts:
+            for _ in range(4):
+                start = rng.integers(N_TICKS)
+                arrays[rng.choice(sorted(arrays))][start:start + rng.integers(1, 30)] = np.nan
+        sessions.append((exercise, ts[window] + 1000.0 * s, arrays, rng.uniform(0.5, 1.0, N_TICKS)))
+    return sessions
+
+
+def _run(sessions, active, cfgs=None):
+    """(engine reps, reference reps), each sorted by session then rep."""
+    cfgs = cfgs or {}
+    engine = BatchRepEngine()
+    trackers = []
+    for s, (exercise, *_rest) in enumerate(sessions):
+        assert engine.add_session(exercise, cfgs.get(s)) == s
+        trackers.append(compile_tracker(exercise, cfgs.get(s)))
+    states = [MultiRepState() for _ in sessions]
+
+    engine_reps, ref_reps = [], []
+    for f in range(N_TICKS):
+        features = {key: np.array([arrays[key][f] for _, _, arrays, _ in sessions])
+                    for key in FEATURE_DEFAULTS}
+        confidence = np.array([conf[f] for *_rest, conf in sessions])
+        stamps = np.array([ts[f] for _, ts, _, _ in sessions])
+        engine_reps += engine.tick(features, confidence, stamps, active[f])
+
+        for s, (_, ts, arrays, conf) in enumerate(sessions):
+            if active[f][s]:
+                frame = {key: float(arrays[key][f]) for key in FEATURE_DEFAULTS}
+                for rep in trackers[s].update(states[s], frame, float(conf[f]), float(ts[f])):
+                    rep["session_id"] = s
+                    ref_reps.append(rep)
+
+    order = lambda reps: sorted(reps, key=lambda r: (r["session_id"], r["rep_id"], r["limb_id"]))
+    return order(engine_reps), order(ref_reps)
+
+
+def _assert_same_reps(got, expected):
+    assert len(got) == len(expected)
+    for a, b in zip(got, expected):
+        assert a.keys() == b.keys()
+        for key, value in a.items():
+            if isinstance(value, float) and math.isnan(value):
+                assert math.isnan(b[key]), (a, b)
+            else:
+                assert value == b[key], (a, b)
+
+
+@pytest.mark.parametrize("nan_dropouts", [False, True])
+def test_engine_matches_reference(nan_dropouts):
+    sessions = _session_inputs(10, nan_dropouts=nan_dropouts)
+    # sessions join at different ticks and miss the odd frame
+    rng = np.random.default_rng(1)
+    joined = rng.integers(0, N_TICKS // 4, len(sessions))
+    active = (np.arange(N_TICKS)[:, None] >= joined) & (rng.random((N_TICKS, len(sessions))) > 0.05)
+
+    got, expected = _run(sessions, active)
+    assert len(expected) > 30
+    _assert_same_reps(got, expected)
+
+
+def test_engine_explicit_cfg_matches_reference():
+    sessions = _session_inputs(5, seed=3)
+    cfgs = {}
+    for s, (exercise, *_rest) in enumerate(sessions):
+        base = EXERCISE_CONFIG[exercise]
+        cfgs[s] = dict(base, flexed_threshold=0.6 * base["flexed_threshold"],
+                       extended_threshold=0.5 * base["extended_threshold"])
+    got, expected = _run(sessions, np.ones((N_TICKS, len(sessions)), dtype=bool), cfgs)
+    assert expected
+    _assert_same_reps(got, expected)
+
+
+def test_engine_follows_the_tracker_joints():
+    # elbow-driven per-side limbs gated on the hips; a lunge gated on its knees
+    sessions = _session_inputs(5, seed=4)
+    cfgs = {}
+    for s, (exercise, *_rest) in enumerate(sessions):
+        if exercise == "bicep_curl":
+            cfgs[s] = dict(EXERCISE_CONFIG[exercise], limbs=["left", "right"], use_limb_delta=True,
+                           limb_activation_delta=0.0, gate_joint="hip")
+        elif exercise == "lunge":
+            cfgs[s] = dict(EXERCISE_CONFIG[exercise], gate_joint=None, limb_activation_delta=5.0)
+    assert len(cfgs) == 2
+    got, expected = _run(sessions, np.ones((N_TICKS, len(sessions)), dtype=bool), cfgs)
+    assert {rep["limb_id"] for rep in expected if rep["exercise_hint"] == "bicep_curl"} == {"left", "right"}
+    _assert_same_reps(got, expected)
+
+
+def test_closed_session_rows_start_fresh():
+    (exercise, ts, arrays, conf), = _session_inputs(1)
+    engine = BatchRepEngine()
+    first = engine.add_session(exercise)
+    half = N_TICKS // 2
+    for f in range(half):
+        engine.tick({key: arrays[key][f:f + 1] for key in arrays}, conf[f:f + 1], ts[f:f + 1])
+    engine.close_session(first)
+    assert engine.add_session(exercise) == first     # rows recycled
+
+    got = []
+    for f in range(N_TICKS):
+        got += engine.tick({key: arrays[key][f:f + 1] for key in arrays}, conf[f:f + 1], ts[f:f + 1])
+    tracker, state, expected = compile_tracker(exercise), MultiRepState(), []
+    for f in range(N_TICKS):
+        frame = {key: float(arrays[key][f]) for key in arrays}
+        for rep in tracker.update(state, frame, float(conf[f]), float(ts[f])):
+            rep["session_id"] = first
+            expected.append(rep)
+    assert expected
+    _assert_same_reps(got, expected)
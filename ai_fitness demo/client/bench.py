@@ -0,0 +1,718 @@
+# client/bench.py
+#
+# Micro-benchmarks for the client pipeline. No camera or window needed.
+#   python bench.py angles
+
+import math
+import os
+import sys
+import time
+import tracemalloc
+import multiprocessing
+import cv2
+import numpy as np
+
+from pose_utils import PoseEstimator, FEATURE_LANDMARKS, angle_between, compute_features
+from frame_scheduler import AdaptivePoseScheduler
+from frame_pool import FramePool
+from stage_timer import StageTimer, NULL_TIMER
+from synthetic import TRACE_PROFILES, synthetic_trace, _pose_from_angles
+
+
+def _fake_landmarks(n_frames, w=1280, h=720, seed=0):
+    """Random (n_frames, 33, 2) landmark pixel coords."""
+    rng = np.random.default_rng(seed)
+    pts = rng.random((n_frames, 33, 2))
+    pts[..., 0] *= w
+    pts[..., 1] *= h
+    return pts
+
+
+def _legacy_features(points):
+    """Old per-joint path: five scalar angle_between calls on Python tuples."""
+    def pt(idx):
+        return (points[idx, 0], points[idx, 1])
+
+    left_hip, right_hip = pt(23), pt(24)
+    left_knee, right_knee = pt(25), pt(26)
+    left_ankle, right_ankle = pt(27), pt(28)
+    left_shoulder, right_shoulder = pt(11), pt(12)
+    left_elbow, right_elbow = pt(13), pt(14)
+    left_wrist, right_wrist = pt(15), pt(16)
+
+    left_knee_angle = angle_between(left_hip, left_knee, left_ankle)
+    right_knee_angle = angle_between(right_hip, right_knee, right_ankle)
+    left_elbow_angle = angle_between(left_shoulder, left_elbow, left_wrist)
+    right_elbow_angle = angle_between(right_shoulder, right_elbow, right_wrist)
+
+    mid_shoulder = ((left_shoulder[0] + right_shoulder[0]) / 2,
+                    (left_shoulder[1] + right_shoulder[1]) / 2)
+    mid_hip = ((left_hip[0] + right_hip[0]) / 2,
+               (left_hip[1] + right_hip[1]) / 2)
+    mid_ankle = ((left_ankle[0] + right_ankle[0]) / 2,
+                 (left_ankle[1] + right_ankle[1]) / 2)
+    torso_angle = angle_between(mid_shoulder, mid_hip, mid_ankle)
+
+    return {
+        "knee_min_angle_frame": min(left_knee_angle, right_knee_angle),
+        "elbow_min_angle_frame": min(left_elbow_angle, right_elbow_angle),
+        "torso_dev_frame": 180 - torso_angle,
+        "center_hip_y": mid_hip[1],
+        "left_knee_angle_frame": left_knee_angle,
+        "right_knee_angle_frame": right_knee_angle,
+        "left_elbow_angle_frame": left_elbow_angle,
+        "right_elbow_angle_frame": right_elbow_angle,
+    }
+
+
+def _fps(fn, frames):
+    start = time.perf_counter()
+    for f in frames:
+        fn(f)
+    return len(frames) / (time.perf_counter() - start)
+
+
+def bench_angles(n_frames=20000):
+    """Feature math only: 5x angle_between vs one joint_angles call."""
+    frames = _fake_landmarks(n_frames)
+
+    # Sanity: both paths agree
+    for f in frames[:100]:
+        old, new = _legacy_features(f), compute_features(f)
+        for k in old:
+            assert abs(old[k] - new[k]) < 1e-6, k
+
+    before = _fps(_legacy_features, frames)
+    after = _fps(compute_features, frames)
+    print(f"[angles] before: {before:10.0f} frames/s")
+    print(f"[angles] after:  {after:10.0f} frames/s  ({after / before:.1f}x)")
+
+
+def _fake_landmark_list(w=1280, h=720, seed=0):
+    """A MediaPipe NormalizedLandmarkList with 33 random landmarks."""
+    from mediapipe.framework.formats import landmark_pb2
+
+    rng = np.random.default_rng(seed)
+    lm_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, vis in rng.random((33, 4)):
+        lm_list.landmark.add(x=x, y=y, z=z, visibility=vis)
+    return lm_list.landmark
+
+
+def bench_extract(n_frames=20000, w=1280, h=720, repeats=5):
+    """
+    Landmark extraction (+ features): a new tuple array per frame (before) vs
+    the reused (33, 4) buffer PoseEstimator._fill_landmark_buffer fills in
+    place. Best of `repeats`, so a noisy run doesn't decide the comparison;
+    peak traced memory is per variant.
+    """
+    lm = _fake_landmark_list(w, h)
+    estimator = PoseEstimator()
+
+    def tuples():
+        return np.array([(p.x * w, p.y * h) for p in lm], dtype=np.float64)
+
+    def in_place():
+        return estimator._fill_landmark_buffer(lm, w, h)
+
+    def peak_bytes(fn):
+        fn()
+        tracemalloc.start()
+        for _ in range(1000):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    variants = (
+        ("before", tuples, lambda: compute_features(tuples())),
+        ("in place", in_place, lambda: compute_features(in_place(), estimator._work)),
+    )
+    for name, extract, full in variants:
+        extract_us = full_us = float("inf")
+        for _ in range(repeats):
+            extract_us = min(extract_us, 1e6 / _fps(lambda _: extract(), range(n_frames)))
+            full_us = min(full_us, 1e6 / _fps(lambda _: full(), range(n_frames)))
+        print(f"[extract] {name + ':':9} extract {extract_us:5.1f} µs (peak {peak_bytes(extract):5d} B), "
+              f"+ features {full_us:5.1f} µs (peak {peak_bytes(full):5d} B, "
+              f"{1e6 / full_us:6.0f} frames/s)")
+
+
+# ----------------- Synthetic rep traces -----------------
+
+class _TraceEstimator:
+    """Stands in for PoseEstimator: process(i) replays frame i of a landmark trace."""
+
+    def __init__(self, landmarks):
+        self.landmarks = landmarks
+        self.landmark_buffer = np.zeros((33, 4), dtype=np.float32)
+        self.confidence_indices = FEATURE_LANDMARKS
+
+    def process(self, frame_index):
+        np.copyto(self.landmark_buffer, self.landmarks[frame_index])
+        return compute_features(self.landmark_buffer), True
+
+
+def bench_scheduler(n_reps=20):
+    """
+    Adaptive inference rate: fraction of frames inferred, primary-angle error,
+    and reps counted from the scheduled stream vs the full-rate one.
+    """
+    from rep_logic import MultiRepState, update_multi_rep_state
+
+    for exercise, (joint, *_rest) in TRACE_PROFILES.items():
+        timestamps, landmarks, true_reps = synthetic_trace(exercise, n_reps=n_reps)
+        key = f"{joint}_min_angle_frame"
+
+        scheduler = AdaptivePoseScheduler(_TraceEstimator(landmarks), exercise)
+        scheduled_state, full_state = MultiRepState(), MultiRepState()
+        scheduled_reps = full_reps = 0
+        errors = []
+        for i, t in enumerate(timestamps.tolist()):
+            features, _ = scheduler.process(i, timestamp=t)
+            truth = compute_features(landmarks[i])
+            errors.append(abs(features[key] - truth[key]))
+            scheduled_reps += len(update_multi_rep_state(scheduled_state, features, 0.9, exercise, t))
+            full_reps += len(update_multi_rep_state(full_state, truth, 0.9, exercise, t))
+
+        errors = np.array(errors)
+        inferred = scheduler.inferred_frames / scheduler.frames
+        print(f"[scheduler] {exercise:17} inferred {inferred:6.1%} of frames, "
+              f"{joint} angle error mean {errors.mean():4.1f}° max {errors.max():4.1f}°, "
+              f"reps {scheduled_reps} scheduled / {full_reps} full rate / {true_reps} true "
+              f"(diff {scheduled_reps - full_reps:+d})")
+
+
+# ----------------- Frame path allocations -----------------
+
+def _make_video(path, n_frames=120, w=1920, h=1080, fps=30.0):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (w, h))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    for i in range(n_frames):
+        writer.write(np.roll(base, i * 8, axis=1))
+    writer.release()
+
+
+def _frame_loop(path, pooled):
+    """read → display copy → RGB convert, the non-inference part of rep_demo's loop."""
+    import resource     # Unix only, so only `bench.py frames` needs it
+
+    cap = cv2.VideoCapture(path)
+    pool = FramePool()
+    rgb = None
+    n = 0
+
+    tracemalloc.start()
+    faults_before = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    start = time.perf_counter()
+    while True:
+        if pooled:
+            frame = pool.read(cap)
+            if frame is None:
+                break
+            display = pool.display_copy(frame)
+            if rgb is None:
+                rgb = np.empty_like(frame)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            display = frame.copy()
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        n += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cap.release()
+
+    # Fresh full-size buffers show up as page faults on first touch
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    faults_per_frame = (usage.ru_minflt - faults_before) / max(n, 1)
+    return n / elapsed, peak, usage.ru_maxrss, faults_per_frame
+
+
+def bench_frames(path="/tmp/bench_1080p.avi"):
+    """Per-frame image allocations: frame.copy()/cvtColor vs pooled buffers (1080p)."""
+    _make_video(path)
+    # Fresh process per variant so peak RSS isn't shared
+    ctx = multiprocessing.get_context("spawn")
+    for name, pooled in (("before", False), ("after", True)):
+        with ctx.Pool(1) as pool:
+            fps, peak, rss, faults = pool.apply(_frame_loop, (path, pooled))
+        print(f"[frames] {name + ':':7} {fps:7.1f} frames/s, "
+              f"peak traced {peak / 1e6:5.1f} MB, peak RSS {rss / 1024:6.1f} MB, "
+              f"{faults:7.1f} page faults/frame")
+
+
+# ----------------- Stage timer overhead -----------------
+
+def bench_timer(n=200000, frame_ms=33.0, spans_per_frame=12):
+    """Cost of one timing span, enabled vs NULL_TIMER, as % of a frame budget."""
+    for name, timer in (("enabled", StageTimer()), ("disabled", NULL_TIMER)):
+        start = time.perf_counter()
+        for _ in range(n):
+            with timer.span("stage"):
+                pass
+        per_span_us = (time.perf_counter() - start) / n * 1e6
+        pct = per_span_us * spans_per_frame / (frame_ms * 1000.0) * 100
+        print(f"[timer] {name + ':':9} {per_span_us:5.2f} µs/span → "
+              f"{pct:.3f}% of a {frame_ms:.0f} ms frame at {spans_per_frame} spans")
+
+
+def _render_hud(frame_pool, frame, pose_landmarks, drawing, connections):
+    """rep_demo's windowed-mode overlay work, minus imshow."""
+    display = frame_pool.display_copy(frame)
+    drawing.draw_landmarks(display, pose_landmarks, connections)
+    for i in range(5):
+        cv2.putText(display, f"HUD line {i}: 12 reps", (10, 30 + 30 * i),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    return display
+
+
+def bench_headless(path=None, n_render=300):
+    """
+    Windowed vs headless loop: overlay render cost and end-to-end pose fps.
+    Needs a real clip with a person in it: python bench.py headless VIDEO
+    """
+    import mediapipe as mp
+    from rep_logic import MultiRepState, update_multi_rep_state
+
+    if path is None:
+        print("[headless] skipped, pass a video with a person in it: python bench.py headless VIDEO")
+        return
+    drawing, connections = mp.solutions.drawing_utils, mp.solutions.pose.POSE_CONNECTIONS
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        print(f"[headless] could not read {path}")
+        return
+
+    estimator = PoseEstimator()
+    pose_landmarks = None
+    for frame in frames:
+        _, pose_landmarks = estimator.process(frame)
+        if pose_landmarks is not None:
+            break
+    if pose_landmarks is None:
+        print(f"[headless] no pose found in {path}")
+        return
+
+    # Overlay alone, on a 720p frame
+    hd = cv2.resize(frames[0], (1280, 720))
+    pool = FramePool()
+    start = time.perf_counter()
+    for _ in range(n_render):
+        _render_hud(pool, hd, pose_landmarks, drawing, connections)
+    render_ms = (time.perf_counter() - start) / n_render * 1000
+    print(f"[headless] overlay render (720p, skeleton + 5 text lines): {render_ms:.2f} ms/frame")
+
+    # Whole loop on the clip: pose + rep logic (+ overlay when windowed).
+    # Three rounds each, best kept, so model warm-up doesn't favour either side.
+    results = {}
+    for _ in range(3):
+        for name, render in (("windowed", True), ("headless", False)):
+            estimator = PoseEstimator()
+            state = MultiRepState()
+            pool = FramePool()
+            start = time.perf_counter()
+            for i, frame in enumerate(frames):
+                features, lms = estimator.process(frame)
+                if features is not None:
+                    update_multi_rep_state(state, features, features["confidence_frame"],
+                                           "squat", timestamp=i / 30.0)
+                if render:
+                    _render_hud(pool, frame, lms, drawing, connections)
+            fps = len(frames) / (time.perf_counter() - start)
+            results[name] = max(results.get(name, 0.0), fps)
+    for name, fps in results.items():
+        print(f"[headless] {name + ':':9} {fps:6.1f} fps over {len(frames)} frames of {path}")
+
+
+def _synthetic_scene(w=1280, h=720, seed=0):
+    """
+    A noisy w x h frame and a mid-squat figure on it, as the (33, 4) pixel
+    landmark array and the MediaPipe landmark list drawing_utils wants.
+    """
+    from mediapipe.framework.formats import landmark_pb2
+
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    points = np.zeros((33, 4), dtype=np.float32)
+    _pose_from_angles(points, 95.0, 95.0, 160.0, 160.0, hip_y=0.55 * h)
+    points[:, 0] += w / 2.0 - 640.0
+
+    lm_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, vis in points:
+        lm_list.landmark.add(x=x / w, y=y / h, z=z / w, visibility=vis)
+    return frame, points, lm_list
+
+
+def bench_overlay(n=500, w=1280, h=720):
+    """Overlay render: per-frame DrawingSpecs + draw_landmarks + putText vs SkeletonRenderer + cached HUD."""
+    import mediapipe as mp
+    from rep_logic import MultiRepState
+    from overlay import SkeletonRenderer, HudLayer
+    from rep_demo import hud_lines
+
+    # Rendering doesn't care whether MediaPipe found the pose, so no model run here
+    frame, points, pose_landmarks = _synthetic_scene(w, h)
+
+    drawing, connections = mp.solutions.drawing_utils, mp.solutions.pose.POSE_CONNECTIONS
+    state = MultiRepState()
+    pool = FramePool()
+    message = "Keep your chest up and push through the heels."
+
+    def legacy():
+        display = pool.display_copy(frame)
+        drawing.draw_landmarks(
+            display, pose_landmarks, connections,
+            landmark_drawing_spec=drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
+            connection_drawing_spec=drawing.DrawingSpec(color=(255, 0, 0), thickness=2),
+        )
+        for text, org, font, scale, color, thickness in hud_lines("squat", state, message, display.shape):
+            cv2.putText(display, text, org, font, scale, color, thickness)
+
+    skeleton, hud = SkeletonRenderer(), HudLayer()
+
+    def cached():
+        display = pool.display_copy(frame)
+        skeleton.draw(display, points)
+        hud.set_lines(display.shape, hud_lines("squat", state, message, display.shape))
+        hud.composite(display)
+
+    for name, fn in (("legacy", legacy), ("cached", cached)):
+        fn()
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        ms = (time.perf_counter() - start) / n * 1000
+        print(f"[overlay] {name + ':':8} {ms:.3f} ms/frame ({w}x{h}, incl. display copy)")
+    print(f"[overlay] HUD re-rendered {hud.renders}x in {n + 1} frames")
+
+
+def bench_hold(hold_frames=(1000, 10000, 100000)):
+    """Memory held by one limb stuck in FLEXED, vs hold length (should be flat)."""
+    from rep_logic import MultiRepState, update_multi_rep_state
+
+    ts, lms, _ = synthetic_trace("squat", n_reps=1)
+    features = compute_features(lms[int(0.5 * 30) + 30])     # mid-rep, knee well bent
+    for n in hold_frames:
+        state = MultiRepState()
+        tracemalloc.start()
+        for i in range(n):
+            update_multi_rep_state(state, features, 0.9, "squat", timestamp=i / 30.0)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"[hold] {n:7d} FLEXED frames: {current / 1024:7.1f} KiB still allocated, "
+              f"state={state.limb_states['global'].state_name}")
+
+
+def _same_reps(a, b):
+    """Rep summaries equal field for field, NaN matching NaN."""
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if x.keys() != y.keys():
+            return False
+        for key, u in x.items():
+            v = y[key]
+            if u != v and not (isinstance(u, float) and isinstance(v, float)
+                               and math.isnan(u) and math.isnan(v)):
+                return False
+    return True
+
+
+def bench_segment(n_reps=300):
+    """
+    Whole-trace rep segmentation: per-frame update_multi_rep_state vs segment_reps,
+    then the same check with NaN dropouts punched into the features.
+
+    mountain_climber has the least headroom (~10-12x): its reps are ~18
+    frames, so building the per-rep summary dicts is most of the batch time.
+    """
+    from rep_logic import MultiRepState, update_multi_rep_state, segment_reps, stack_features
+
+    for exercise in TRACE_PROFILES:
+        ts, lms, _ = synthetic_trace(exercise, n_reps=n_reps, noise_px=2.0)
+        frames = [compute_features(p) for p in lms]
+        rng = np.random.default_rng(0)
+        confidence = rng.uniform(0.5, 1.0, len(frames))
+        times, confs = ts.tolist(), confidence.tolist()
+        arrays = stack_features(frames)
+
+        # best of 5 each, so first-call warm-up doesn't count against either
+        stream_s = batch_s = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            state = MultiRepState()
+            streamed = []
+            for t, f, c in zip(times, frames, confs):
+                streamed += update_multi_rep_state(state, f, c, exercise, timestamp=t)
+            stream_s = min(stream_s, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            batched = segment_reps(arrays, confidence, ts, exercise)
+            batch_s = min(batch_s, time.perf_counter() - start)
+
+        # dropouts: short NaN runs in random feature columns
+        keys = list(arrays)
+        for _ in range(n_reps // 10):
+            run = rng.integers(len(frames))
+            arrays[keys[rng.integers(len(keys))]][run:run + rng.integers(1, 30)] = np.nan
+        columns = {k: v.tolist() for k, v in arrays.items()}
+        state = MultiRepState()
+        nan_streamed = []
+        for j, (t, c) in enumerate(zip(times, confs)):
+            f = {k: column[j] for k, column in columns.items()}
+            nan_streamed += update_multi_rep_state(state, f, c, exercise, timestamp=t)
+        nan_batched = segment_reps(arrays, confidence, ts, exercise)
+
+        print(f"[segment] {exercise:16} {len(frames):6d} frames: stream {stream_s * 1000:7.1f} ms, "
+              f"batch {batch_s * 1000:6.2f} ms ({stream_s / batch_s:5.1f}x), "
+              f"{len(batched)} reps, identical={_same_reps(batched, streamed)}, "
+              f"with NaN={_same_reps(nan_batched, nan_streamed)}")
+
+
+def bench_replogic(n_reps=100):
+    """
+    Per-frame cost of update_multi_rep_state over a synthetic trace (best of 5),
+    vs calling the exercise's compiled ExerciseTracker directly: the gap is the
+    per-frame dispatch (timestamp default, get_tracker lookup).
+    """
+    from rep_logic import MultiRepState, compile_tracker, update_multi_rep_state
+
+    for exercise in TRACE_PROFILES:
+        ts, lms, _ = synthetic_trace(exercise, n_reps=n_reps, noise_px=2.0)
+        frames = [compute_features(p) for p in lms]
+        times = ts.tolist()
+        tracker = compile_tracker(exercise)
+
+        def via_update(state, f, t):
+            return update_multi_rep_state(state, f, 0.9, exercise, t)
+
+        def via_tracker(state, f, t):
+            return tracker.update(state, f, 0.9, t)
+
+        results = {}
+        for name, update in (("update", via_update), ("tracker", via_tracker)):
+            best = float("inf")
+            for _ in range(5):
+                state = MultiRepState()
+                reps = []
+                start = time.perf_counter()
+                for t, f in zip(times, frames):
+                    reps += update(state, f, t)
+                best = min(best, time.perf_counter() - start)
+            results[name] = (best / len(frames) * 1e6, len(reps))
+
+        (update_us, update_reps), (tracker_us, tracker_reps) = results["update"], results["tracker"]
+        print(f"[replogic] {exercise:16} update_multi_rep_state {update_us:5.2f}, "
+              f"tracker.update {tracker_us:5.2f} µs/frame over {len(frames)} frames, "
+              f"reps {update_reps} / {tracker_reps}")
+
+
+def bench_metrics(n=200000, frame_ms=33.0):
+    """Per-frame cost of the streaming smoothness + asymmetry work, per limb."""
+    from rep_logic import JerkMeter, RunningStats
+
+    rng = np.random.default_rng(0)
+    flex = (90.0 * rng.random(n)).tolist()
+    asym = (10.0 * rng.random(n)).tolist()
+    times = (np.arange(n) / 30.0).tolist()
+
+    meter, flex_stats, asym_stats = JerkMeter(), RunningStats(), RunningStats()
+    flex_stats.start(0.0)
+    asym_stats.start(0.0)
+    jerk_sq = 0.0
+    start = time.perf_counter()
+    for x, a, t in zip(flex, asym, times):
+        jerk_sq += meter.push(x, t)
+        flex_stats.add(x)
+        asym_stats.add(a)
+    per_frame_us = (time.perf_counter() - start) / n * 1e6
+    print(f"[metrics] jerk + amplitude + asymmetry: {per_frame_us:.2f} µs/frame/limb "
+          f"→ {per_frame_us / (frame_ms * 1000.0) * 100:.4f}% of a {frame_ms:.0f} ms frame")
+
+
+def _window_accuracy(index, arrays, timestamps, exercise):
+    """(windows labelled exercise, moving windows) over one labelled trace."""
+    from exercise_classifier import trace_windows, MIN_MOTION_DEG
+
+    descriptors, motion, _ = trace_windows(arrays, timestamps)
+    active = descriptors[motion >= MIN_MOTION_DEG]
+    return sum(index.query(d)[0] == exercise for d in active), len(active)
+
+
+def bench_classify(*sessions, n_reps=15, circuit=("squat", "mountain_climber", "bicep_curl", "lunge",
+                                                  "pushup", "squat", "lunge", "mountain_climber")):
+    """
+    Exercise recognition: window accuracy on traces the index wasn't built
+    from, per-frame cost, circuit switch delay.
+
+    The index comes from synthetic.py's default traces, so scoring more traces
+    from the same generator would be circular: the held-out traces change what
+    training holds fixed (shallower reps, a bent rest pose, sway, more
+    landmark noise than any training trace). They are still a standing figure. Only labelled
+    recordings (python bench.py classify sessions/*.npz) say anything about
+    real sessions; they are scored against the same index.
+    """
+    from rep_logic import stack_features
+    from exercise_classifier import (
+        build_index, synthetic_training_traces, ExerciseRecognizer, AutoExerciseTracker,
+    )
+
+    start = time.perf_counter()
+    index = build_index(synthetic_training_traces(seeds=(0, 1, 2)))
+    print(f"[classify] index: {len(index)} windows, built in {time.perf_counter() - start:.2f}s")
+
+    for exercise in TRACE_PROFILES:
+        peak = 0.75 * TRACE_PROFILES[exercise][1]
+        ts, lms, _ = synthetic_trace(exercise, n_reps=n_reps, noise_px=4.0, seed=100,
+                                     peak=peak, rest_flex=10.0, sway=4.0)
+        frames = [compute_features(p) for p in lms]
+        correct, active = _window_accuracy(index, stack_features(frames), ts, exercise)
+
+        recognizer = ExerciseRecognizer(index)
+        times = ts.tolist()
+        start = time.perf_counter()
+        for t, f in zip(times, frames):
+            recognizer.push(f, t)
+        us = (time.perf_counter() - start) / len(frames) * 1e6
+        print(f"[classify] {exercise:16} held-out window accuracy {correct / max(active, 1):6.1%} "
+              f"({active} windows), {us:5.1f} µs/frame, recognized: {recognizer.exercise}")
+
+    if sessions:
+        from replay import load_session
+
+        for path in sessions:
+            trace = load_session(path)
+            if trace.exercise is None:
+                print(f"[classify] {path}: no exercise saved in the trace, skipped")
+                continue
+            correct, active = _window_accuracy(index, trace.arrays, trace.timestamps, trace.exercise)
+            print(f"[classify] {path} ({trace.exercise}): window accuracy "
+                  f"{correct / max(active, 1):6.1%} ({active} windows)")
+
+    # Circuit: back-to-back exercises, one tracker that has to follow along
+    times, frames, segments, offset = [], [], [], 0.0
+    for k, exercise in enumerate(circuit):
+        ts, lms, n = synthetic_trace(exercise, n_reps=8, noise_px=3.0, seed=200 + k)
+        segments.append((exercise, offset, n))
+        times += (ts + offset).tolist()
+        frames += [compute_features(p) for p in lms]
+        offset += ts[-1] + ts[1]
+
+    tracker = AutoExerciseTracker(ExerciseRecognizer(index))
+    reps, switches = [], []
+    start = time.perf_counter()
+    for t, f in zip(times, frames):
+        reps += [(t, tracker.exercise) for _ in tracker.update(f, 0.9, t)]
+        if tracker.recognizer.switches > len(switches):
+            switches.append((t, tracker.exercise))
+    us = (time.perf_counter() - start) / len(frames) * 1e6
+
+    print(f"[classify] circuit of {len(circuit)}: {us:.1f} µs/frame incl. rep logic, "
+          f"{len(switches)} switches")
+    for k, (exercise, seg_start, n) in enumerate(segments):
+        seg_end = segments[k + 1][1] if k + 1 < len(segments) else float("inf")
+        detected = [t for t, e in switches if seg_start <= t < seg_end and e == exercise]
+        counted = [e for t, e in reps if seg_start <= t < seg_end]
+        delay = f"{detected[0] - seg_start:4.1f}s" if detected else "  -- "
+        print(f"[classify]   {exercise:16} switch after {delay}, "
+              f"reps {counted.count(exercise)}/{n} (+{len(counted) - counted.count(exercise)} other)")
+
+
+# name → (exercise, synthetic_trace user-variation kwargs)
+CALIBRATION_USERS = {
+    "typical": ("squat", {}),
+    "limited range": ("squat", {"peak": 30.0}),
+    "never straightens": ("squat", {"rest_flex": 25.0}),
+    "sways between reps": ("squat", {"rest_flex": 22.0, "sway": 18.0}),
+    "half curls": ("bicep_curl", {"peak": 80.0}),
+    "shallow lunges": ("lunge", {"peak": 45.0}),
+    "short knee drives": ("mountain_climber", {"peak": 45.0}),
+}
+
+
+def bench_calibrate(n_reps=12, n_users=(10, 1000, 10000)):
+    """Per-user thresholds: rep counts vs shared thresholds, profile load time vs store size."""
+    import shutil
+    import tempfile
+    from rep_logic import MultiRepState, update_multi_rep_state
+    from calibration import ProfileStore, CalibratedTracker
+
+    root = tempfile.mkdtemp(prefix="profiles_")
+    try:
+        store = ProfileStore(root)
+        for name, (exercise, user) in CALIBRATION_USERS.items():
+            ts, lms, true_reps = synthetic_trace(exercise, n_reps=n_reps, noise_px=2.0, seed=5, **user)
+            frames = [compute_features(p) for p in lms]
+            times = ts.tolist()
+
+            state, shared = MultiRepState(), 0
+            for t, f in zip(times, frames):
+                shared += len(update_multi_rep_state(state, f, 0.9, exercise, timestamp=t))
+
+            # first session calibrates (and saves), second one starts from the profile
+            counts = []
+            for _ in range(2):
+                tracker = CalibratedTracker(exercise, store, name)
+                counts.append(sum(len(tracker.update(f, 0.9, t)) for t, f in zip(times, frames)))
+                counts[-1] += len(tracker.finish())
+            th = tracker.thresholds
+            print(f"[calibrate] {name:19} {exercise:16} true {true_reps:2d}: shared {shared:2d}, "
+                  f"calibrating {counts[0]:2d}, from profile {counts[1]:2d} "
+                  f"(flexed {th['flexed_threshold']:5.1f}, extended {th['extended_threshold']:5.1f})")
+
+        # Session-start load: one file read whatever the number of stored users
+        thresholds = {"flexed_threshold": 40.0, "extended_threshold": 15.0,
+                      "rest_flex": 0.0, "peak_flex": 80.0, "calibration_reps": 3}
+        stored = 0
+        for n in n_users:
+            for i in range(stored, n):
+                store.save(f"user{i}", "squat", thresholds)
+            stored = n
+            start = time.perf_counter()
+            for i in range(200):
+                ProfileStore(root).thresholds(f"user{(i * 7919) % n}", "squat")
+            us = (time.perf_counter() - start) / 200 * 1e6
+            print(f"[calibrate] cold profile load with {n:6d} users stored: {us:6.1f} µs")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+BENCHMARKS = {
+    "angles": bench_angles,
+    "extract": bench_extract,
+    "scheduler": bench_scheduler,
+    "frames": bench_frames,
+    "timer": bench_timer,
+    "headless": bench_headless,
+    "overlay": bench_overlay,
+    "hold": bench_hold,
+    "segment": bench_segment,
+    "replogic": bench_replogic,
+    "metrics": bench_metrics,
+    "classify": bench_classify,
+    "calibrate": bench_calibrate,
+}
+
+
+if __name__ == "__main__":
+    # python bench.py [name [arg ...]] ...   e.g. python bench.py overlay headless clip.mp4
+    runs = []
+    for arg in sys.argv[1:]:
+        if arg in BENCHMARKS or not runs:
+            runs.append((arg, []))
+        else:
+            runs[-1][1].append(arg)
+    for name, args in runs or [(name, []) for name in BENCHMARKS]:
+        BENCHMARKS[name](*args)
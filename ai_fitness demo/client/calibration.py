@@ -0,0 +1,327 @@
+# client/calibration.py
+
+"""
+Per-user rep thresholds.
+
+EXERCISE_CONFIG's flexed_threshold / extended_threshold are one size for
+everybody: a user with limited range of motion never bends past
+flexed_threshold (missed reps), a user who sinks deep and wobbles near the
+bottom can dip under extended_threshold mid-rep (double counts).
+
+ThresholdCalibrator watches the first few reps of a session — detected with
+range-relative hysteresis on the same per-limb flex the exercise's tracker
+thresholds, so it needs no thresholds of its own — and turns that user's
+rest and peak flex into thresholds. ProfileStore keeps them on disk, one
+small JSON file per user, so a session start reads exactly one file no
+matter how many users there are. CalibratedTracker ties it together:
+profile thresholds if there are any, otherwise calibrate on the first reps
+and replay them through the calibrated tracker so they still count.
+
+    python calibration.py show --user alice
+    python calibration.py reset --user alice [--exercise squat]
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+from typing import Optional, Dict, Any, List, Tuple
+
+from rep_logic import MultiRepState, compile_tracker, get_exercise_config, ExerciseTracker
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+CALIBRATION_REPS = 3            # reps watched before thresholds are fixed
+CALIBRATION_TIMEOUT_S = 20.0    # give up (keep the defaults) after this long
+MIN_CALIBRATION_RANGE = 15.0    # degrees of flex before anything counts as a rep
+
+# Where between the user's rest and peak flex each threshold sits
+FLEXED_FRACTION = 0.55
+EXTENDED_FRACTION = 0.25
+MIN_HYSTERESIS = 8.0            # degrees between the two thresholds, at least
+
+
+# ----------------- Profile store -----------------
+
+class ProfileStore:
+    """
+    Learned thresholds per (user, exercise), one JSON file per user under
+    root. Profiles are read once per user and kept in memory.
+    """
+
+    def __init__(self, root: str = DEFAULT_PROFILE_DIR):
+        self.root = root
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+
+    def _path(self, user_id: str) -> str:
+        # Readable file name, plus a hash so "a b" and "a_b" don't collide
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", user_id)[:40]
+        digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.root, f"{safe}-{digest}.json")
+
+    def load(self, user_id: str) -> Dict[str, Any]:
+        """{"user_id": ..., "exercises": {exercise: thresholds}} (empty for a new user)."""
+        profile = self._profiles.get(user_id)
+        if profile is None:
+            try:
+                with open(self._path(user_id), "r", encoding="utf-8") as f:
+                    profile = json.load(f)
+            except FileNotFoundError:
+                profile = {"user_id": user_id, "exercises": {}}
+            self._profiles[user_id] = profile
+        return profile
+
+    def thresholds(self, user_id: str, exercise: str) -> Optional[Dict[str, Any]]:
+        return self.load(user_id)["exercises"].get(exercise)
+
+    def save(self, user_id: str, exercise: str, thresholds: Dict[str, Any]):
+        profile = self.load(user_id)
+        profile["exercises"][exercise] = dict(thresholds, updated=time.time())
+        self._write(user_id, profile)
+
+    def forget(self, user_id: str, exercise: Optional[str] = None):
+        """Drop one exercise's thresholds (all of them if exercise is None)."""
+        profile = self.load(user_id)
+        if exercise is None:
+            profile["exercises"].clear()
+        else:
+            profile["exercises"].pop(exercise, None)
+        self._write(user_id, profile)
+
+    def _write(self, user_id: str, profile: Dict[str, Any]):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(user_id)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+        os.replace(tmp, path)       # never leave a half-written profile behind
+
+
+def user_config(exercise: str, thresholds: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Exercise config with a user's thresholds swapped in (the shared one if None)."""
+    cfg = get_exercise_config(exercise)
+    if not thresholds:
+        return cfg
+    return dict(cfg,
+                flexed_threshold=thresholds["flexed_threshold"],
+                extended_threshold=thresholds["extended_threshold"])
+
+
+def user_tracker(store: Optional[ProfileStore], user_id: Optional[str],
+                 exercise: str) -> ExerciseTracker:
+    """Compiled tracker with this user's stored thresholds for exercise, if any."""
+    thresholds = None
+    if store is not None and user_id is not None:
+        thresholds = store.thresholds(user_id, exercise)
+    return compile_tracker(exercise, user_config(exercise, thresholds))
+
+
+# ----------------- Calibration -----------------
+
+class _RangeRepDetector:
+    """
+    Range-relative hysteresis on one flex signal: a rep is a rise above 60%
+    and a fall back under 30% of the flex range seen so far (once that range
+    is at least MIN_CALIBRATION_RANGE). Collects each rep's peak and the
+    trough before it.
+    """
+
+    def __init__(self):
+        self.low = float("inf")
+        self.high = float("-inf")
+        self.rising = False
+        self.peak = 0.0
+        self.trough = float("inf")
+        self.peaks: List[float] = []
+        self.troughs: List[float] = []
+
+    def push(self, flex: float):
+        if flex < self.low:
+            self.low = flex
+        if flex > self.high:
+            self.high = flex
+        span = self.high - self.low
+        if span < MIN_CALIBRATION_RANGE:
+            self.trough = min(self.trough, flex)
+            return
+
+        if self.rising:
+            self.peak = max(self.peak, flex)
+            if flex < self.low + 0.3 * span:
+                self.rising = False
+                self.peaks.append(self.peak)
+                self.trough = flex
+        else:
+            self.trough = min(self.trough, flex)
+            if flex > self.low + 0.6 * span:
+                self.rising = True
+                self.troughs.append(self.trough)
+                self.peak = flex
+
+
+class ThresholdCalibrator:
+    """
+    Learns rest / peak flex of an exercise's primary joint from the first reps.
+
+    Watches the same per-limb signal the exercise's ExerciseTracker holds
+    against its thresholds (ExerciseTracker.limb_flex): the more bent side
+    for whole-body exercises, each leg on its own, gated by use_limb_delta,
+    for lunges and mountain climbers. Every limb gets a _RangeRepDetector.
+    Swaying before the first real rep can look like a small one, so only
+    peaks of at least half the biggest count. After `reps` of those (summed
+    over limbs), rest is the median trough and peak the median rep peak.
+    """
+
+    def __init__(self, exercise: str, reps: int = CALIBRATION_REPS):
+        self.exercise = exercise
+        # Shared thresholds: the limb signals don't depend on them
+        self.tracker = compile_tracker(exercise)
+        self.reps = reps
+        self.detectors = [_RangeRepDetector() for _ in self.tracker.limbs]
+
+    def _rep_peaks(self) -> List[float]:
+        peaks = [p for d in self.detectors for p in d.peaks]
+        if not peaks:
+            return []
+        cutoff = 0.5 * max(peaks)
+        return [p for p in peaks if p >= cutoff]
+
+    @property
+    def reps_seen(self) -> int:
+        return len(self._rep_peaks())
+
+    @property
+    def done(self) -> bool:
+        return self.reps_seen >= self.reps
+
+    def push(self, features: Dict[str, Any]) -> bool:
+        """One frame; True once enough reps have been seen."""
+        for detector, flex in zip(self.detectors, self.tracker.limb_flex(features)):
+            detector.push(flex)
+        return self.done
+
+    def thresholds(self) -> Dict[str, Any]:
+        peaks = self._rep_peaks()
+        rest = _median([t for d in self.detectors for t in d.troughs])
+        peak = _median(peaks)
+        span = peak - rest
+        flexed = rest + FLEXED_FRACTION * span
+        extended = min(rest + EXTENDED_FRACTION * span, flexed - MIN_HYSTERESIS)
+        return {
+            "flexed_threshold": round(flexed, 1),
+            "extended_threshold": round(max(extended, 0.0), 1),
+            "rest_flex": round(rest, 1),
+            "peak_flex": round(peak, 1),
+            "calibration_reps": len(peaks),
+        }
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2.0
+
+
+# ----------------- Session -----------------
+
+class CalibratedTracker:
+    """
+    One exercise's rep counting with a user's thresholds.
+
+    With a stored profile the calibrated tracker is used from the first
+    frame. Otherwise (or with recalibrate=True) frames are buffered while a
+    ThresholdCalibrator watches the first reps; then the thresholds are saved
+    and the buffered frames replayed, so those reps are counted too. If
+    timeout_s passes without enough clear reps, the shared thresholds are
+    kept (timed_out is set, nothing is saved). No user (user_id None) means
+    the shared EXERCISE_CONFIG thresholds.
+    """
+
+    def __init__(self, exercise: str, store: Optional[ProfileStore] = None,
+                 user_id: Optional[str] = None, recalibrate: bool = False,
+                 timeout_s: float = CALIBRATION_TIMEOUT_S):
+        self.exercise = exercise
+        self.store = store
+        self.user_id = user_id
+        self.timeout_s = timeout_s
+        self.timed_out = False
+        self.multi_state = MultiRepState()
+
+        self.thresholds = None
+        if store is not None and user_id is not None and not recalibrate:
+            self.thresholds = store.thresholds(user_id, exercise)
+
+        self.calibrator = None
+        self._buffer: List[Tuple[float, Dict[str, Any], float]] = []
+        if user_id is not None and self.thresholds is None:
+            self.calibrator = ThresholdCalibrator(exercise)
+        self.tracker: ExerciseTracker = compile_tracker(exercise, user_config(exercise, self.thresholds))
+
+    @property
+    def calibrating(self) -> bool:
+        return self.calibrator is not None
+
+    def status(self) -> str:
+        if self.calibrator is not None:
+            return f"Calibrating: {self.calibrator.reps_seen}/{self.calibrator.reps} reps"
+        if self.timed_out:
+            return "Calibration timed out: shared thresholds"
+        if self.thresholds is not None:
+            return (f"Thresholds: {self.thresholds['flexed_threshold']:.0f}/"
+                    f"{self.thresholds['extended_threshold']:.0f} deg")
+        return ""
+
+    def update(self, features: Dict[str, Any], avg_confidence: float,
+               timestamp: float) -> List[Dict[str, Any]]:
+        if self.calibrator is None:
+            return self.tracker.update(self.multi_state, features, avg_confidence, timestamp)
+
+        self._buffer.append((timestamp, features, avg_confidence))
+        if self.calibrator.push(features):
+            self.thresholds = self.calibrator.thresholds()
+            if self.store is not None:
+                self.store.save(self.user_id, self.exercise, self.thresholds)
+            self.tracker = compile_tracker(self.exercise,
+                                           user_config(self.exercise, self.thresholds))
+        elif timestamp - self._buffer[0][0] < self.timeout_s:
+            return []
+        else:
+            self.timed_out = True       # keep the shared thresholds
+        # Calibrated or timed out: count the buffered reps
+        return self.finish()
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """End calibration now (e.g. the session ended) and count buffered frames."""
+        self.calibrator = None
+        completed_reps: List[Dict[str, Any]] = []
+        for t, f, c in self._buffer:
+            completed_reps += self.tracker.update(self.multi_state, f, c, t)
+        self._buffer = []
+        return completed_reps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-user rep threshold profiles.")
+    parser.add_argument("command", choices=["show", "reset"])
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--exercise", default=None, help="reset: only this exercise")
+    parser.add_argument("--profiles", default=DEFAULT_PROFILE_DIR, metavar="DIR")
+    args = parser.parse_args()
+
+    store = ProfileStore(args.profiles)
+    profile = store.load(args.user)
+    if args.command == "show":
+        for exercise, thresholds in sorted(profile["exercises"].items()):
+            shared = get_exercise_config(exercise)
+            print(f"{exercise:16} flexed {thresholds['flexed_threshold']:5.1f} "
+                  f"(shared {shared['flexed_threshold']:.0f}), "
+                  f"extended {thresholds['extended_threshold']:5.1f} "
+                  f"(shared {shared['extended_threshold']:.0f}), "
+                  f"range {thresholds['rest_flex']:.0f}-{thresholds['peak_flex']:.0f} deg")
+        if not profile["exercises"]:
+            print(f"no calibrated exercises for {args.user}")
+    else:
+        store.forget(args.user, args.exercise)
+        print(f"reset {args.exercise or 'all exercises'} for {args.user}")
@@ -0,0 +1,84 @@
+# client/capture.py
+#
+# Camera capture on its own thread with latest-frame-wins semantics.
+# If pose inference is slower than the camera, we skip to the newest frame
+# instead of working through a backlog of stale ones, and every frame carries
+# the time it was captured so rep timing follows the real motion.
+
+import time
+from threading import Thread, Condition
+
+
+class LatestFrameCapture:
+    """
+    Reads cap in a background thread into 3 rotating preallocated buffers:
+    one being written, the newest complete frame, and the one the consumer
+    is currently using (never overwritten while in use).
+
+    read() → (frame, capture_time) for the newest frame not yet consumed,
+    or (None, None) once the source is exhausted / stopped.
+    capture_time is time.monotonic() right after the frame arrived.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self._buffers = [None, None, None]
+        self._latest = None         # buffer index of newest complete frame
+        self._latest_time = None
+        self._latest_seq = -1
+        self._consumed_seq = -1
+        self._in_use = None         # buffer index held by the consumer
+        self._stopped = False
+        self._cond = Condition()
+        self._thread = Thread(target=self._run, daemon=True)
+
+        self.captured = 0
+        self.dropped = 0            # captured but replaced before anyone read them
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        seq = 0
+        while not self._stopped:
+            with self._cond:
+                idx = next(i for i in range(3) if i != self._latest and i != self._in_use)
+
+            ret, frame = self.cap.read(self._buffers[idx])
+            capture_time = time.monotonic()
+            if not ret:
+                break
+
+            with self._cond:
+                self._buffers[idx] = frame
+                if self._latest_seq > self._consumed_seq:
+                    self.dropped += 1
+                self._latest = idx
+                self._latest_time = capture_time
+                self._latest_seq = seq
+                self.captured += 1
+                self._cond.notify()
+            seq += 1
+
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def read(self):
+        with self._cond:
+            while self._latest_seq <= self._consumed_seq and not self._stopped:
+                self._cond.wait()
+            if self._latest_seq <= self._consumed_seq:
+                return None, None
+
+            self._in_use = self._latest
+            self._consumed_seq = self._latest_seq
+            return self._buffers[self._in_use], self._latest_time
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
@@ -0,0 +1,405 @@
+# client/exercise_classifier.py
+
+"""
+Automatic exercise recognition from the per-frame joint angles.
+
+A sliding window of angles (knees, elbows, hips, torso lean) is reduced to
+a small descriptor — per-channel mean / spread, left-right gap and tempo —
+and labeled by k-nearest-neighbours against a precomputed index of
+descriptors from labeled sessions. The index is built once and saved as an
+.npz; a query is one (M, D) mat-vec, and the recognizer only queries every
+CLASSIFY_EVERY frames.
+
+    ExerciseIndex          labeled descriptors, standardized, + kNN vote
+    ExerciseRecognizer     streaming: push(features, t) → switched?
+    AutoExerciseTracker    update_multi_rep_state with the recognized exercise
+
+Build an index from recorded sessions (FeatureRecorder .npz files carry the
+exercise they were recorded with), or from synthetic.py's traces. The
+synthetic traces are a standing figure bending one joint: a "pushup" there is
+a standing elbow bend, a "mountain_climber" alternating standing knee bends,
+so a synthetic-only index suits the demo and the benchmarks, not real floor
+exercises. For real sessions, build from labelled recordings:
+
+    python exercise_classifier.py build sessions/*.npz
+    python exercise_classifier.py build --synthetic
+    python exercise_classifier.py classify session.npz
+
+Building is an explicit step: by default the index goes to the user cache
+directory (DEFAULT_INDEX_PATH, ~/.cache/ai_fitness/), never into the source
+tree, and load_index fails with the build command when there is none.
+"""
+
+import os
+import sys
+import argparse
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Callable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from rep_logic import MultiRepState, ExerciseTracker, get_tracker, FEATURE_DEFAULTS
+
+# Angle channels in window order; the first six come in left/right pairs
+CHANNELS = (
+    "left_knee_angle_frame", "right_knee_angle_frame",
+    "left_elbow_angle_frame", "right_elbow_angle_frame",
+    "left_hip_angle_frame", "right_hip_angle_frame",
+    "torso_dev_frame",
+)
+_N_PAIRED = 6
+# Per-frame window columns: flex (180 - angle) for the paired channels, torso
+# lean as is, then |left - right| flex for each pair, then left + right flex
+# for knees and elbows (for tempo)
+_N_COLUMNS = len(CHANNELS) + 3 + 2
+
+WINDOW_FRAMES = 60          # ~2 s at 30 fps: at least one full rep of every exercise
+CLASSIFY_EVERY = 5          # frames between kNN queries
+MIN_MOTION_DEG = 6.0        # windows where no joint moves more than this are "idle"
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai_fitness", "exercise_index.npz")
+
+
+# ----------------- Window descriptors -----------------
+
+def frame_columns(values: np.ndarray) -> np.ndarray:
+    """(N, C) CHANNELS values → (N, _N_COLUMNS) window columns."""
+    flex = np.array(values, dtype=np.float64)
+    flex[:, :_N_PAIRED] = 180.0 - flex[:, :_N_PAIRED]
+    gap = np.abs(flex[:, 0:_N_PAIRED:2] - flex[:, 1:_N_PAIRED:2])
+    pairs = flex[:, 0:4:2] + flex[:, 1:4:2]
+    return np.concatenate([flex, gap, pairs], axis=1)
+
+
+def window_descriptors(windows: np.ndarray, frame_dt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    windows:  (M, W, _N_COLUMNS) frame columns, oldest frame first
+    frame_dt: (M,) mean seconds per frame in each window
+    Returns (descriptors (M, D), motion (M,)) — motion is the largest joint
+    std in degrees, for telling exercise from standing around.
+    """
+    mean = windows.mean(axis=1)
+    std = windows.std(axis=1)
+    n = len(CHANNELS)
+    # Tempo: rms speed over spread (≈ 2π · rep frequency for a sine), knees and elbows
+    speed = np.sqrt((np.diff(windows[..., n + 3:], axis=1) ** 2).mean(axis=1))
+    tempo = speed / (std[:, n + 3:] + 1.0) / frame_dt[:, None]
+
+    # mean / spread per channel, mean left-right gap (alternating / one-sided moves), tempo
+    descriptors = np.concatenate([mean[:, :n + 3], std[:, :n], tempo], axis=1)
+    return descriptors, std[:, :_N_PAIRED].max(axis=1)
+
+
+def trace_windows(arrays: Dict[str, np.ndarray], timestamps: np.ndarray,
+                  window: int = WINDOW_FRAMES, stride: int = CLASSIFY_EVERY):
+    """(descriptors, motion, end_frames) for every stride-th full window of a trace."""
+    n = len(timestamps)
+    if n < window:
+        return np.empty((0, 2 * len(CHANNELS) + 5)), np.empty(0), np.empty(0, dtype=np.intp)
+    values = np.stack([np.asarray(arrays.get(k, np.full(n, FEATURE_DEFAULTS[k])), dtype=np.float64)
+                       for k in CHANNELS], axis=1)
+    windows = sliding_window_view(frame_columns(values), window, axis=0)[::stride]  # (M, cols, W)
+    times = np.asarray(timestamps, dtype=np.float64)
+    ends = np.arange(window - 1, n, stride)
+    frame_dt = (times[ends] - times[ends - window + 1]) / (window - 1)
+    descriptors, motion = window_descriptors(windows.transpose(0, 2, 1),
+                                             np.maximum(frame_dt, 1e-3))
+    return descriptors, motion, ends
+
+
+# ----------------- Index -----------------
+
+@dataclass
+class ExerciseIndex:
+    points: np.ndarray                 # (M, D) standardized descriptors
+    labels: np.ndarray                 # (M,) index into exercises
+    exercises: Tuple[str, ...]
+    center: np.ndarray                 # (D,) descriptor mean / std used to standardize
+    scale: np.ndarray
+    sq_norms: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.sq_norms = np.einsum("ij,ij->i", self.points, self.points)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def query(self, descriptor: np.ndarray, k: int = 7) -> Tuple[str, float]:
+        """(exercise, fraction of the k nearest windows that voted for it)."""
+        z = (descriptor - self.center) / self.scale
+        # |p - z|² up to the constant |z|²
+        dist = self.sq_norms - 2.0 * (self.points @ z)
+        k = min(k, len(dist))
+        nearest = np.argpartition(dist, k - 1)[:k]
+        votes = np.bincount(self.labels[nearest], minlength=len(self.exercises))
+        best = int(votes.argmax())
+        return self.exercises[best], votes[best] / k
+
+    def save(self, path: str):
+        np.savez(path, points=self.points, labels=self.labels,
+                 exercises=np.array(self.exercises), center=self.center, scale=self.scale)
+
+    @classmethod
+    def load(cls, path: str) -> "ExerciseIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["points"], data["labels"], tuple(data["exercises"].tolist()),
+                       data["center"], data["scale"])
+
+
+def build_index(traces: Iterable[Tuple[Dict[str, np.ndarray], np.ndarray, str]],
+                max_per_exercise: int = 600) -> ExerciseIndex:
+    """
+    traces: (arrays, timestamps, exercise) per labeled session. Idle windows
+    are dropped; each exercise keeps at most max_per_exercise evenly spaced
+    windows so the index (and every query) stays small.
+    """
+    per_exercise: Dict[str, List[np.ndarray]] = {}
+    for arrays, timestamps, exercise in traces:
+        descriptors, motion, _ = trace_windows(arrays, timestamps)
+        per_exercise.setdefault(exercise, []).append(descriptors[motion >= MIN_MOTION_DEG])
+
+    exercises = tuple(sorted(per_exercise))
+    points, labels = [], []
+    for label, exercise in enumerate(exercises):
+        descriptors = np.concatenate(per_exercise[exercise])
+        if len(descriptors) > max_per_exercise:
+            keep = np.linspace(0, len(descriptors) - 1, max_per_exercise).round().astype(np.intp)
+            descriptors = descriptors[keep]
+        points.append(descriptors)
+        labels.append(np.full(len(descriptors), label, dtype=np.intp))
+
+    points = np.concatenate(points)
+    center = points.mean(axis=0)
+    scale = points.std(axis=0) + 1e-6
+    return ExerciseIndex((points - center) / scale, np.concatenate(labels), exercises,
+                         center, scale)
+
+
+# ----------------- Streaming -----------------
+
+class ExerciseRecognizer:
+    """
+    Sliding-window exercise recognition, one push() per tracked frame.
+
+    The window lives twice in a (2W, columns) buffer so the newest W frames are
+    always one contiguous slice (no np.roll). Every `stride` frames the window
+    is classified; the recognized exercise only changes after `confirm`
+    consecutive decisions agree with at least `min_agreement` of the k votes.
+    Idle windows keep the current exercise. `settled` is False while the
+    latest decision disagrees with the current exercise.
+    """
+
+    def __init__(self, index: ExerciseIndex, window: int = WINDOW_FRAMES,
+                 stride: int = CLASSIFY_EVERY, k: int = 7,
+                 min_agreement: float = 0.6, confirm: int = 6):
+        self.index = index
+        self.window = window
+        self.stride = stride
+        self.k = k
+        self.min_agreement = min_agreement
+        self.confirm = confirm
+
+        self._values = np.zeros((2 * window, _N_COLUMNS), dtype=np.float64)
+        self._times = np.zeros(2 * window, dtype=np.float64)
+        self._pos = 0
+        self._count = 0
+        self._since_query = 0
+
+        self.exercise: Optional[str] = None
+        self.candidate: Optional[str] = None
+        self.settled = True
+        self._streak = 0
+        self.queries = 0
+        self.switches = 0
+
+    def reset(self):
+        self._pos = self._count = self._since_query = 0
+        self.exercise = self.candidate = None
+        self.settled = True
+        self._streak = 0
+
+    def push(self, features: Dict[str, Any], timestamp: float) -> bool:
+        """Add one frame; True when the recognized exercise changed on it."""
+        get = features.get
+        lk, rk, le, re, lh, rh = [180.0 - get(key, 180.0) for key in CHANNELS[:_N_PAIRED]]
+        row = (lk, rk, le, re, lh, rh, get("torso_dev_frame", 0.0),
+               abs(lk - rk), abs(le - re), abs(lh - rh), lk + rk, le + re)
+        pos, window = self._pos, self.window
+        self._values[pos] = row
+        self._values[pos + window] = row
+        self._times[pos] = timestamp
+        self._times[pos + window] = timestamp
+        self._pos = (pos + 1) % window
+        self._count += 1
+        self._since_query += 1
+        if self._count < window or self._since_query < self.stride:
+            return False
+        self._since_query = 0
+
+        start = self._pos
+        values = self._values[start:start + window]
+        times = self._times[start:start + window]
+        frame_dt = max((times[-1] - times[0]) / (window - 1), 1e-3)
+        descriptors, motion = window_descriptors(values[None], np.array([frame_dt]))
+        if motion[0] < MIN_MOTION_DEG:
+            self._streak = 0
+            self.settled = True
+            return False
+
+        self.queries += 1
+        exercise, agreement = self.index.query(descriptors[0], self.k)
+        self.settled = exercise == self.exercise
+        if self.settled or agreement < self.min_agreement:
+            self._streak = 0
+            return False
+        if exercise != self.candidate:
+            self.candidate, self._streak = exercise, 0
+        self._streak += 1
+        if self._streak < self.confirm:
+            return False
+
+        self.exercise = exercise
+        self.settled = True
+        self._streak = 0
+        self.switches += 1
+        return True
+
+
+class AutoExerciseTracker:
+    """
+    Rep counting with the exercise chosen by an ExerciseRecognizer.
+    tracker_for(exercise) supplies the ExerciseTracker (default: the shared
+    config's, as update_multi_rep_state uses; calibration.user_tracker for a
+    user's own thresholds).
+
+    Until an exercise is recognized no reps are counted. While the recognizer
+    is unsettled (the window looks like another exercise) frames are held
+    back: if it settles on the current exercise they go through its tracker
+    late, if it switches the limb states start fresh and the window that
+    identified the new exercise is replayed through the new tracker, so reps
+    done while it was being recognized still count, under the right exercise.
+    """
+
+    def __init__(self, recognizer: ExerciseRecognizer,
+                 tracker_for: Callable[[str], ExerciseTracker] = get_tracker):
+        self.recognizer = recognizer
+        self.tracker_for = tracker_for
+        self.tracker: Optional[ExerciseTracker] = None
+        self.multi_state = MultiRepState()
+        self._history = deque(maxlen=recognizer.window)
+        self._held: List[Tuple[float, Dict[str, Any], float]] = []
+
+    @property
+    def exercise(self) -> Optional[str]:
+        return self.recognizer.exercise
+
+    def update(self, features: Dict[str, Any], avg_confidence: float,
+               timestamp: float) -> List[Dict[str, Any]]:
+        frame = (timestamp, features, avg_confidence)
+        self._history.append(frame)
+        recognizer = self.recognizer
+        if recognizer.push(features, timestamp):
+            self.tracker = self.tracker_for(self.exercise)
+            self.multi_state = MultiRepState()
+            self._held.clear()
+            return self._run(self._history)
+
+        if self.exercise is None:
+            return []
+        self._held.append(frame)
+        # Hold frames back while unsettled, but never longer than one window
+        if not recognizer.settled and len(self._held) < recognizer.window:
+            return []
+        completed_reps = self._run(self._held)
+        self._held.clear()
+        return completed_reps
+
+    def _run(self, frames) -> List[Dict[str, Any]]:
+        completed_reps: List[Dict[str, Any]] = []
+        for t, f, c in frames:
+            completed_reps += self.tracker.update(self.multi_state, f, c, t)
+        return completed_reps
+
+
+def load_index(path: str = DEFAULT_INDEX_PATH) -> ExerciseIndex:
+    """The index saved at path (see `python exercise_classifier.py build`)."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"No exercise index at {path}; build one first: "
+            f"python exercise_classifier.py build sessions/*.npz -o {path}")
+    return ExerciseIndex.load(path)
+
+
+def save_index(index: ExerciseIndex, path: str = DEFAULT_INDEX_PATH):
+    """Save index at path, creating its directory; a killed save never leaves a broken index."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        index.save(f)
+    os.replace(tmp, path)
+
+
+# ----------------- Training data -----------------
+
+def synthetic_training_traces(n_reps: int = 30, seeds: Iterable[int] = (0, 1, 2)):
+    """
+    Labeled (arrays, timestamps, exercise) from synthetic.py's landmark traces.
+    Standing figure only (see the module docstring): real pushups and mountain
+    climbers won't look like these.
+    """
+    from synthetic import synthetic_trace, TRACE_PROFILES
+    from pose_utils import compute_features
+    from rep_logic import stack_features
+
+    for exercise in TRACE_PROFILES:
+        for seed in seeds:
+            ts, lms, _ = synthetic_trace(exercise, n_reps=n_reps, noise_px=1.0 + seed, seed=seed)
+            yield stack_features([compute_features(p) for p in lms]), ts, exercise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise recognition index tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="build a kNN index from labeled sessions")
+    build.add_argument("sessions", nargs="*", help=".npz feature traces (recorded with --record)")
+    build.add_argument("--synthetic", action="store_true",
+                       help="also add synthetic.py's traces (standing figure only: a demo index, "
+                            "won't match real floor exercises)")
+    build.add_argument("-o", "--out", default=DEFAULT_INDEX_PATH)
+
+    classify = sub.add_parser("classify", help="print the recognized exercise over a session")
+    classify.add_argument("sessions", nargs="+", help=".npz feature traces or video files")
+    classify.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    from replay import load_session
+
+    if args.command == "build":
+        traces = []
+        for path in args.sessions:
+            trace = load_session(path)
+            if trace.exercise is None:
+                print(f"{path}: no exercise saved in the trace, skipped", file=sys.stderr)
+                continue
+            traces.append((trace.arrays, trace.timestamps, trace.exercise))
+        if args.synthetic:
+            traces += list(synthetic_training_traces())
+        if not traces:
+            parser.error("no labeled sessions (pass .npz files and/or --synthetic)")
+        index = build_index(traces)
+        save_index(index, args.out)
+        counts = np.bincount(index.labels, minlength=len(index.exercises))
+        print(f"{args.out}: {len(index)} windows, "
+              + ", ".join(f"{e} {c}" for e, c in zip(index.exercises, counts)))
+    else:
+        index = load_index(args.index)
+        for path in args.sessions:
+            trace = load_session(path)
+            recognizer = ExerciseRecognizer(index)
+            for t, features in trace.frames():
+                if recognizer.push(features, t):
+                    print(f"{path}: {t:7.2f}s → {recognizer.exercise}")
+            print(f"{path}: final {recognizer.exercise} "
+                  f"(saved label: {trace.exercise or 'none'}, {recognizer.queries} queries)")
@@ -0,0 +1,34 @@
+# client/frame_pool.py
+#
+# Preallocated per-frame image buffers for the client loop.
+# cap.read() and the display copy write into the same arrays every frame
+# instead of allocating two full-size images (~12 MB/frame at 1080p).
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Reusable BGR capture and display buffers.
+    (The RGB buffer fed to MediaPipe lives in PoseEstimator.)
+    """
+
+    def __init__(self):
+        self.frame = None
+        self.display = None
+
+    def read(self, cap):
+        """cap.read() into the pooled BGR buffer. Returns the frame or None at EOF."""
+        ret, frame = cap.read(self.frame)
+        if not ret:
+            return None
+        # First frame (or a resolution change) allocates; after that OpenCV reuses it
+        self.frame = frame
+        return frame
+
+    def display_copy(self, frame):
+        """Copy frame into the pooled display buffer (replaces frame.copy())."""
+        if self.display is None or self.display.shape != frame.shape:
+            self.display = np.empty_like(frame)
+        np.copyto(self.display, frame)
+        return self.display
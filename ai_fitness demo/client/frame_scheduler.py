@@ -0,0 +1,114 @@
+# client/frame_scheduler.py
+#
+# Motion-adaptive inference rate in front of PoseEstimator.process.
+# Fast movement → pose on every frame; slow movement / rest → skip frames
+# and extrapolate landmarks from the last two keyframes.
+
+import time
+import numpy as np
+
+from pose_utils import (
+    NUM_LANDMARKS, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP,
+    frame_features,
+)
+from rep_logic import get_exercise_config
+
+
+class AdaptivePoseScheduler:
+    """
+    Drop-in wrapper for PoseEstimator: process(frame) → (features, landmarks).
+
+    After each keyframe (real inference) it measures landmark speed in body
+    lengths per second (shoulder-hip distance) and plans how many of the next
+    frames to skip: max_skip_frames when still, 0 at or above skip_fast_speed.
+    Skipped frames get features from linearly extrapolated landmarks, so
+    update_multi_rep_state still sees a value on every frame.
+
+    Defaults for max_skip_frames / skip_fast_speed come from EXERCISE_CONFIG.
+    """
+
+    def __init__(self, pose_estimator, exercise_hint=None,
+                 max_skip_frames=None, skip_fast_speed=None):
+        cfg = get_exercise_config(exercise_hint)
+        self.pose_estimator = pose_estimator
+        self.max_skip_frames = (cfg["max_skip_frames"]
+                                if max_skip_frames is None else max_skip_frames)
+        self.skip_fast_speed = (cfg["skip_fast_speed"]
+                                if skip_fast_speed is None else skip_fast_speed)
+
+        self._last = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)      # last keyframe
+        self._extrap = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)    # skipped-frame output
+        self._velocity = np.zeros((NUM_LANDMARKS, 2), dtype=np.float32)  # px/s
+        self._work = np.empty((NUM_LANDMARKS + 3, 2), dtype=np.float64)
+        self._last_time = None
+        self._last_landmarks = None
+        self._n_keyframes = 0       # keyframes since tracking (re)started
+        self._skip_budget = 0
+
+        self.last_was_keyframe = False
+        self.frames = 0
+        self.inferred_frames = 0
+
+    @property
+    def landmark_buffer(self):
+        """(33, 4) landmarks behind the last returned features."""
+        if self.last_was_keyframe:
+            return self.pose_estimator.landmark_buffer
+        return self._extrap
+
+    def _plan_skip(self):
+        last = self._last
+        body = np.hypot(
+            (last[LEFT_SHOULDER, 0] + last[RIGHT_SHOULDER, 0] - last[LEFT_HIP, 0] - last[RIGHT_HIP, 0]) / 2,
+            (last[LEFT_SHOULDER, 1] + last[RIGHT_SHOULDER, 1] - last[LEFT_HIP, 1] - last[RIGHT_HIP, 1]) / 2,
+        )
+        if body < 1.0:
+            return 0
+
+        speed = float(np.sqrt((self._velocity ** 2).sum(axis=1).max())) / body
+        stillness = 1.0 - min(speed / self.skip_fast_speed, 1.0)
+        return int(self.max_skip_frames * stillness)
+
+    def process(self, frame_bgr, timestamp=None):
+        now = time.monotonic() if timestamp is None else timestamp
+        self.frames += 1
+
+        # ---------- Skipped frame: extrapolate from the last keyframe ----------
+        if self._skip_budget > 0:
+            self._skip_budget -= 1
+            self.last_was_keyframe = False
+
+            np.copyto(self._extrap, self._last)
+            self._extrap[:, :2] += self._velocity * (now - self._last_time)
+            features = frame_features(self._extrap, self._work,
+                                      self.pose_estimator.confidence_indices)
+            return features, self._last_landmarks
+
+        # ---------- Keyframe: real inference ----------
+        features, landmarks = self.pose_estimator.process(frame_bgr)
+        self.inferred_frames += 1
+        self.last_was_keyframe = True
+
+        if features is None:
+            # Lost tracking (or a low-confidence frame) → stay at full rate
+            # until we have two good keyframes again
+            self._n_keyframes = 0
+            self._last_landmarks = None
+            return None, landmarks
+
+        buf = self.pose_estimator.landmark_buffer
+        if self._n_keyframes > 0:
+            dt = now - self._last_time
+            if dt > 0:
+                np.subtract(buf[:, :2], self._last[:, :2], out=self._velocity)
+                self._velocity /= dt
+
+        np.copyto(self._last, buf)
+        self._last_time = now
+        self._last_landmarks = landmarks
+        self._n_keyframes += 1
+
+        if self._n_keyframes >= 2:
+            self._skip_budget = self._plan_skip()
+
+        return features, landmarks
@@ -0,0 +1,294 @@
+# client/multi_camera.py
+#
+# Several cameras from one box:
+#
+#   capture proc (per camera) ──shared-memory ring──▶ pose proc (per camera)
+#                                                        │ features (small dicts)
+#                                                        ▼
+#                                 one rep-logic + coaching process (all cameras)
+#
+# Frames never get pickled: the capture process cap.read()s straight into a
+# ring slot and the pose process copies the newest slot into its own buffer.
+
+import time
+import argparse
+import multiprocessing
+from multiprocessing import shared_memory
+from queue import Empty
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    Fixed-size ring of BGR frames in one shared_memory block.
+
+    Layout: head seq (int64) | per-slot seq (int64[n]) | per-slot capture
+    timestamp (float64[n]) | frames (uint8[n, h, w, 3]).
+
+    Writer: slot = ring.slot_for(seq) → fill it → ring.commit(seq, timestamp).
+    Reader: ring.read(seq, out) copies the frame and returns its timestamp, or
+    None if the writer lapped us mid-copy (slot seq changed).
+
+    The ring itself never blocks; processes pair it with a multiprocessing.Event
+    the writer sets after each commit, so the reader sleeps until a frame lands.
+    """
+
+    def __init__(self, shm, shape, n_slots):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.n_slots = n_slots
+
+        buf = shm.buf
+        off = 0
+        self._head = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=off)
+        off += 8
+        self._slot_seq = np.ndarray((n_slots,), dtype=np.int64, buffer=buf, offset=off)
+        off += 8 * n_slots
+        self._slot_ts = np.ndarray((n_slots,), dtype=np.float64, buffer=buf, offset=off)
+        off += 8 * n_slots
+        self.frames = np.ndarray((n_slots,) + self.shape, dtype=np.uint8, buffer=buf, offset=off)
+
+    @staticmethod
+    def nbytes(shape, n_slots):
+        return 8 + 16 * n_slots + n_slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, shape, n_slots=4):
+        shm = shared_memory.SharedMemory(create=True, size=cls.nbytes(shape, n_slots))
+        ring = cls(shm, shape, n_slots)
+        ring._head[0] = -1
+        ring._slot_seq[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name, shape, n_slots):
+        # Child processes share the creator's resource tracker, so attaching
+        # doesn't take ownership; only the creator unlinks the block.
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, shape, n_slots)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def head(self):
+        """Sequence number of the newest committed frame (-1 = none yet)."""
+        return int(self._head[0])
+
+    def slot_for(self, seq):
+        i = seq % self.n_slots
+        self._slot_seq[i] = -1        # mark as being written
+        return self.frames[i]
+
+    def commit(self, seq, timestamp):
+        i = seq % self.n_slots
+        self._slot_ts[i] = timestamp
+        self._slot_seq[i] = seq
+        self._head[0] = seq
+
+    def read(self, seq, out):
+        i = seq % self.n_slots
+        if self._slot_seq[i] != seq:
+            return None
+        timestamp = float(self._slot_ts[i])
+        np.copyto(out, self.frames[i])
+        if self._slot_seq[i] != seq:
+            return None
+        return timestamp
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+# ----------------- Stats (shared counters per camera) -----------------
+
+CAPTURED, PROCESSED, DROPPED = range(3)
+
+
+# ----------------- Processes -----------------
+
+def _capture_main(cam_id, source, ring_name, shape, n_slots, stats, frame_ready, stop_event):
+    import cv2
+
+    ring = SharedFrameRing.attach(ring_name, shape, n_slots)
+    cap = cv2.VideoCapture(source)
+    h, w = shape[:2]
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+
+    # A video file stands in for a camera: stamp frames with the file's own
+    # timestamps and hand them out at its frame rate instead of as fast as
+    # they decode (the pose process only ever sees the newest slot)
+    is_file = not isinstance(source, int)
+    if is_file:
+        from offline import video_frame_timestamp
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        start = time.monotonic()
+
+    seq = 0
+    try:
+        while not stop_event.is_set():
+            slot = ring.slot_for(seq)
+            ret, frame = cap.read(slot)
+            if not ret:
+                break
+            if frame is not slot:
+                # Camera ignored the requested size → scale into the slot
+                cv2.resize(frame, (w, h), dst=slot)
+            if is_file:
+                timestamp = video_frame_timestamp(cap, seq, fps)
+                delay = start + timestamp - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                timestamp = time.monotonic()
+            ring.commit(seq, timestamp)
+            frame_ready.set()
+            stats[cam_id * 3 + CAPTURED] += 1
+            seq += 1
+    finally:
+        cap.release()
+        ring.close()
+
+
+def _pose_main(cam_id, ring_name, shape, n_slots, stats, frame_ready, feature_queue, stop_event,
+               exercise):
+    from pose_utils import PoseEstimator
+    from rep_logic import get_exercise_config
+
+    cfg = get_exercise_config(exercise)
+    ring = SharedFrameRing.attach(ring_name, shape, n_slots)
+    estimator = PoseEstimator(primary_joint=cfg["primary_joint"], min_confidence=cfg["min_confidence"])
+    frame = np.empty(shape, dtype=np.uint8)
+
+    last_seq = -1
+    try:
+        while not stop_event.is_set():
+            # Sleep until the capture process commits; the timeout only bounds
+            # how long a stop takes to notice. Clearing before reading head()
+            # means a commit that lands after the read sets it again.
+            if not frame_ready.wait(timeout=0.1):
+                continue
+            frame_ready.clear()
+            seq = ring.head()
+            if seq == last_seq:
+                continue
+
+            # Always take the newest frame; anything in between is a drop
+            timestamp = ring.read(seq, frame)
+            skipped = seq - last_seq - 1 + (timestamp is None)
+            if skipped > 0:
+                stats[cam_id * 3 + DROPPED] += skipped
+            last_seq = seq
+            if timestamp is None:
+                continue
+
+            features, _ = estimator.process(frame)
+            stats[cam_id * 3 + PROCESSED] += 1
+            if features is not None:
+                feature_queue.put((cam_id, seq, timestamp, features))
+    finally:
+        ring.close()
+
+
+def _rep_main(feature_queue, exercise, n_cameras, stop_event, coaching):
+    from rep_logic import MultiRepState, update_multi_rep_state
+
+    states = [MultiRepState() for _ in range(n_cameras)]
+    if coaching:
+        # Same backend + TTS path as the single-camera demo
+        from threading import Thread
+        from rep_demo import llm_worker, rep_queue
+        Thread(target=llm_worker, daemon=True).start()
+
+    while not stop_event.is_set():
+        try:
+            cam_id, seq, timestamp, features = feature_queue.get(timeout=0.1)
+        except Empty:
+            continue
+
+        completed_reps = update_multi_rep_state(
+            states[cam_id], features, features["confidence_frame"], exercise,
+            timestamp=timestamp,
+        )
+        for rep_summary in completed_reps:
+            rep_summary["camera_id"] = cam_id
+            print(f"=== REP COMPLETED (camera={cam_id}, rep_id={rep_summary['rep_id']}) ===")
+            if coaching and rep_summary["rep_id"] % 2 == 1:
+                rep_queue.put(rep_summary)
+
+
+# ----------------- Orchestration -----------------
+
+def run_cameras(sources, exercise, size=(1280, 720), n_slots=4, coaching=True,
+                report_every=2.0):
+    """Start capture/pose processes per camera plus one rep process; Ctrl+C to stop."""
+    w, h = size
+    shape = (h, w, 3)
+    n = len(sources)
+
+    stop_event = multiprocessing.Event()
+    stats = multiprocessing.Array("q", n * 3)
+    feature_queue = multiprocessing.Queue(maxsize=256)
+    rings = [SharedFrameRing.create(shape, n_slots) for _ in sources]
+    frame_ready = [multiprocessing.Event() for _ in sources]
+
+    procs = [multiprocessing.Process(
+        target=_rep_main, daemon=True,
+        args=(feature_queue, exercise, n, stop_event, coaching))]
+    for cam_id, (source, ring, ready) in enumerate(zip(sources, rings, frame_ready)):
+        procs.append(multiprocessing.Process(
+            target=_capture_main, daemon=True,
+            args=(cam_id, source, ring.name, shape, n_slots, stats, ready, stop_event)))
+        procs.append(multiprocessing.Process(
+            target=_pose_main, daemon=True,
+            args=(cam_id, ring.name, shape, n_slots, stats, ready, feature_queue, stop_event,
+                  exercise)))
+    for p in procs:
+        p.start()
+
+    last = np.zeros(n * 3, dtype=np.int64)
+    last_time = time.perf_counter()
+    try:
+        while any(p.is_alive() for p in procs[1::2]):      # capture procs
+            time.sleep(report_every)
+            now = time.perf_counter()
+            cur = np.frombuffer(stats.get_obj(), dtype=np.int64).copy()
+            rate = (cur - last) / (now - last_time)
+            for cam_id in range(n):
+                c = cam_id * 3
+                print(f"[cam {cam_id}] capture {rate[c + CAPTURED]:5.1f} fps | "
+                      f"pose {rate[c + PROCESSED]:5.1f} fps | "
+                      f"dropped {cur[c + DROPPED]} total")
+            last, last_time = cur, now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        for p in procs:
+            p.join(timeout=2.0)
+        for ring in rings:
+            ring.close()
+            ring.unlink()
+
+    return np.frombuffer(stats.get_obj(), dtype=np.int64).reshape(n, 3)
+
+
+if __name__ == "__main__":
+    # python multi_camera.py 0 1 2 --exercise squat
+    parser = argparse.ArgumentParser(description="Multi-camera rep tracking.")
+    parser.add_argument("sources", nargs="+", help="camera indices or video paths")
+    parser.add_argument("--exercise", default="squat")
+    parser.add_argument("--size", default="1280x720", help="frame size WxH")
+    parser.add_argument("--no-coaching", action="store_true", help="don't call the backend / TTS")
+    args = parser.parse_args()
+
+    sources = [int(s) if s.isdigit() else s for s in args.sources]
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    totals = run_cameras(sources, args.exercise, (w, h), coaching=not args.no_coaching)
+    for cam_id, (captured, processed, dropped) in enumerate(totals):
+        print(f"[cam {cam_id}] captured {captured}, processed {processed}, dropped {dropped}")
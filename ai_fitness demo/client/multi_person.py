@@ -0,0 +1,259 @@
+# client/multi_person.py
+#
+# Group-class mode: one PoseEstimator + MultiRepState per tracked person.
+# MediaPipe Pose only follows a single body, so we find people with OpenCV's
+# HOG person detector, give each a stable track ID, and run every track's
+# estimator on its own region in a thread pool (MediaPipe releases the GIL
+# while the graph runs).
+
+import time
+import argparse
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, List, Dict, Any
+
+import cv2
+import numpy as np
+
+from pose_utils import PoseEstimator
+from rep_logic import MultiRepState, update_multi_rep_state, get_exercise_config
+from offline import video_frame_timestamp
+
+
+Box = Tuple[int, int, int, int]   # (x0, y0, x1, y1) in full-frame pixels
+
+
+@dataclass
+class PersonTrack:
+    track_id: int
+    box: Box
+    estimator: PoseEstimator
+    multi_state: MultiRepState = field(default_factory=MultiRepState)
+    misses: int = 0               # consecutive frames without a pose / detection
+
+
+@dataclass
+class PersonResult:
+    track_id: int
+    box: Box
+    features: Optional[Dict[str, Any]]
+    landmarks: Any
+    completed_reps: List[Dict[str, Any]]
+
+
+def box_iou(a: Box, b: Box) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class PersonDetector:
+    """HOG people detector on a downscaled frame, boxes padded and in full-frame pixels."""
+
+    def __init__(self, detect_width=640, padding=0.15, min_score=0.3):
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        self.detect_width = detect_width
+        self.padding = padding
+        self.min_score = min_score
+
+    def detect(self, frame_bgr) -> List[Box]:
+        h, w = frame_bgr.shape[:2]
+        scale = min(1.0, self.detect_width / w)
+        small = cv2.resize(frame_bgr, (int(w * scale), int(h * scale))) if scale < 1.0 else frame_bgr
+
+        rects, scores = self.hog.detectMultiScale(small, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        if len(rects) == 0:
+            return []
+
+        keep = cv2.dnn.NMSBoxes(rects.tolist(), np.ravel(scores).tolist(), self.min_score, 0.4)
+        boxes = []
+        for i in np.ravel(keep):
+            x, y, bw, bh = rects[i] / scale
+            px, py = bw * self.padding, bh * self.padding
+            boxes.append((max(0, int(x - px)), max(0, int(y - py)),
+                          min(w, int(x + bw + px)), min(h, int(y + bh + py))))
+        return boxes
+
+
+class MultiPersonTracker:
+    """
+    process(frame) → one PersonResult per live track, sorted by track ID.
+
+    - Detection runs every detect_every frames (and whenever there are no tracks);
+      in between, each track's box follows its own landmarks (PoseEstimator ROI).
+    - Detections are matched to tracks greedily by IoU; unmatched detections
+      start new tracks, tracks unseen for max_misses frames are dropped.
+    - Two tracks whose boxes overlap by at least iou_duplicate for
+      duplicate_frames frames in a row have converged on one person; the newer
+      one is dropped so that person's reps aren't counted twice.
+    - Each frame's per-track pose calls run concurrently; results are gathered
+      before returning, so every person's stream stays in frame order.
+    """
+
+    def __init__(self, exercise_hint=None, workers=None, detect_every=15, max_misses=15,
+                 iou_match=0.3, iou_duplicate=0.7, duplicate_frames=5, estimator_kwargs=None):
+        self.exercise_hint = exercise_hint
+        self.detect_every = detect_every
+        self.max_misses = max_misses
+        self.iou_match = iou_match
+        self.iou_duplicate = iou_duplicate
+        self.duplicate_frames = duplicate_frames
+
+        cfg = get_exercise_config(exercise_hint)
+        self.estimator_kwargs = dict(
+            primary_joint=cfg["primary_joint"],
+            min_confidence=cfg["min_confidence"],
+        )
+        self.estimator_kwargs.update(estimator_kwargs or {})
+        # Tracks follow their own landmarks between detections
+        self.estimator_kwargs["roi"] = True
+
+        self.detector = PersonDetector()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.tracks: Dict[int, PersonTrack] = {}
+        self._next_id = 1
+        # (older ID, newer ID) → consecutive frames the two boxes overlapped
+        self._overlaps: Dict[Tuple[int, int], int] = {}
+
+        self.frames = 0
+        self.person_frames = 0      # Σ tracked persons over frames
+        self._start_time = None
+
+    # ---------- Track management ----------
+
+    def _associate(self, boxes: List[Box]):
+        pairs = sorted(
+            ((box_iou(t.box, b), tid, j) for tid, t in self.tracks.items() for j, b in enumerate(boxes)),
+            reverse=True,
+        )
+        matched_tracks, matched_boxes = set(), set()
+        for iou, tid, j in pairs:
+            if iou < self.iou_match:
+                break
+            if tid in matched_tracks or j in matched_boxes:
+                continue
+            matched_tracks.add(tid)
+            matched_boxes.add(j)
+            track = self.tracks[tid]
+            track.box = boxes[j]
+            track.estimator.roi_box = None   # re-anchor on the detection
+            track.misses = 0
+
+        for j, box in enumerate(boxes):
+            if j not in matched_boxes:
+                tid = self._next_id
+                self._next_id += 1
+                self.tracks[tid] = PersonTrack(tid, box, PoseEstimator(**self.estimator_kwargs))
+
+    def _drop_duplicates(self):
+        """Drop the newer of any two tracks that have overlapped for duplicate_frames frames."""
+        tracks = sorted(self.tracks.values(), key=lambda t: t.track_id)
+        overlaps = {}
+        for i, older in enumerate(tracks):
+            for newer in tracks[i + 1:]:
+                if box_iou(older.box, newer.box) >= self.iou_duplicate:
+                    pair = (older.track_id, newer.track_id)
+                    overlaps[pair] = self._overlaps.get(pair, 0) + 1
+
+        for (older_id, newer_id), frames in sorted(overlaps.items()):
+            # The older track keeps its ID and rep history
+            if frames >= self.duplicate_frames and older_id in self.tracks:
+                self.tracks.pop(newer_id, None)
+        self._overlaps = {pair: frames for pair, frames in overlaps.items()
+                          if pair[0] in self.tracks and pair[1] in self.tracks}
+
+    def _process_track(self, track: PersonTrack, frame_bgr):
+        features, landmarks = track.estimator.process(frame_bgr, box=track.box)
+        if landmarks is not None and track.estimator.roi_box is not None:
+            track.box = track.estimator.roi_box
+        return features, landmarks
+
+    # ---------- Per-frame ----------
+
+    def process(self, frame_bgr, timestamp: Optional[float] = None) -> List[PersonResult]:
+        """timestamp: frame capture / video time in seconds (see update_multi_rep_state)."""
+        if self._start_time is None:
+            self._start_time = time.perf_counter()
+
+        if not self.tracks or self.frames % self.detect_every == 0:
+            self._associate(self.detector.detect(frame_bgr))
+        self.frames += 1
+
+        tracks = sorted(self.tracks.values(), key=lambda t: t.track_id)
+        futures = [self.pool.submit(self._process_track, t, frame_bgr) for t in tracks]
+
+        results = []
+        for track, future in zip(tracks, futures):
+            features, landmarks = future.result()
+
+            completed_reps = []
+            if landmarks is None:
+                track.misses += 1
+            else:
+                track.misses = 0
+                if features is not None:
+                    completed_reps = update_multi_rep_state(
+                        track.multi_state, features, features["confidence_frame"], self.exercise_hint,
+                        timestamp=timestamp,
+                    )
+                    for rep in completed_reps:
+                        rep["person_id"] = track.track_id
+
+            results.append(PersonResult(track.track_id, track.box, features, landmarks, completed_reps))
+
+        for track in tracks:
+            if track.misses > self.max_misses:
+                del self.tracks[track.track_id]
+        self._drop_duplicates()
+
+        self.person_frames += len(tracks)
+        return results
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._start_time if self._start_time else 0.0
+        fps = self.frames / elapsed if elapsed > 0 else 0.0
+        return {
+            "frames": self.frames,
+            "fps": round(fps, 1),
+            "active_tracks": len(self.tracks),
+            "avg_persons": round(self.person_frames / max(self.frames, 1), 2),
+            # throughput in persons × fps
+            "person_fps": round(self.person_frames / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    # python multi_person.py class.mp4 --exercise squat --workers 4
+    parser = argparse.ArgumentParser(description="Multi-person rep counting on a video.")
+    parser.add_argument("video")
+    parser.add_argument("--exercise", default="squat")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--detect-every", type=int, default=15)
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    tracker = MultiPersonTracker(args.exercise, args.workers, args.detect_every)
+    try:
+        frame_index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            # Video time, not wall time → rep durations don't depend on processing speed
+            timestamp = video_frame_timestamp(cap, frame_index, fps)
+            frame_index += 1
+            for person in tracker.process(frame, timestamp):
+                for rep in person.completed_reps:
+                    print(f"person {person.track_id}: rep {rep['rep_id']} ({rep['duration_s']:.2f}s)")
+    finally:
+        cap.release()
+        tracker.close()
+
+    print("Throughput:", tracker.stats())
@@ -0,0 +1,375 @@
+# client/offline.py
+#
+# Run the pose pipeline over recorded video files instead of the webcam.
+# No window is ever opened and frames are decoded as fast as the CPU allows.
+
+import os
+import json
+import time
+import hashlib
+import inspect
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from pose_utils import PoseEstimator, NUM_LANDMARKS, confidence_landmarks, frame_features
+from rep_logic import segment_reps, stack_features
+
+
+def video_frame_timestamp(cap, frame_index, fps):
+    """Seconds since the start of the video for the frame just read."""
+    pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+    if pos_ms > 0 or frame_index == 0:
+        return pos_ms / 1000.0
+    # Some containers don't report POS_MSEC → fall back to nominal fps
+    return frame_index / fps if fps > 0 else 0.0
+
+
+def iter_video_features(path, pose_estimator=None, start_frame=0, end_frame=None):
+    """
+    Decode a video file and run PoseEstimator.process on every frame.
+
+    Yields (frame_index, timestamp_s, features, landmark_array) per frame:
+      - features: dict from PoseEstimator.process, or None if no pose found
+      - landmark_array: (33, 4) float32 copy of the landmark buffer, or None
+
+    start_frame / end_frame (exclusive) select a slice of the video.
+    """
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {path}")
+
+    if pose_estimator is None:
+        pose_estimator = PoseEstimator()
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    try:
+        if start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+        frame_index = start_frame
+        while end_frame is None or frame_index < end_frame:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            timestamp = video_frame_timestamp(cap, frame_index, fps)
+            features, landmarks = pose_estimator.process(frame)
+            landmark_array = (
+                pose_estimator.landmark_buffer.copy() if landmarks else None
+            )
+
+            yield frame_index, timestamp, features, landmark_array
+            frame_index += 1
+    finally:
+        cap.release()
+
+
+
+# ----------------- Parallel segment-sharded extraction -----------------
+
+def _process_segment(args):
+    """
+    Worker: run a fresh PoseEstimator over one segment of the video.
+
+    Starts warmup_frames early so MediaPipe's tracking state has converged by
+    the time we reach the segment boundary; warm-up rows are dropped.
+    """
+    path, start_frame, end_frame, warmup_frames, estimator_kwargs = args
+    warm_start = max(0, start_frame - warmup_frames)
+    pose_estimator = PoseEstimator(**estimator_kwargs)
+
+    rows = []
+    for row in iter_video_features(path, pose_estimator, warm_start, end_frame):
+        if row[0] >= start_frame:
+            rows.append(row)
+    return rows
+
+
+def video_frame_count(path):
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {path}")
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return n_frames
+
+
+def iter_video_features_parallel(path, workers=None, warmup_frames=15, segment_frames=None,
+                                 estimator_kwargs=None):
+    """
+    Same output as iter_video_features, but the video is split into time
+    segments processed by a pool of worker processes (one PoseEstimator each).
+
+    Segments are yielded back in frame order. By default each worker gets one
+    segment; pass segment_frames for finer-grained load balancing.
+    estimator_kwargs are forwarded to each worker's PoseEstimator.
+    """
+    workers = workers or os.cpu_count() or 1
+    estimator_kwargs = estimator_kwargs or {}
+    n_frames = video_frame_count(path)
+
+    if segment_frames is None:
+        segment_frames = -(-n_frames // workers) if n_frames > 0 else 0
+    if workers == 1 or segment_frames <= 0:
+        yield from iter_video_features(path, PoseEstimator(**estimator_kwargs))
+        return
+
+    bounds = list(range(0, n_frames, segment_frames))
+    tasks = []
+    for i, start in enumerate(bounds):
+        # Last segment reads to EOF in case FRAME_COUNT was an underestimate
+        end = bounds[i + 1] if i + 1 < len(bounds) else None
+        tasks.append((str(path), start, end, warmup_frames, estimator_kwargs))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rows in pool.map(_process_segment, tasks):
+            yield from rows
+
+
+# ----------------- On-disk landmark cache -----------------
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai_fitness", "landmarks")
+
+# Bump when the cached array layout or landmark semantics change
+CACHE_VERSION = 1
+
+# PoseEstimator settings that change the landmarks themselves. Gating
+# (primary_joint / min_confidence) only decides which frames get features,
+# so it is applied on load and one cache entry serves every exercise.
+LANDMARK_SETTINGS = ("roi", "roi_padding", "max_input_side", "model_complexity",
+                     "auto_complexity", "target_frame_ms")
+
+
+def video_content_hash(path, chunk_size=1 << 20):
+    """sha256 of the video file bytes (so renamed/copied files still hit the cache)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cached_content_hash(path, cache_dir=None):
+    """
+    video_content_hash, remembered in cache_dir per (path, size, mtime) so a
+    cache hit on a big video doesn't read the whole file first. A file that
+    was modified or replaced gets hashed again.
+    """
+    if cache_dir is None:
+        return video_content_hash(path)
+
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    index_path = os.path.join(cache_dir, "content_hashes.json")
+    try:
+        with open(index_path) as f:
+            hashes = json.load(f)
+    except (FileNotFoundError, ValueError):
+        hashes = {}
+
+    real_path = os.path.realpath(path)
+    entry = hashes.get(real_path)
+    if entry is not None and entry["stat"] == stamp:
+        return entry["sha256"]
+
+    digest = video_content_hash(path)
+    hashes[real_path] = {"stat": stamp, "sha256": digest}
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(hashes, f, indent=2)
+    os.replace(index_path + ".tmp", index_path)
+    return digest
+
+
+def landmark_cache_key(path, estimator_kwargs=None, cache_dir=None):
+    """
+    Cache key from video content + landmark-affecting PoseEstimator settings +
+    MediaPipe version. With cache_dir the content hash is reused while the
+    file's size and mtime are unchanged (see cached_content_hash).
+    """
+    # Fill in PoseEstimator defaults so None / {} / explicit defaults share a key
+    estimator = {
+        name: param.default
+        for name, param in inspect.signature(PoseEstimator.__init__).parameters.items()
+        if name in LANDMARK_SETTINGS
+    }
+    estimator.update((name, value) for name, value in (estimator_kwargs or {}).items()
+                     if name in LANDMARK_SETTINGS)
+
+    settings = {
+        "version": CACHE_VERSION,
+        "mediapipe": mp.__version__,
+        "estimator": estimator,
+    }
+    h = hashlib.sha256(cached_content_hash(path, cache_dir).encode())
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    return h.hexdigest()[:32], settings
+
+
+def _cache_paths(cache_dir, key):
+    base = os.path.join(cache_dir, key)
+    return base + ".landmarks.npy", base + ".timestamps.npy", base + ".json"
+
+
+def _write_cache(cache_dir, key, settings, path, frame_iter):
+    """Drain frame_iter into .npy files; frames without a pose are stored as NaN."""
+    timestamps = []
+    landmarks = []
+    for _, timestamp, _, landmark_array in frame_iter:
+        timestamps.append(timestamp)
+        landmarks.append(landmark_array if landmark_array is not None
+                         else np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    lm_path, ts_path, meta_path = _cache_paths(cache_dir, key)
+    arrays = (
+        (lm_path, np.asarray(landmarks, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 4)),
+        (ts_path, np.asarray(timestamps, dtype=np.float64)),
+    )
+    # Write to temp names and rename, so a killed run never leaves a half cache.
+    # The .json goes last and marks the entry as complete.
+    for dst, arr in arrays:
+        tmp = dst + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, dst)
+
+    meta = dict(settings, video=os.path.abspath(path), n_frames=len(timestamps))
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def load_cached_landmarks(path, estimator_kwargs=None, cache_dir=DEFAULT_CACHE_DIR, key=None):
+    """
+    Memory-mapped (timestamps (N,), landmarks (N, 33, 4)) for a video, or None
+    on a cache miss. Frames without a pose are NaN rows. Pass key if you
+    already have it from landmark_cache_key.
+    """
+    if key is None:
+        key, _ = landmark_cache_key(path, estimator_kwargs, cache_dir)
+    lm_path, ts_path, meta_path = _cache_paths(cache_dir, key)
+    if not os.path.exists(meta_path):
+        return None
+    return np.load(ts_path, mmap_mode="r"), np.load(lm_path, mmap_mode="r")
+
+
+def iter_cached_video_features(path, estimator_kwargs=None, cache_dir=DEFAULT_CACHE_DIR,
+                               workers=1):
+    """
+    Same output as iter_video_features, served from the on-disk cache.
+
+    On a miss the video is processed once (in parallel if workers > 1) and the
+    landmarks are saved; later runs only recompute features from the
+    memory-mapped arrays. landmark_array rows are read-only views.
+    Confidence gating uses the primary_joint / min_confidence in estimator_kwargs,
+    same as the live PoseEstimator.
+    """
+    key, settings = landmark_cache_key(path, estimator_kwargs, cache_dir)
+    cached = load_cached_landmarks(path, cache_dir=cache_dir, key=key)
+    if cached is None:
+        frame_iter = iter_video_features_parallel(path, workers, estimator_kwargs=estimator_kwargs)
+        _write_cache(cache_dir, key, settings, path, frame_iter)
+        cached = load_cached_landmarks(path, cache_dir=cache_dir, key=key)
+
+    timestamps, landmarks = cached
+    detected = ~np.isnan(landmarks[:, 0, 0])
+    work = np.empty((NUM_LANDMARKS + 3, 2), dtype=np.float64)
+    estimator_kwargs = estimator_kwargs or {}
+    confidence_indices = confidence_landmarks(estimator_kwargs.get("primary_joint"))
+    min_confidence = estimator_kwargs.get("min_confidence", 0.0)
+
+    for i in range(len(timestamps)):
+        if not detected[i]:
+            yield i, float(timestamps[i]), None, None
+            continue
+        landmark_array = landmarks[i]
+        features = frame_features(landmark_array, work, confidence_indices, min_confidence)
+        yield i, float(timestamps[i]), features, landmark_array
+
+
+def score_reps(frame_iter, exercise):
+    """
+    Rep summaries for a whole recording in one segment_reps call.
+    Frames without features are skipped, same as the live loop.
+    """
+    timestamps, frames = [], []
+    for _, ts, features, _ in frame_iter:
+        if features is not None:
+            timestamps.append(ts)
+            frames.append(features)
+    confidence = np.array([f.get("confidence_frame", 0.0) for f in frames], dtype=np.float64)
+    return segment_reps(stack_features(frames), confidence, np.array(timestamps), exercise)
+
+
+def _run(frame_iter):
+    start = time.perf_counter()
+    n_frames = 0
+    n_detected = 0
+    for _, _, features, _ in frame_iter:
+        n_frames += 1
+        n_detected += features is not None
+    return n_frames, n_detected, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # python offline.py workout.mp4 [--workers N] [--compare]
+    parser = argparse.ArgumentParser(description="Extract pose features from a recorded video.")
+    parser.add_argument("video")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (>1 enables segment-sharded mode)")
+    parser.add_argument("--warmup", type=int, default=15,
+                        help="overlapping warm-up frames per segment")
+    parser.add_argument("--compare", action="store_true",
+                        help="also run single-process and report the speed-up")
+    parser.add_argument("--roi", action="store_true",
+                        help="crop inference to the tracked athlete")
+    parser.add_argument("--max-input-side", type=int, default=None,
+                        help="downsize MediaPipe input to this longest side (pixels)")
+    parser.add_argument("--model-complexity", type=int, default=1, choices=(0, 1, 2))
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_DIR, default=None,
+                        metavar="DIR", help="read/write the landmark cache (default dir: %(const)s)")
+    parser.add_argument("--exercise", default=None,
+                        help="also segment reps for this exercise and print the summaries")
+    args = parser.parse_args()
+
+    estimator_kwargs = {
+        "roi": args.roi,
+        "max_input_side": args.max_input_side,
+        "model_complexity": args.model_complexity,
+    }
+    if args.cache:
+        frame_iter = iter_cached_video_features(args.video, estimator_kwargs, args.cache,
+                                                args.workers)
+    elif args.workers > 1:
+        frame_iter = iter_video_features_parallel(args.video, args.workers, args.warmup,
+                                                  estimator_kwargs=estimator_kwargs)
+    else:
+        frame_iter = iter_video_features(args.video, PoseEstimator(**estimator_kwargs))
+    n_frames, n_detected, elapsed = _run(frame_iter)
+
+    print(f"{args.video}: {n_frames} frames ({n_detected} with pose) "
+          f"in {elapsed:.1f}s → {n_frames / max(elapsed, 1e-9):.1f} fps "
+          f"[workers={args.workers}]")
+
+    if args.exercise:
+        # Second pass over the same source; with --cache this is memory-mapped
+        if args.cache:
+            frame_iter = iter_cached_video_features(args.video, estimator_kwargs, args.cache)
+        else:
+            frame_iter = iter_video_features(args.video, PoseEstimator(**estimator_kwargs))
+        start = time.perf_counter()
+        reps = score_reps(frame_iter, args.exercise)
+        for rep_summary in reps:
+            print(rep_summary)
+        print(f"{len(reps)} {args.exercise} reps ({time.perf_counter() - start:.2f}s incl. features)")
+
+    if args.compare and args.workers > 1:
+        _, _, serial_elapsed = _run(iter_video_features(args.video, PoseEstimator(**estimator_kwargs)))
+        print(f"single-process: {serial_elapsed:.1f}s → "
+              f"speed-up {serial_elapsed / max(elapsed, 1e-9):.2f}x on {args.workers} workers")
@@ -0,0 +1,173 @@
+# client/overlay.py
+
+"""
+Render layer for the windowed demo.
+
+- SkeletonRenderer: draws the pose from the (33, 4) landmark buffer with one
+  cv2.polylines call for the bones and one scatter of a pre-rasterized joint
+  stamp (white border + fill, as draw_landmarks draws them) for the joints,
+  using drawing specs built once at import instead of two new DrawingSpecs per frame.
+- HudLayer: HUD text (exercise, rep counters, coaching line, timings) is
+  rasterized into a cached overlay + mask, re-rendered only when the text
+  changes, and composited onto each frame with a single masked copy.
+"""
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+mp_drawing = mp.solutions.drawing_utils
+mp_pose = mp.solutions.pose
+
+# Built once, same look as the old per-frame specs
+LANDMARK_SPEC = mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2)
+CONNECTION_SPEC = mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
+
+# Same cut-off and joint border colour MediaPipe's draw_landmarks uses
+VISIBILITY_THRESHOLD = 0.5
+WHITE = mp_drawing.WHITE_COLOR
+
+# (K, 2) landmark index pairs for the bones
+POSE_CONNECTIONS = np.array(sorted(mp_pose.POSE_CONNECTIONS), dtype=np.intp)
+
+
+# ----------------- Skeleton -----------------
+
+def _circle_offsets(radius, thickness):
+    """(k, 2) (dy, dx) offsets of the pixels cv2.circle draws around its centre."""
+    c = radius + abs(thickness)
+    stamp = np.zeros((2 * c + 1, 2 * c + 1), dtype=np.uint8)
+    cv2.circle(stamp, (c, c), radius, 255, thickness)
+    return np.argwhere(stamp) - c
+
+
+class SkeletonRenderer:
+    """
+    Bones + joints from a pixel-space (33, 4) landmark array, with no per-landmark
+    Python loop except for joints at the frame edge.
+
+    Joints look like draw_landmarks': a white border circle with the landmark
+    colour drawn over it. Both circles are rasterized once into one stamp of
+    pixel offsets, scattered onto every visible joint with a single assignment.
+    cv2 rasterizes a circle clipped by the frame edge slightly differently, so
+    the few joints that close to the edge get the two cv2.circle calls instead.
+    """
+
+    def __init__(self, landmark_spec=LANDMARK_SPEC, connection_spec=CONNECTION_SPEC,
+                 connections=POSE_CONNECTIONS):
+        self.connections = connections
+        self.bone_color = connection_spec.color
+        self.bone_thickness = connection_spec.thickness
+
+        radius, thickness = landmark_spec.circle_radius, landmark_spec.thickness
+        border_radius = max(radius + 1, int(radius * 1.2))
+        # (radius, colour, thickness) of draw_landmarks' two cv2.circle calls per joint
+        self._joint_circles = ((border_radius, WHITE, thickness),
+                               (radius, landmark_spec.color, thickness))
+        # Joints closer than this to the frame edge are drawn with cv2.circle
+        self._edge_margin = border_radius + abs(thickness) + 1
+        border = _circle_offsets(border_radius, thickness)
+        fill = _circle_offsets(radius, thickness)
+        # Border first, then fill: per joint, later pixels win like later cv2 calls
+        self._joint_offsets = np.concatenate([border, fill])
+        self._joint_colors = np.array([WHITE] * len(border) + [landmark_spec.color] * len(fill),
+                                      dtype=np.uint8)
+
+        n_landmarks = int(connections.max()) + 1
+        self._pixels = np.empty((n_landmarks, 2), dtype=np.int32)
+
+    def draw(self, image, points):
+        """points: (33, 4) x/y in pixels, z, visibility — e.g. PoseEstimator.landmark_buffer."""
+        h, w = image.shape[:2]
+        pixels = self._pixels
+        xy = points[:len(pixels), :2]
+        # Same landmarks and pixels as draw_landmarks: points off the frame or
+        # below the visibility cut-off are skipped (with their bones), the rest
+        # truncated to the pixel they fall in
+        visible = ((points[:len(pixels), 3] >= VISIBILITY_THRESHOLD)
+                   & (xy[:, 0] >= 0) & (xy[:, 0] <= w) & (xy[:, 1] >= 0) & (xy[:, 1] <= h))
+        np.floor(xy, out=pixels, casting="unsafe", where=visible[:, None])
+        np.minimum(pixels, (w - 1, h - 1), out=pixels)
+
+        keep = visible[self.connections].all(axis=1)
+        if keep.any():
+            bones = pixels[self.connections[keep]]          # (k, 2, 2)
+            cv2.polylines(image, bones, False, self.bone_color,
+                          self.bone_thickness, cv2.LINE_8)
+
+        if visible.any():
+            centres = pixels[visible]
+            m = self._edge_margin
+            near_edge = ((centres < m) | (centres >= (w - m, h - m))).any(axis=1)
+            # Landmark order throughout: stamp runs between the near-edge joints
+            start = 0
+            for i in np.flatnonzero(near_edge):
+                self._stamp_joints(image, centres[start:i])
+                centre = (int(centres[i, 0]), int(centres[i, 1]))
+                for radius, color, thickness in self._joint_circles:
+                    cv2.circle(image, centre, radius, color, thickness)
+                start = i + 1
+            self._stamp_joints(image, centres[start:])
+        return image
+
+    def _stamp_joints(self, image, centres):
+        """Joint stamp at every (x, y) centre, all at least _edge_margin inside the frame."""
+        if len(centres) == 0:
+            return
+        offsets = self._joint_offsets
+        ys = (centres[:, 1, None] + offsets[:, 0]).ravel()
+        xs = (centres[:, 0, None] + offsets[:, 1]).ravel()
+        colors = np.broadcast_to(self._joint_colors, (len(centres),) + self._joint_colors.shape)
+        # Repeated pixels keep the last value, i.e. joint order like draw_landmarks
+        image[ys, xs] = colors.reshape(-1, 3)
+
+
+# ----------------- HUD -----------------
+
+class HudLayer:
+    """
+    Cached text overlay. set_lines() takes a tuple of
+    (text, (x, y), font, scale, color, thickness) entries; the overlay is only
+    re-rasterized when that tuple differs from the last one.
+    """
+
+    def __init__(self):
+        self._lines = None
+        self._overlay = None
+        self._mask = None
+        self._roi = None          # (x0, y0, x1, y1) around all drawn pixels
+        self.renders = 0
+
+    def _ensure_shape(self, shape):
+        if self._overlay is None or self._overlay.shape != shape:
+            self._overlay = np.zeros(shape, dtype=np.uint8)
+            self._mask = np.zeros(shape[:2], dtype=np.uint8)
+            self._lines = None
+
+    def set_lines(self, shape, lines):
+        self._ensure_shape(shape)
+        if lines == self._lines:
+            return False
+
+        overlay, mask = self._overlay, self._mask
+        overlay.fill(0)
+        mask.fill(0)
+        for text, org, font, scale, color, thickness in lines:
+            cv2.putText(overlay, text, org, font, scale, color, thickness)
+            cv2.putText(mask, text, org, font, scale, 255, thickness)
+
+        # Only the rows/cols that have text get composited each frame
+        x, y, w, h = cv2.boundingRect(mask)
+        self._roi = (x, y, x + w, y + h) if w and h else None
+        self._lines = lines
+        self.renders += 1
+        return True
+
+    def composite(self, image):
+        """Copy the cached text pixels onto image in place."""
+        if self._roi is None:
+            return image
+        x0, y0, x1, y1 = self._roi
+        dst = image[y0:y1, x0:x1]
+        cv2.copyTo(self._overlay[y0:y1, x0:x1], self._mask[y0:y1, x0:x1], dst)
+        return image
@@ -1,11 +1,16 @@
 import cv2
 import os
+import sys
+import time
+from collections import deque
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 # os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 
 import mediapipe as mp
 import numpy as np
 
+from stage_timer import NULL_TIMER
+
 mp_pose = mp.solutions.pose
 
 def angle_between(a, b, c):
@@ -25,83 +30,423 @@ def angle_between(a, b, c):
     angle = np.degrees(np.arccos(cosang))
     return float(angle)
 
+
+# ----------------- Landmark indices (MediaPipe Pose, 33 points) -----------------
+NUM_LANDMARKS = 33
+
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# Virtual midpoints appended after the 33 real landmarks
+MID_SHOULDER, MID_HIP, MID_ANKLE = 33, 34, 35
+_MID_LEFT = np.array([LEFT_SHOULDER, LEFT_HIP, LEFT_ANKLE], dtype=np.intp)
+_MID_RIGHT = np.array([RIGHT_SHOULDER, RIGHT_HIP, RIGHT_ANKLE], dtype=np.intp)
+
+# (a, b, c) triplets -> angle at b. Row order matches the unpacking in compute_features.
+FEATURE_TRIPLETS = np.array([
+    [LEFT_HIP, LEFT_KNEE, LEFT_ANKLE],                # left knee
+    [RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE],             # right knee
+    [LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST],          # left elbow
+    [RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST],       # right elbow
+    [MID_SHOULDER, MID_HIP, MID_ANKLE],               # torso
+    [LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE],             # left hip
+    [RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE],          # right hip
+], dtype=np.intp)
+
+
+# Landmarks whose visibility decides whether a frame is usable
+CONFIDENCE_LANDMARKS = {
+    "knee": np.array([LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE,
+                      LEFT_ANKLE, RIGHT_ANKLE], dtype=np.intp),
+    "elbow": np.array([LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW,
+                       LEFT_WRIST, RIGHT_WRIST], dtype=np.intp),
+}
+FEATURE_LANDMARKS = np.unique(FEATURE_TRIPLETS[FEATURE_TRIPLETS < NUM_LANDMARKS])
+
+
+def confidence_landmarks(primary_joint=None):
+    """Landmark indices to average visibility over for an exercise's primary joint."""
+    return CONFIDENCE_LANDMARKS.get(primary_joint, FEATURE_LANDMARKS)
+
+
+def joint_angles(points, triplets):
+    """
+    Vectorized angle_between for many joints at once.
+
+    points:   (N, 2|3) array of landmark coordinates
+    triplets: (K, 3) int array of (a, b, c) row indices into points
+    Returns a (K,) array of angles in degrees at each b.
+    """
+    a = points[triplets[:, 0]]
+    b = points[triplets[:, 1]]
+    c = points[triplets[:, 2]]
+
+    v1 = a - b
+    v2 = c - b
+
+    dot = np.einsum("ij,ij->i", v1, v2)
+    norms = np.sqrt(np.einsum("ij,ij->i", v1, v1) * np.einsum("ij,ij->i", v2, v2))
+    cosang = np.clip(dot / (norms + 1e-8), -1.0, 1.0)
+    return np.degrees(np.arccos(cosang))
+
+
+def compute_features(points, work=None):
+    """
+    Per-frame features from a (33, 2+) array of landmark pixel coords (x, y first).
+    Returns the same features dict as PoseEstimator.process.
+
+    work: optional (36, 2) float64 scratch array, reused to avoid per-frame allocation.
+    """
+    if work is None:
+        work = np.empty((NUM_LANDMARKS + 3, 2), dtype=np.float64)
+    work[:NUM_LANDMARKS] = points[:NUM_LANDMARKS, :2]
+    # Shoulder / hip / ankle midlines for torso lean
+    work[NUM_LANDMARKS:] = (work[_MID_LEFT] + work[_MID_RIGHT]) * 0.5
+
+    (left_knee_angle, right_knee_angle,
+     left_elbow_angle, right_elbow_angle,
+     torso_angle,
+     left_hip_angle, right_hip_angle) = joint_angles(work, FEATURE_TRIPLETS).tolist()
+
+    torso_dev = 180 - torso_angle  # deviation from vertical
+
+    # Center hip Y for depth
+    center_hip_y = float(work[MID_HIP, 1])
+
+    return {
+        "knee_min_angle_frame": min(left_knee_angle, right_knee_angle),
+        "elbow_min_angle_frame": min(left_elbow_angle, right_elbow_angle),
+        "torso_dev_frame": torso_dev,
+        "center_hip_y": center_hip_y,
+        "left_knee_angle_frame": left_knee_angle,
+        "right_knee_angle_frame": right_knee_angle,
+        "left_elbow_angle_frame": left_elbow_angle,
+        "right_elbow_angle_frame": right_elbow_angle,
+        "left_hip_angle_frame": left_hip_angle,
+        "right_hip_angle_frame": right_hip_angle,
+    }
+
+
+def frame_features(points, work=None, confidence_indices=FEATURE_LANDMARKS, min_confidence=0.0):
+    """
+    compute_features with visibility gating, for a (33, 4) landmark array.
+
+    Frame confidence is the mean visibility of confidence_indices. Below
+    min_confidence we return None without doing any feature math, so occluded
+    frames are cheap and never reach the rep state machine.
+    """
+    confidence = float(points[confidence_indices, 3].mean())
+    if confidence < min_confidence:
+        return None
+
+    features = compute_features(points, work)
+    features["confidence_frame"] = confidence
+    return features
+
+
+# ----------------- model_complexity auto-tuning -----------------
+
+class ComplexityAutoTuner:
+    """
+    Picks MediaPipe model_complexity (0 = lite, 1 = full, 2 = heavy) to hold a
+    target inference time per frame.
+
+    Decisions use the median latency over a rolling window, which is cleared
+    after every switch. Hysteresis:
+      - step down when p50 > target * downgrade_ratio
+      - step up only when p50 < target * upgrade_ratio (the next model is
+        roughly 2x slower, so this must be well under 0.5)
+      - after stepping down from a level, retrying it is blocked for a
+        back-off period that doubles on every downgrade
+    """
+
+    def __init__(self, target_ms=33.0, initial=1, window=30,
+                 upgrade_ratio=0.4, downgrade_ratio=1.1):
+        self.target_ms = target_ms
+        self.complexity = initial
+        self.upgrade_ratio = upgrade_ratio
+        self.downgrade_ratio = downgrade_ratio
+
+        self.latencies = deque(maxlen=window)
+        self.history = []           # one dict per switch
+        self.frames = 0
+        self._blocked_until = {}    # level → frame count before we may retry it
+        self._unavailable = set()   # levels whose model failed to load
+        self._backoff = window * 4
+
+    def record(self, latency_ms):
+        """Add one inference latency. Returns the new complexity if we should switch, else None."""
+        self.frames += 1
+        self.latencies.append(latency_ms)
+        if len(self.latencies) < self.latencies.maxlen:
+            return None
+
+        p50 = float(np.median(self.latencies))
+        new = None
+        down = self.complexity - 1
+        up = self.complexity + 1
+        if (p50 > self.target_ms * self.downgrade_ratio and down >= 0
+                and down not in self._unavailable):
+            new = down
+            self._blocked_until[self.complexity] = self.frames + self._backoff
+            self._backoff *= 2
+        elif (p50 < self.target_ms * self.upgrade_ratio and up <= 2
+              and up not in self._unavailable
+              and self.frames >= self._blocked_until.get(up, 0)):
+            new = up
+
+        if new is None:
+            return None
+
+        self.history.append({
+            "frame": self.frames,
+            "from": self.complexity,
+            "to": new,
+            "p50_ms": round(p50, 2),
+        })
+        self.complexity = new
+        self.latencies.clear()
+        return new
+
+    def mark_unavailable(self, level, previous):
+        """The model for level could not be loaded → undo the switch and never retry it."""
+        if self.history and self.history[-1]["to"] == level:
+            self.history.pop()
+        self._unavailable.add(level)
+        self.complexity = previous
+
+    def stats(self):
+        lat = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "complexity": self.complexity,
+            "target_ms": self.target_ms,
+            "p50_ms": round(float(np.percentile(lat, 50)), 2),
+            "p95_ms": round(float(np.percentile(lat, 95)), 2),
+            "frames": self.frames,
+            "switches": list(self.history),
+        }
+
+
 class PoseEstimator:
-    def __init__(self):
-        self.pose = mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-        )
-
-    def process(self, frame_bgr):
+    def __init__(self, roi=False, roi_padding=0.25, max_input_side=None,
+                 model_complexity=1, auto_complexity=False, target_frame_ms=33.0,
+                 primary_joint=None, min_confidence=0.0):
+        """
+        roi:              crop inference to a padded box around the previous frame's
+                          landmarks (falls back to the full frame when tracking is lost)
+        roi_padding:      box padding as a fraction of the landmark extent
+        max_input_side:   downsize the image sent to MediaPipe so its longest side is
+                          at most this many pixels (None → send at native resolution)
+        model_complexity: initial MediaPipe model (0, 1, 2)
+        auto_complexity:  hot-swap model_complexity to hold target_frame_ms of
+                          inference per frame (see ComplexityAutoTuner)
+        primary_joint:    "knee" / "elbow" → which landmarks' visibility sets the
+                          frame confidence (None → all landmarks used by features)
+        min_confidence:   frames below this confidence return no features
+
+        Features are always reported in full-frame pixel coordinates, so
+        thresholds like hip range don't change with ROI or input resolution.
+        """
+        self.model_complexity = model_complexity
+        self._pose_models = {}
+        self.pose = self._get_pose_model(model_complexity)
+
+        # Per-stage latency spans (swap in a StageTimer to profile)
+        self.timer = NULL_TIMER
+
+        self.confidence_indices = confidence_landmarks(primary_joint)
+        self.min_confidence = min_confidence
+
+        self.complexity_tuner = None
+        if auto_complexity:
+            self.complexity_tuner = ComplexityAutoTuner(target_frame_ms, initial=model_complexity)
+
+        self.roi = roi
+        self.roi_padding = roi_padding
+        self.max_input_side = max_input_side
+        # (x0, y0, x1, y1) in full-frame pixels, None → full frame
+        self.roi_box = None
+
+        # Reused every frame: (x, y, z, visibility) per landmark, x/y/z in pixels
+        self.landmark_buffer = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._landmark_flat = self.landmark_buffer.reshape(-1)      # view, same memory
+        self._landmark_view = memoryview(self._landmark_flat)      # cheap float stores
+        self._scale = np.ones(4, dtype=np.float32)
+        self._work = np.empty((NUM_LANDMARKS + 3, 2), dtype=np.float64)
+        # Resize / RGB images handed to MediaPipe, reused while the input shape is stable
+        self._image_buffers = {}
+
+    def _fill_landmark_buffer(self, lm, w, h):
+        """Copy MediaPipe landmarks into landmark_buffer in place."""
+        buf, flat = self.landmark_buffer, self._landmark_view
+        # Each attribute lands in its slot of the reused buffer: no temporary
+        # array or per-landmark tuples per frame (see bench.py extract)
+        i = 0
+        for p in lm:
+            flat[i] = p.x
+            flat[i + 1] = p.y
+            flat[i + 2] = p.z
+            flat[i + 3] = p.visibility
+            i += 4
+        self._scale[:3] = (w, h, w)
+        buf *= self._scale
+        return buf
+
+    def _get_pose_model(self, complexity):
+        """One mp_pose.Pose per complexity, created on first use and kept for swaps back."""
+        if complexity not in self._pose_models:
+            self._pose_models[complexity] = mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=complexity,
+                enable_segmentation=False,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5,
+            )
+        return self._pose_models[complexity]
+
+    def _set_complexity(self, complexity):
+        try:
+            pose = self._get_pose_model(complexity)
+        except Exception as e:
+            # e.g. heavy model not downloadable → stay where we are.
+            # stderr: headless mode streams JSON on stdout
+            print(f"Could not load model_complexity={complexity}:", e, file=sys.stderr)
+            self.complexity_tuner.mark_unavailable(complexity, self.model_complexity)
+            return
+        self.pose = pose
+        self.model_complexity = complexity
+
+    # ----------------- ROI / input resolution -----------------
+
+    def _image_buffer(self, name, shape):
+        """Preallocated uint8 image, reallocated only when the shape changes."""
+        buf = self._image_buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = self._image_buffers[name] = np.empty(shape, dtype=np.uint8)
+        buf.flags.writeable = True
+        return buf
+
+    def _run_pose(self, frame_bgr, box):
+        """Crop to box, downsize if needed, convert to RGB and run MediaPipe."""
+        x0, y0, x1, y1 = box
+        view = frame_bgr[y0:y1, x0:x1]
+
+        side = max(view.shape[0], view.shape[1])
+        if self.max_input_side and side > self.max_input_side:
+            s = self.max_input_side / side
+            size = (max(1, round(view.shape[1] * s)), max(1, round(view.shape[0] * s)))
+            resized = self._image_buffer("resized", (size[1], size[0], 3))
+            with self.timer.span("resize"):
+                view = cv2.resize(view, size, dst=resized, interpolation=cv2.INTER_AREA)
+
+        rgb = self._image_buffer("rgb", view.shape)
+        with self.timer.span("cvtColor"):
+            cv2.cvtColor(view, cv2.COLOR_BGR2RGB, dst=rgb)
+        # Read-only input lets MediaPipe take the buffer by reference instead of copying
+        rgb.flags.writeable = False
+        if self.complexity_tuner is None:
+            with self.timer.span("pose.process"):
+                return self.pose.process(rgb)
+
+        start = time.perf_counter()
+        with self.timer.span("pose.process"):
+            results = self.pose.process(rgb)
+        new = self.complexity_tuner.record((time.perf_counter() - start) * 1000.0)
+        if new is not None:
+            self._set_complexity(new)
+        return results
+
+    @staticmethod
+    def _map_to_frame(lm, box, w, h):
+        """Rewrite crop-normalized landmarks in place as full-frame-normalized."""
+        x0, y0, x1, y1 = box
+        sx = (x1 - x0) / w
+        sy = (y1 - y0) / h
+        ox = x0 / w
+        oy = y0 / h
+        for p in lm:
+            p.x = ox + p.x * sx
+            p.y = oy + p.y * sy
+            p.z *= sx
+
+    def _update_roi(self, points, w, h):
+        """
+        Pick the crop box for the next frame from this frame's landmarks.
+        The box is sticky: it only moves once the body gets near its edge,
+        so MediaPipe's own tracking sees a stable image most of the time.
+        """
+        visible = points[:, 3] > 0.5
+        xy = points[visible, :2] if visible.any() else points[:, :2]
+        lo = xy.min(axis=0)
+        hi = xy.max(axis=0)
+
+        span = float(max(hi[0] - lo[0], hi[1] - lo[1]))
+        pad = self.roi_padding * span
+
+        old = self.roi_box
+        if old is not None:
+            m = pad * 0.5
+            inside = (lo[0] >= old[0] + m and lo[1] >= old[1] + m and
+                      hi[0] <= old[2] - m and hi[1] <= old[3] - m)
+            # Keep it unless the athlete has moved away and the box is now oversized
+            if inside and max(old[2] - old[0], old[3] - old[1]) <= 2 * (span + 2 * pad):
+                return
+
+        x0 = max(0, int(lo[0] - pad))
+        y0 = max(0, int(lo[1] - pad))
+        x1 = min(w, int(hi[0] + pad) + 1)
+        y1 = min(h, int(hi[1] + pad) + 1)
+
+        if x1 - x0 < 32 or y1 - y0 < 32:
+            self.roi_box = None
+        else:
+            self.roi_box = (x0, y0, x1, y1)
+
+    def process(self, frame_bgr, box=None):
         """
         Input: BGR frame from OpenCV.
+          - box: optional (x0, y0, x1, y1) region to run on (e.g. one person in a
+            group). Unlike ROI mode there is no full-frame fallback.
         Output:
-          - features: dict with numeric values for this frame
+          - features: dict with numeric values for this frame, or None if not
+            detected or below min_confidence
           - landmarks: pose_landmarks (for drawing), or None if not detected
+
+        On a detection, self.landmark_buffer holds this frame's (33, 4) array.
+        It is overwritten on the next call, so copy it if you need to keep it.
         """
         h, w, _ = frame_bgr.shape
-        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(rgb)
+        full_box = (0, 0, w, h)
+        fallback = box is None
+        if box is None:
+            box = self.roi_box if (self.roi and self.roi_box) else full_box
+
+        results = self._run_pose(frame_bgr, box)
+
+        if not results.pose_landmarks and fallback and box != full_box:
+            # Lost the athlete inside the crop → retry this frame on the full image
+            box = full_box
+            results = self._run_pose(frame_bgr, box)
 
         if not results.pose_landmarks:
+            self.roi_box = None
             return None, None
 
-        lm = results.pose_landmarks.landmark
-
-        def pt(idx):
-            p = lm[idx]
-            return (p.x * w, p.y * h), p.visibility
-
-        # Hips / knees / ankles
-        left_hip, _ = pt(23)
-        right_hip, _ = pt(24)
-        left_knee, _ = pt(25)
-        right_knee, _ = pt(26)
-        left_ankle, _ = pt(27)
-        right_ankle, _ = pt(28)
-
-        # Shoulders / elbows / wrists
-        left_shoulder, _ = pt(11)
-        right_shoulder, _ = pt(12)
-        left_elbow, _ = pt(13)
-        right_elbow, _ = pt(14)
-        left_wrist, _ = pt(15)
-        right_wrist, _ = pt(16)
-
-        # Knee angles
-        left_knee_angle = angle_between(left_hip, left_knee, left_ankle)
-        right_knee_angle = angle_between(right_hip, right_knee, right_ankle)
-        knee_min = min(left_knee_angle, right_knee_angle)
-
-        # Elbow angles
-        left_elbow_angle = angle_between(left_shoulder, left_elbow, left_wrist)
-        right_elbow_angle = angle_between(right_shoulder, right_elbow, right_wrist)
-        elbow_min = min(left_elbow_angle, right_elbow_angle)
-
-        # Torso lean using shoulder-hip-ankle midline
-        mid_shoulder = ((left_shoulder[0] + right_shoulder[0]) / 2,
-                        (left_shoulder[1] + right_shoulder[1]) / 2)
-        mid_hip = ((left_hip[0] + right_hip[0]) / 2,
-                   (left_hip[1] + right_hip[1]) / 2)
-        mid_ankle = ((left_ankle[0] + right_ankle[0]) / 2,
-                     (left_ankle[1] + right_ankle[1]) / 2)
-
-        torso_angle = angle_between(mid_shoulder, mid_hip, mid_ankle)
-        torso_dev = 180 - torso_angle  # deviation from vertical
-
-        # Center hip Y for depth
-        center_hip_y = mid_hip[1]
-
-        features = {
-            "knee_min_angle_frame": knee_min,
-            "elbow_min_angle_frame": elbow_min,
-            "torso_dev_frame": torso_dev,
-            "center_hip_y": center_hip_y,
-            "left_knee_angle_frame": float(left_knee_angle),
-            "right_knee_angle_frame": float(right_knee_angle),
-        }
+        with self.timer.span("landmarks"):
+            lm = results.pose_landmarks.landmark
+            if box != full_box:
+                self._map_to_frame(lm, box, w, h)
+
+            points = self._fill_landmark_buffer(lm, w, h)
+            if self.roi:
+                self._update_roi(points, w, h)
+
+        with self.timer.span("features"):
+            features = frame_features(points, self._work, self.confidence_indices,
+                                      self.min_confidence)
 
         return features, results.pose_landmarks
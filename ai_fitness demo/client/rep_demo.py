@@ -1,19 +1,30 @@
 # # client/rep_demo.py
 
+import sys
+import json
 import time
+import socket
+import argparse
 import cv2
-import mediapipe as mp
 import requests
 import pyttsx3
 from threading import Thread
 from queue import Queue
-
-from pose_utils import PoseEstimator
-from rep_logic import MultiRepState, update_multi_rep_state, get_exercise_config
-
-# MediaPipe drawing helpers
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
+from functools import partial
+
+from pose_utils import PoseEstimator, confidence_landmarks
+from frame_pool import FramePool
+from capture import LatestFrameCapture
+from stage_timer import StageTimer, NULL_TIMER
+from overlay import SkeletonRenderer, HudLayer
+from frame_scheduler import AdaptivePoseScheduler
+from rep_logic import MultiRepState, get_exercise_config, EXERCISE_CONFIG
+from replay import FeatureRecorder
+from offline import video_frame_timestamp
+from exercise_classifier import (
+    ExerciseRecognizer, AutoExerciseTracker, load_index, DEFAULT_INDEX_PATH,
+)
+from calibration import ProfileStore, CalibratedTracker, user_tracker, DEFAULT_PROFILE_DIR
 
 # ---------- Exercise options ----------
 EXERCISE_OPTIONS = {
@@ -22,17 +33,50 @@ EXERCISE_OPTIONS = {
     "3": "bicep_curl",
     "4": "lunge",
     "5": "mountain_climber",
+    "6": "auto",
 }
 
+# "auto": recognize the exercise from the pose stream (circuits, no setup)
+AUTO_EXERCISE = "auto"
+
 # Backend (FastAPI) endpoint
 BACKEND_URL = "http://127.0.0.1:8000/analyze_rep"
 
+# Skip pose inference on slow/still frames (see frame_scheduler.py)
+ADAPTIVE_INFERENCE = False
+
+# Hot-swap MediaPipe model_complexity to hold this inference time (None → fixed model 1)
+TARGET_INFERENCE_MS = None
+
+# Per-stage latency spans; press 't' to toggle the p50/p95/p99 overlay.
+# Summary is written to PROFILE_DUMP_PATH (.json or .csv) on exit.
+PROFILE_STAGES = False
+PROFILE_DUMP_PATH = "stage_timings.json"
+
 # ---------- Queue for background LLM calls ----------
 rep_queue: Queue = Queue()     # completed reps to send to backend
 
 # Global overlay from last LLM response
 last_coaching_message: str = ""
 
+# Headless mode: rep / coaching events go here instead of the window
+event_sink = None
+
+# Whether llm_worker is running (reps are only queued when it is)
+coaching_enabled: bool = True
+
+# --record PATH: every tracked frame's (timestamp, features), for replay.py
+feature_recorder = None
+record_path = None
+
+# kNN index for --exercise auto (see exercise_classifier.py build)
+exercise_index_path = DEFAULT_INDEX_PATH
+
+# --user NAME: per-user thresholds from profile_store (calibrated on first use)
+user_id = None
+profile_store = None
+recalibrate = False
+
 
 def choose_exercise():
     print("Select exercise to track:")
@@ -41,12 +85,37 @@ def choose_exercise():
     print("  3. Bicep Curl")
     print("  4. Lunge")
     print("  5. Mountain Climber")
-    choice = input("Enter 1, 2, 3, 4, or 5: ").strip()
+    print("  6. Auto-detect (circuits)")
+    choice = input("Enter 1, 2, 3, 4, 5, or 6: ").strip()
     exercise = EXERCISE_OPTIONS.get(choice, "squat")
     print(f"\nYou selected: {exercise}\n")
     return exercise
 
 
+# ---------- Event sink (headless mode) ----------
+
+class EventSink:
+    """
+    JSON-lines events for headless runs: one object per line on stdout, or
+    one datagram each to a local UDP socket ("host:port").
+    """
+
+    def __init__(self, udp_addr=None):
+        self.sock = None
+        self.addr = None
+        if udp_addr:
+            host, port = udp_addr.rsplit(":", 1)
+            self.addr = (host, int(port))
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def emit(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False)
+        if self.sock is not None:
+            self.sock.sendto(line.encode("utf-8"), self.addr)
+        else:
+            print(line, flush=True)
+
+
 # ---------- TTS helper (per-message thread) ----------
 
 def speak_message(text: str):
@@ -88,6 +157,13 @@ def llm_worker():
                 msg = data.get("message", "")
                 if msg:
                     last_coaching_message = msg
+                    if event_sink is not None:
+                        event_sink.emit({
+                            "type": "coaching",
+                            "rep_id": rep_summary.get("rep_id"),
+                            "limb_id": rep_summary.get("limb_id"),
+                            "message": msg,
+                        })
 
                     # 🔊 Speak in a separate short-lived thread
                     Thread(
@@ -96,45 +172,169 @@ def llm_worker():
                         daemon=True
                     ).start()
             else:
-                print("LLM worker backend error:", resp.status_code, resp.text)
+                print("LLM worker backend error:", resp.status_code, resp.text, file=sys.stderr)
         except Exception as e:
-            print("LLM worker exception:", e)
+            print("LLM worker exception:", e, file=sys.stderr)
         finally:
             rep_queue.task_done()
 
 
-def main():
+def build_pose_pipeline(current_exercise):
+    """PoseEstimator for this exercise, optionally wrapped in the adaptive scheduler."""
+    exercise_cfg = get_exercise_config(current_exercise)
+    estimator = PoseEstimator(
+        auto_complexity=TARGET_INFERENCE_MS is not None,
+        target_frame_ms=TARGET_INFERENCE_MS or 33.0,
+        primary_joint=exercise_cfg["primary_joint"],
+        min_confidence=exercise_cfg["min_confidence"],
+    )
+    pose_estimator = estimator
+    if ADAPTIVE_INFERENCE:
+        pose_estimator = AdaptivePoseScheduler(estimator, current_exercise)
+    return estimator, pose_estimator
+
+
+def make_auto_tracker(current_exercise):
+    """AutoExerciseTracker for --exercise auto, else None (fixed exercise)."""
+    if current_exercise != AUTO_EXERCISE:
+        return None
+    return AutoExerciseTracker(ExerciseRecognizer(load_index(exercise_index_path)),
+                               partial(user_tracker, profile_store, user_id))
+
+
+def make_rep_counter(current_exercise):
+    """
+    Fixed-exercise rep counting: the user's thresholds, calibrated on the
+    first reps if their profile has none yet (shared thresholds without --user).
+    """
+    return CalibratedTracker(current_exercise, profile_store, user_id, recalibrate)
+
+
+def use_exercise(estimator, pose_estimator, exercise):
+    """Point an existing pose pipeline at a newly recognized exercise (no model reload)."""
+    cfg = get_exercise_config(exercise)
+    estimator.confidence_indices = confidence_landmarks(cfg["primary_joint"])
+    estimator.min_confidence = cfg["min_confidence"]
+    if pose_estimator is not estimator:
+        pose_estimator.max_skip_frames = cfg["max_skip_frames"]
+        pose_estimator.skip_fast_speed = cfg["skip_fast_speed"]
+
+
+def handle_completed_reps(completed_reps):
+    """Log / emit each completed rep and queue odd reps for coaching."""
+    for rep_summary in completed_reps:
+        rep_id = int(rep_summary.get("rep_id", 0))
+        limb_id = rep_summary.get("limb_id", "global")
+
+        if event_sink is not None:
+            event_sink.emit(dict(rep_summary, type="rep"))
+        else:
+            print(f"=== REP COMPLETED (limb={limb_id}, rep_id={rep_id}) ===")
+            print("Rep summary:", rep_summary)
+
+        # Only send odd reps to backend + voice
+        if coaching_enabled and rep_id % 2 == 1:
+            rep_queue.put(rep_summary)   # returns instantly
+
+
+def hud_lines(current_exercise, multi_state, coaching_message, frame_shape, timing_lines=(),
+              status=""):
+    """HUD text entries for HudLayer.set_lines(); equal tuples mean nothing to redraw."""
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    lines = [(f"Exercise: {current_exercise or 'detecting...'}", (20, 30), font, 0.7,
+              (200, 255, 200), 2)]
+
+    limbs = get_exercise_config(current_exercise)["limbs"]
+    if limbs == ["global"]:
+        state = multi_state.limb_states.get("global")
+        reps = state.rep_id if state else 0
+        lines.append((f"Reps: {reps}", (20, 60), font, 0.9, (0, 255, 0), 2))
+    else:
+        left_state = multi_state.limb_states.get("left")
+        right_state = multi_state.limb_states.get("right")
+        left_reps = left_state.rep_id if left_state else 0
+        right_reps = right_state.rep_id if right_state else 0
+        lines.append((f"Left reps:  {left_reps}", (20, 60), font, 0.7, (0, 255, 0), 2))
+        lines.append((f"Right reps: {right_reps}", (20, 90), font, 0.7, (0, 255, 0), 2))
+        lines.append((f"Total reps: {left_reps + right_reps}", (20, 120), font, 0.7, (0, 255, 255), 2))
+
+    if status:
+        lines.append((status, (20, 150), font, 0.6, (255, 200, 0), 2))
+
+    if coaching_message:
+        lines.append((coaching_message, (20, frame_shape[0] - 30), font, 0.7, (0, 200, 255), 2))
+
+    for i, line in enumerate(timing_lines):
+        lines.append((line, (frame_shape[1] - 520, 30 + 22 * i),
+                      cv2.FONT_HERSHEY_PLAIN, 1.1, (255, 255, 255), 1))
+    return tuple(lines)
+
+
+def save_recording(current_exercise, thresholds=None):
+    if feature_recorder is not None and record_path:
+        feature_recorder.save(record_path, current_exercise, thresholds)
+        print(f"Recorded {len(feature_recorder.timestamps)} frames to {record_path}", file=sys.stderr)
+
+
+def main(current_exercise=None, source=0):
     global last_coaching_message
 
     # 1) Choose exercise
-    current_exercise = choose_exercise()
+    if current_exercise is None:
+        current_exercise = choose_exercise()
 
-    # 2) Start camera
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("Error: Could not open camera.")
+    # 2) Open the source: a camera keeps only its newest frame (capture thread),
+    #    a video file plays every frame in order with the file's timestamps
+    is_camera = isinstance(source, int)
+    capture_stats = {}
+    try:
+        frame_iter = iter_source_frames(source, capture_stats)
+    except IOError as exc:
+        print(f"Error: {exc}.")
         return
 
     # 3) Init pose estimator & multi-rep state
-    pose_estimator = PoseEstimator()
+    auto_tracker = make_auto_tracker(current_exercise)
+    if auto_tracker is not None:
+        current_exercise = None
+    estimator, pose_estimator = build_pose_pipeline(current_exercise)
+    if auto_tracker is not None:
+        # every feature landmark counts until we know which joint matters
+        estimator.confidence_indices = confidence_landmarks(None)
+    else:
+        rep_counter = make_rep_counter(current_exercise)
     multi_state = MultiRepState()
+    frame_pool = FramePool()
+    skeleton = SkeletonRenderer()
+    hud = HudLayer()
+
+    timer = StageTimer() if PROFILE_STAGES else NULL_TIMER
+    estimator.timer = timer
+    show_timings = False
+    timing_lines = []
+    frame_count = 0
 
     # 4) Start background LLM worker
-    Thread(target=llm_worker, daemon=True).start()
+    if coaching_enabled:
+        Thread(target=llm_worker, daemon=True).start()
 
-    # 5) 5-second countdown before tracking
-    countdown_seconds = 5
+    # 5) 5-second countdown before tracking (a recording needs no time to get ready)
+    countdown_seconds = 5 if is_camera else 0
     countdown_start = time.time()
-    countdown_done = False
+    countdown_done = countdown_seconds <= 0
 
-    print(f"Get into position... starting in {countdown_seconds} seconds.")
+    if not countdown_done:
+        print(f"Get into position... starting in {countdown_seconds} seconds.")
 
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        # Next frame + when it was captured (a camera skips stale frames)
+        with timer.span("capture"):
+            frame, frame_time = next(frame_iter, (None, None))
+        if frame is None:
             break
 
-        display_frame = frame.copy()
+        with timer.span("display_copy"):
+            display_frame = frame_pool.display_copy(frame)
 
         # ---------- PHASE 1: Countdown ----------
         if not countdown_done:
@@ -159,116 +359,267 @@ def main():
             continue
 
         # ---------- PHASE 2: Pose + rep tracking ----------
-        features, landmarks = pose_estimator.process(frame)
+        with timer.span("pose"):
+            if ADAPTIVE_INFERENCE:
+                features, landmarks = pose_estimator.process(frame, timestamp=frame_time)
+            else:
+                features, landmarks = pose_estimator.process(frame)
 
         # Draw skeleton if we have landmarks
         if landmarks:
-            mp_drawing.draw_landmarks(
-                display_frame,
-                landmarks,
-                mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=mp_drawing.DrawingSpec(
-                    color=(0, 255, 0), thickness=2, circle_radius=2
-                ),
-                connection_drawing_spec=mp_drawing.DrawingSpec(
-                    color=(255, 0, 0), thickness=2
-                ),
-            )
+            with timer.span("draw_landmarks"):
+                skeleton.draw(display_frame, pose_estimator.landmark_buffer)
 
         # If we have features → update rep logic
         if features is not None:
-            avg_confidence = 0.95  # could compute from visibility if you want
-
-            completed_reps = update_multi_rep_state(
-                multi_state,
-                features,
-                avg_confidence,
-                current_exercise
-            )
-
-            # ------- Overlays for exercise + reps -------
-            cfg = get_exercise_config(current_exercise)
-            limbs = cfg["limbs"]
-
-            cv2.putText(display_frame,
-                        f"Exercise: {current_exercise}",
-                        (20, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        (200, 255, 200),
-                        2)
-
-            if limbs == ["global"]:
-                state = multi_state.limb_states.get("global")
-                reps = state.rep_id if state else 0
-                cv2.putText(display_frame,
-                            f"Reps: {reps}",
-                            (20, 60),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.9,
-                            (0, 255, 0),
-                            2)
-            else:
-                left_state = multi_state.limb_states.get("left")
-                right_state = multi_state.limb_states.get("right")
-                left_reps = left_state.rep_id if left_state else 0
-                right_reps = right_state.rep_id if right_state else 0
-                total_reps = left_reps + right_reps
-
-                cv2.putText(display_frame,
-                            f"Left reps:  {left_reps}",
-                            (20, 60),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.7,
-                            (0, 255, 0),
-                            2)
-                cv2.putText(display_frame,
-                            f"Right reps: {right_reps}",
-                            (20, 90),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.7,
-                            (0, 255, 0),
-                            2)
-                cv2.putText(display_frame,
-                            f"Total reps: {total_reps}",
-                            (20, 120),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.7,
-                            (0, 255, 255),
-                            2)
+            # Mean visibility of this exercise's landmarks (low frames never get here)
+            avg_confidence = features["confidence_frame"]
+            if feature_recorder is not None:
+                feature_recorder.append(frame_time, features)
+
+            with timer.span("rep_logic"):
+                if auto_tracker is not None:
+                    completed_reps = auto_tracker.update(features, avg_confidence, frame_time)
+                    multi_state = auto_tracker.multi_state
+                    if auto_tracker.exercise != current_exercise:
+                        current_exercise = auto_tracker.exercise
+                        use_exercise(estimator, pose_estimator, current_exercise)
+                        print(f"Detected exercise: {current_exercise}")
+                else:
+                    was_calibrating = rep_counter.calibrating
+                    completed_reps = rep_counter.update(features, avg_confidence, frame_time)
+                    multi_state = rep_counter.multi_state
+                    if was_calibrating and not rep_counter.calibrating:
+                        if rep_counter.timed_out:
+                            print(f"Calibration of {current_exercise} for {user_id} timed out, "
+                                  f"using the shared thresholds")
+                        else:
+                            print(f"Calibrated {current_exercise} for {user_id}: {rep_counter.status()}")
 
             # ---------- Handle completed reps (non-blocking) ----------
             # completed_reps is a list of rep_summary dicts
-            for rep_summary in completed_reps:
-                rep_id = int(rep_summary.get("rep_id", 0))
-                limb_id = rep_summary.get("limb_id", "global")
-
-                print(f"=== REP COMPLETED (limb={limb_id}, rep_id={rep_id}) ===")
-                print("Rep summary:", rep_summary)
-
-                # Only send odd reps to backend + voice
-                if rep_id % 2 == 1:
-                    rep_queue.put(rep_summary)   # returns instantly
-
-        # ---------- Coaching message overlay ----------
-        if last_coaching_message:
-            cv2.putText(display_frame,
-                        last_coaching_message,
-                        (20, display_frame.shape[0] - 30),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        (0, 200, 255),
-                        2)
-
-        cv2.imshow("AI Fitness - Technometics Demo", display_frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+            handle_completed_reps(completed_reps)
+
+        # ---------- Stage timing overlay (toggle with 't') ----------
+        frame_count += 1
+        if show_timings:
+            if frame_count % 30 == 0 or not timing_lines:
+                timing_lines = timer.overlay_lines()
+        else:
+            timing_lines = []
+
+        # ------- HUD: exercise, reps, coaching, timings -------
+        # Re-rasterized only when a counter / message changes, then one masked copy
+        with timer.span("hud"):
+            hud.set_lines(display_frame.shape,
+                          hud_lines(current_exercise, multi_state, last_coaching_message,
+                                    display_frame.shape, timing_lines,
+                                    rep_counter.status() if auto_tracker is None else ""))
+            hud.composite(display_frame)
+
+        with timer.span("imshow"):
+            cv2.imshow("AI Fitness - Technometics Demo", display_frame)
+            key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
             break
+        if key == ord('t') and timer.enabled:
+            show_timings = not show_timings
 
-    cap.release()
+    frame_iter.close()
     cv2.destroyAllWindows()
+    if auto_tracker is None:
+        handle_completed_reps(rep_counter.finish())
+    if capture_stats:
+        print(f"Capture: {capture_stats['captured']} frames, "
+              f"{capture_stats['dropped']} dropped as stale")
+    # an auto session may span several exercises → no single label to save
+    if auto_tracker is None:
+        save_recording(current_exercise, rep_counter.thresholds)
+    else:
+        save_recording(None)
+
+    if timer.enabled:
+        timer.dump(PROFILE_DUMP_PATH)
+        print(f"Stage timings written to {PROFILE_DUMP_PATH}")
+
+    if estimator.complexity_tuner is not None:
+        print("Model complexity tuning:", estimator.complexity_tuner.stats())
+
+
+# ---------- Frame sources ----------
+
+def iter_capture(capture):
+    """(frame, capture_time) from a started LatestFrameCapture until the camera stops."""
+    while True:
+        frame, frame_time = capture.read()
+        if frame is None:
+            return
+        yield frame, frame_time
+
+
+def iter_source_frames(source, capture_stats=None):
+    """
+    (frame, capture_time) pairs, for both the window and headless mode:
+      - camera index → newest-frame-wins capture thread, monotonic capture times
+      - video path   → every frame, as fast as we can decode, file timestamps
+    The source is opened here (IOError if it can't be) and released when the
+    iterator is exhausted or closed. For a camera, capture_stats (a dict) then
+    gets its "captured" / "dropped" frame counts.
+    """
+    kind = "camera" if isinstance(source, int) else "video"
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open {kind} {source}")
+    if kind == "camera":
+        return _camera_frames(cap, capture_stats)
+    return _video_frames(cap)
+
+
+def _camera_frames(cap, capture_stats):
+    capture = LatestFrameCapture(cap).start()
+    try:
+        yield from iter_capture(capture)
+    finally:
+        capture.stop()
+        cap.release()
+        if capture_stats is not None:
+            capture_stats.update(captured=capture.captured, dropped=capture.dropped)
+
+
+def _video_frames(cap):
+    pool = FramePool()
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_index = 0
+    try:
+        while True:
+            frame = pool.read(cap)
+            if frame is None:
+                break
+            yield frame, video_frame_timestamp(cap, frame_index, fps)
+            frame_index += 1
+    finally:
+        cap.release()
+
+
+# ---------- Headless mode ----------
+
+def run_headless(current_exercise, source=0, countdown_seconds=0):
+    """
+    Same pose + rep pipeline as main(), with no window, skeleton or text
+    rendering. Rep and coaching events go to event_sink (stdout by default).
+    """
+    global event_sink
+    if event_sink is None:
+        event_sink = EventSink()
+
+    auto_tracker = make_auto_tracker(current_exercise)
+    estimator, pose_estimator = build_pose_pipeline(
+        None if auto_tracker is not None else current_exercise)
+    if auto_tracker is not None:
+        estimator.confidence_indices = confidence_landmarks(None)
+    else:
+        rep_counter = make_rep_counter(current_exercise)
+    if coaching_enabled:
+        Thread(target=llm_worker, daemon=True).start()
+
+    event_sink.emit({"type": "start", "exercise": current_exercise, "source": str(source)})
+    if auto_tracker is not None:
+        current_exercise = None
+    if countdown_seconds > 0:
+        time.sleep(countdown_seconds)
+
+    frames = 0
+    start = time.perf_counter()
+    for frame, frame_time in iter_source_frames(source):
+        frames += 1
+        if ADAPTIVE_INFERENCE:
+            features, _ = pose_estimator.process(frame, timestamp=frame_time)
+        else:
+            features, _ = pose_estimator.process(frame)
+        if features is None:
+            continue
+        if feature_recorder is not None:
+            feature_recorder.append(frame_time, features)
+
+        if auto_tracker is not None:
+            completed_reps = auto_tracker.update(features, features["confidence_frame"], frame_time)
+            if auto_tracker.exercise != current_exercise:
+                current_exercise = auto_tracker.exercise
+                use_exercise(estimator, pose_estimator, current_exercise)
+                event_sink.emit({"type": "exercise", "exercise": current_exercise,
+                                 "t": round(frame_time, 3)})
+        else:
+            was_calibrating = rep_counter.calibrating
+            completed_reps = rep_counter.update(features, features["confidence_frame"], frame_time)
+            if was_calibrating and not rep_counter.calibrating:
+                if rep_counter.timed_out:
+                    event_sink.emit({"type": "calibration_timeout", "exercise": current_exercise,
+                                     "user": user_id, "fallback": "shared",
+                                     "t": round(frame_time, 3)})
+                else:
+                    event_sink.emit({"type": "calibrated", "exercise": current_exercise,
+                                     "user": user_id, "thresholds": rep_counter.thresholds})
+        handle_completed_reps(completed_reps)
+
+    elapsed = time.perf_counter() - start
+    if auto_tracker is None:
+        handle_completed_reps(rep_counter.finish())
+    if auto_tracker is None:
+        save_recording(current_exercise, rep_counter.thresholds)
+    else:
+        save_recording(None)
+    if coaching_enabled:
+        rep_queue.join()     # let pending coaching calls finish before we exit
+    event_sink.emit({
+        "type": "end",
+        "frames": frames,
+        "fps": round(frames / elapsed, 1) if elapsed > 0 else 0.0,
+    })
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI fitness rep tracking demo.")
+    parser.add_argument("--exercise", choices=sorted(EXERCISE_CONFIG) + [AUTO_EXERCISE],
+                        help="skip the interactive exercise prompt ('auto' = recognize it)")
+    parser.add_argument("--exercise-index", default=DEFAULT_INDEX_PATH, metavar="PATH.npz",
+                        help="kNN index for --exercise auto (exercise_classifier.py build)")
+    parser.add_argument("--source", default="0", help="camera index or video file path")
+    parser.add_argument("--headless", action="store_true",
+                        help="no window / overlay; emit JSON events instead")
+    parser.add_argument("--events-udp", metavar="HOST:PORT",
+                        help="headless: send events to this UDP address instead of stdout")
+    parser.add_argument("--countdown", type=float, default=0.0,
+                        help="headless: seconds to wait before tracking")
+    parser.add_argument("--no-coaching", action="store_true",
+                        help="don't call the backend / TTS")
+    parser.add_argument("--user", default=None,
+                        help="per-user rep thresholds (calibrated on the first reps, then reused)")
+    parser.add_argument("--recalibrate", action="store_true",
+                        help="with --user: calibrate again even if a profile exists")
+    parser.add_argument("--profiles", default=DEFAULT_PROFILE_DIR, metavar="DIR",
+                        help="where per-user profiles are stored")
+    parser.add_argument("--record", metavar="PATH.npz",
+                        help="save per-frame timestamps + features for replay.py")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    source = int(args.source) if args.source.isdigit() else args.source
+    coaching_enabled = not args.no_coaching
+    exercise_index_path = args.exercise_index
+    if args.user:
+        user_id = args.user
+        profile_store = ProfileStore(args.profiles)
+        recalibrate = args.recalibrate
+    if args.record:
+        feature_recorder = FeatureRecorder()
+        record_path = args.record
+
+    if args.headless:
+        event_sink = EventSink(args.events_udp)
+        run_headless(args.exercise or "squat", source, args.countdown)
+    else:
+        main(args.exercise, source)
 
 
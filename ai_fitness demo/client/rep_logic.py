@@ -1,33 +1,214 @@
 # client/rep_logic.py 
 
 import time
+import math
+import bisect
 import numpy as np
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 
-@dataclass
-class SingleLimbState:
-    state: str = "EXTENDED"          # "EXTENDED" or "FLEXED"
-    rep_id: int = 0
-    rep_start_time: Optional[float] = None
+class RunningStats:
+    """Streaming min / max / sum / count of one per-frame value — O(1) memory."""
+
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def start(self, value: float):
+        self.count = 1
+        self.total = value
+        self.min = value
+        self.max = value
 
-    hip_positions: list = field(default_factory=list)
-    knee_angles: list = field(default_factory=list)
-    elbow_angles: list = field(default_factory=list)
-    torso_devs: list = field(default_factory=list)
-    confidences: list = field(default_factory=list)
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
 
-    last_rep_end_time: Optional[float] = None
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+# ----------------- Movement smoothness -----------------
+
+# Jerk = third finite difference of the limb's flex angle at this lag (frames).
+# Lag 1 at 30 fps is dominated by landmark jitter; 3 (~0.1 s) still resolves
+# fast reps like mountain climbers.
+JERK_LAG = 3
+_JERK_SPAN = 3 * JERK_LAG + 1
+
+# Dimensionless jerk (∫ jerk² dt · D⁵ / A²) of a perfectly smooth sin² rep
+SMOOTH_JERK_REF = (2.0 * math.pi) ** 6 / 8.0
+
+
+class JerkMeter:
+    """
+    Ring of the last 3 * JERK_LAG + 1 (angle, time) samples for one limb.
+    push() returns this frame's jerk² · dt (0.0 until the ring is full), so a
+    rep's ∫ jerk² dt is a running sum — O(1) time and memory per frame.
+    record() + value() is the same split in two, for callers that only need
+    the jerk on some frames (an idle side of an alternating exercise).
+    """
+
+    __slots__ = ("_x", "_t", "_i", "_n")
+
+    def __init__(self):
+        self._x = [0.0] * _JERK_SPAN
+        self._t = [0.0] * _JERK_SPAN
+        self._i = 0
+        self._n = 0
+
+    def record(self, x: float, t: float):
+        i = self._i
+        self._x[i] = x
+        self._t[i] = t
+        self._i = (i + 1) % _JERK_SPAN
+        if self._n < _JERK_SPAN:
+            self._n += 1
+
+    def value(self) -> float:
+        """jerk² · dt at the newest recorded sample."""
+        if self._n < _JERK_SPAN:
+            return 0.0
+
+        # i is the newest sample, i + 1 (mod span) the oldest
+        i = self._i - 1
+        xs, ts = self._x, self._t
+        x = xs[i]
+        x1 = xs[i - JERK_LAG]
+        x2 = xs[i - 2 * JERK_LAG]
+        x3 = xs[i - 3 * JERK_LAG]
+        h = (ts[i] - ts[i - 3 * JERK_LAG]) / (3 * JERK_LAG)
+        if h <= 0.0:
+            return 0.0
+        step = JERK_LAG * h
+        jerk = (x - 3.0 * x1 + 3.0 * x2 - x3) / (step * step * step)
+        return jerk * jerk * h
+
+    def push(self, x: float, t: float) -> float:
+        self.record(x, t)
+        return self.value()
+
+
+def movement_smoothness(jerk_sq_total: float, duration: float, amplitude: float) -> float:
+    """
+    0..1 score from a rep's ∫ jerk² dt (bigger = smoother). The normalized
+    jerk ∫ jerk² dt · D⁵ / A² doesn't depend on rep speed or depth; a smooth
+    sin² rep scores 1.0 and every 10x more jerk roughly halves the gap to 0.
+    """
+    if duration <= 0.0 or amplitude <= 0.0:
+        return 1.0
+    ratio = jerk_sq_total * duration ** 5 / (amplitude * amplitude) / SMOOTH_JERK_REF
+    if ratio <= 1.0:
+        return 1.0
+    return 1.0 / (1.0 + 0.5 * math.log10(ratio))
+
+
+# Limb state machine states (ints: cheaper to compare than strings)
+EXTENDED = 0
+FLEXED = 1
+STATE_NAMES = ("EXTENDED", "FLEXED")
+
+
+class SingleLimbState:
+    """
+    Rep state for one limb. Per-rep metrics are running aggregates, so a long
+    hold (or a limb stuck in FLEXED by tracking noise) costs no extra memory.
+    """
+
+    __slots__ = (
+        "state",             # EXTENDED or FLEXED
+        "rep_id",
+        "rep_start_time",
+        "hip_y",             # RunningStats over the current rep
+        "knee_angle",
+        "elbow_angle",
+        "torso_dev",
+        "confidence",
+        "flex",              # driving flex angle → rep amplitude
+        "asymmetry",         # |left - right| primary-joint angle
+        "jerk",              # JerkMeter, runs across reps
+        "jerk_sq",           # ∫ jerk² dt over the current rep
+        "last_rep_end_time",
+    )
+
+    def __init__(self, state: int = EXTENDED, rep_id: int = 0,
+                 rep_start_time: Optional[float] = None,
+                 last_rep_end_time: Optional[float] = None):
+        self.state = state
+        self.rep_id = rep_id
+        self.rep_start_time = rep_start_time
+        self.hip_y = RunningStats()
+        self.knee_angle = RunningStats()
+        self.elbow_angle = RunningStats()
+        self.torso_dev = RunningStats()
+        self.confidence = RunningStats()
+        self.flex = RunningStats()
+        self.asymmetry = RunningStats()
+        self.jerk = JerkMeter()
+        self.jerk_sq = 0.0
+        self.last_rep_end_time = last_rep_end_time
+
+    def start_rep(self, center_hip_y, knee_min_angle, elbow_min_angle, torso_dev, avg_confidence,
+                  flex, asymmetry, jerk_sq):
+        self.hip_y.start(center_hip_y)
+        self.knee_angle.start(knee_min_angle)
+        self.elbow_angle.start(elbow_min_angle)
+        self.torso_dev.start(torso_dev)
+        self.confidence.start(avg_confidence)
+        self.flex.start(flex)
+        self.asymmetry.start(asymmetry)
+        self.jerk_sq = jerk_sq
+
+    def add_frame(self, center_hip_y, knee_min_angle, elbow_min_angle, torso_dev, avg_confidence,
+                  flex, asymmetry, jerk_sq):
+        self.hip_y.add(center_hip_y)
+        self.knee_angle.add(knee_min_angle)
+        self.elbow_angle.add(elbow_min_angle)
+        self.torso_dev.add(torso_dev)
+        self.confidence.add(avg_confidence)
+        self.flex.add(flex)
+        self.asymmetry.add(asymmetry)
+        self.jerk_sq += jerk_sq
+
+    def clear_rep(self):
+        self.rep_start_time = None
+        self.hip_y.clear()
+        self.knee_angle.clear()
+        self.elbow_angle.clear()
+        self.torso_dev.clear()
+        self.confidence.clear()
+        self.flex.clear()
+        self.asymmetry.clear()
+        self.jerk_sq = 0.0
+
+    @property
+    def state_name(self) -> str:
+        return STATE_NAMES[self.state]
+
+    def __repr__(self):
+        return (f"SingleLimbState(state={self.state_name}, rep_id={self.rep_id}, "
+                f"rep_start_time={self.rep_start_time}, frames_in_rep={self.confidence.count})")
 
 
 @dataclass
 class MultiRepState:
     """
     Holds a separate SingleLimbState for each logical limb:
-      - "global"  : whole-body reps (squats, pushups, curls, lunges, mountain climber)
-      - "left"    : left-side leg/arm  (for future alternating exercises)
-      - "right"   : right-side leg/arm (for future alternating exercises)
+      - "global"  : whole-body reps (squats, pushups, curls)
+      - "left"    : left-side leg/arm  (alternating exercises: lunges, mountain climbers)
+      - "right"   : right-side leg/arm
     """
     limb_states: Dict[str, SingleLimbState] = field(default_factory=dict)
 
@@ -40,9 +221,15 @@ EXERCISE_CONFIG: Dict[str, Dict[str, Any]] = {
         "flexed_threshold": 35.0,
         "extended_threshold": 15.0,
         "min_rep_duration": 0.20,
-        "min_rest_time": 0.08,
+        "min_rest_time": 0.08,          # unused: the cooldown after a rep is min_rep_duration
         "use_limb_delta": False,
         "limb_activation_delta": 0.0,
+        # adaptive inference rate (frame_scheduler): skip up to N frames when
+        # landmark speed (body lengths/s) is well below skip_fast_speed
+        "max_skip_frames": 2,
+        "skip_fast_speed": 2.0,
+        # frames whose primary-joint landmarks average below this visibility are dropped
+        "min_confidence": 0.5,
     },
     "pushup": {
         "limbs": ["global"],
@@ -50,9 +237,13 @@ EXERCISE_CONFIG: Dict[str, Dict[str, Any]] = {
         "flexed_threshold": 40.0,
         "extended_threshold": 20.0,
         "min_rep_duration": 0.18,
-        "min_rest_time": 0.08,
+        "min_rest_time": 0.08,          # unused: the cooldown after a rep is min_rep_duration
         "use_limb_delta": False,
         "limb_activation_delta": 0.0,
+        "max_skip_frames": 2,
+        "skip_fast_speed": 2.0,
+        # side-on view → far-side limbs are often half occluded
+        "min_confidence": 0.4,
     },
     "bicep_curl": {
         "limbs": ["global"],
@@ -60,33 +251,46 @@ EXERCISE_CONFIG: Dict[str, Dict[str, Any]] = {
         "flexed_threshold": 90.0,
         "extended_threshold": 20.0,
         "min_rep_duration": 0.15,
-        "min_rest_time": 0.06,
+        "min_rest_time": 0.06,          # unused: the cooldown after a rep is min_rep_duration
         "use_limb_delta": False,
         "limb_activation_delta": 0.0,
+        "max_skip_frames": 3,
+        "skip_fast_speed": 3.0,
+        "min_confidence": 0.5,
     },
     "lunge": {
-        "limbs": ["global"],
+        # Alternating: one rep per forward step, counted on the front leg's side
+        "limbs": ["left", "right"],
         "primary_joint": "knee",
         "flexed_threshold": 45.0,
         "extended_threshold": 20.0,
         "min_rep_duration": 0.22,
-        "min_rest_time": 0.10,
-        "use_limb_delta": False,
-        "limb_activation_delta": 0.0,
+        "min_rest_time": 0.10,          # unused: the cooldown after a rep is min_rep_duration
+        # Both knees bend in a lunge; the front leg is the one flexed at the hip
+        "use_limb_delta": True,
+        "limb_activation_delta": 25.0,
+        "gate_joint": "hip",
+        "max_skip_frames": 2,
+        "skip_fast_speed": 2.0,
+        "min_confidence": 0.5,
     },
     "mountain_climber": {
-        # Mountain climber: count 1 global rep per strong knee-drive cycle
-        "limbs": ["global"],
+        # Mountain climber: 1 rep per strong knee drive, counted per leg
+        "limbs": ["left", "right"],
         "primary_joint": "knee",
         # need decent knee drive to count rep
         "flexed_threshold": 50.0,       # stricter bend
         "extended_threshold": 25.0,     # back closer to straight
         # tuned for fast but not crazy-fast reps
         "min_rep_duration": 0.16,       # ignore ultra-tiny flicks
-        "min_rest_time": 0.08,          # short cooldown
-        # no per-leg gating in this version
-        "use_limb_delta": False,
-        "limb_activation_delta": 0.0,
+        "min_rest_time": 0.08,          # unused: the cooldown after a rep is min_rep_duration
+        # a leg only counts while its knee is clearly more bent than the other one
+        "use_limb_delta": True,
+        "limb_activation_delta": 20.0,
+        # fast knee drives → always run full-rate pose
+        "max_skip_frames": 0,
+        "skip_fast_speed": 1.0,
+        "min_confidence": 0.4,
     },
 }
 
@@ -96,9 +300,14 @@ DEFAULT_CONFIG = {
     "flexed_threshold": 35.0,
     "extended_threshold": 15.0,
     "min_rep_duration": 0.3,
-    "min_rest_time": 0.2,
+    "min_rest_time": 0.2,          # unused: the cooldown after a rep is min_rep_duration
     "use_limb_delta": False,
     "limb_activation_delta": 0.0,
+    # joint compared between sides for use_limb_delta (None = primary_joint)
+    "gate_joint": None,
+    "max_skip_frames": 1,
+    "skip_fast_speed": 2.0,
+    "min_confidence": 0.5,
 }
 
 
@@ -108,6 +317,234 @@ def get_exercise_config(exercise_name: Optional[str]) -> Dict[str, Any]:
     return DEFAULT_CONFIG
 
 
+# -------------------------------------------------------------
+# Compiled per-exercise trackers
+# -------------------------------------------------------------
+
+# Which flex drives a limb
+_GLOBAL, _LEFT, _RIGHT = 0, 1, 2
+_LIMB_SIDES = {"global": _GLOBAL, "left": _LEFT, "right": _RIGHT}
+
+# limb → (knee, elbow) feature keys its rep summary aggregates
+_LIMB_ANGLE_KEYS = {
+    "global": ("knee_min_angle_frame", "elbow_min_angle_frame"),
+    "left": ("left_knee_angle_frame", "left_elbow_angle_frame"),
+    "right": ("right_knee_angle_frame", "right_elbow_angle_frame"),
+}
+
+
+class ExerciseTracker:
+    """
+    One EXERCISE_CONFIG entry resolved up front: thresholds are plain
+    attributes, the primary joint's feature keys and each limb's driving
+    side are looked up once, and limb states are small ints.
+    Build with compile_tracker(); get_tracker() caches one per exercise
+    until clear_tracker_cache().
+    """
+
+    __slots__ = (
+        "exercise_hint",
+        "joint",                    # "knee" or "elbow": drives the reps
+        "gate_joint",               # compared between sides when use_limb_delta
+        "limbs",                    # ((limb_id, side, knee_key, elbow_key), ...)
+        "left_key",
+        "right_key",
+        "gate_left_key",
+        "gate_right_key",
+        "flexed_threshold",
+        "extended_threshold",
+        "min_rep_duration",
+        "use_limb_delta",
+        "limb_activation_delta",
+    )
+
+    def __init__(self, cfg: Dict[str, Any], exercise_hint: Optional[str] = None):
+        joint = "knee" if cfg["primary_joint"] == "knee" else "elbow"
+        gate_joint = cfg.get("gate_joint") or joint
+        self.exercise_hint = exercise_hint
+        self.joint = joint
+        self.gate_joint = gate_joint
+        # Side limbs report their own knee / elbow; "global" the more bent of the two
+        self.limbs = tuple(
+            (limb_id, _LIMB_SIDES[limb_id], *_LIMB_ANGLE_KEYS[limb_id]) for limb_id in cfg["limbs"]
+        )
+        self.left_key = f"left_{joint}_angle_frame"
+        self.right_key = f"right_{joint}_angle_frame"
+        self.gate_left_key = f"left_{gate_joint}_angle_frame"
+        self.gate_right_key = f"right_{gate_joint}_angle_frame"
+        self.flexed_threshold = cfg["flexed_threshold"]
+        self.extended_threshold = cfg["extended_threshold"]
+        self.min_rep_duration = cfg["min_rep_duration"]
+        self.use_limb_delta = cfg["use_limb_delta"]
+        self.limb_activation_delta = cfg["limb_activation_delta"]
+
+    def _flex(self, get) -> Tuple[List[Tuple[float, float]], float]:
+        """
+        (driving flex, gated flex) per limb in self.limbs order, and the
+        |left - right| primary-joint angle. The driving flex is the more bent
+        side for "global", a side's own flex for "left" / "right"; the gated
+        flex is what the thresholds see, 0.0 while use_limb_delta gates that
+        side off.
+        """
+        left_angle = get(self.left_key, 180.0)
+        right_angle = get(self.right_key, 180.0)
+        # Flex amounts: bigger = more bent
+        left_flex = 180.0 - left_angle
+        right_flex = 180.0 - right_angle
+
+        # Alternating-limb gating, once per frame for both sides: a side is
+        # only active while its gate joint is clearly more bent than the other's
+        left_active = right_active = True
+        if self.use_limb_delta:
+            left_gate = 180.0 - get(self.gate_left_key, 180.0)
+            right_gate = 180.0 - get(self.gate_right_key, 180.0)
+            left_active = not left_gate < right_gate + self.limb_activation_delta
+            right_active = not right_gate < left_gate + self.limb_activation_delta
+
+        flex = []
+        for limb in self.limbs:
+            side = limb[1]
+            if side == _GLOBAL:
+                # most bent side drives the rep (same result as max(), NaN included)
+                drive_flex = right_flex if right_flex > left_flex else left_flex
+                flex.append((drive_flex, drive_flex))
+            elif side == _LEFT:
+                # inactive → treat as straight so it can't cross flexed_threshold
+                flex.append((left_flex, left_flex if left_active else 0.0))
+            else:
+                flex.append((right_flex, right_flex if right_active else 0.0))
+        return flex, abs(left_angle - right_angle)
+
+    def update(
+        self,
+        multi_state: MultiRepState,
+        features: Dict[str, Any],
+        avg_confidence: float,
+        now: float,
+    ) -> List[Dict[str, Any]]:
+        """One frame for every limb; returns the reps completed on it."""
+        get = features.get
+        flex, asymmetry = self._flex(get)
+
+        limb_states = multi_state.limb_states
+        completed_reps: List[Dict[str, Any]] = []
+
+        for (limb_id, _, knee_key, elbow_key), (drive_flex, flex_amount) in zip(self.limbs, flex):
+            state = limb_states.get(limb_id)
+            if state is None:
+                state = limb_states[limb_id] = SingleLimbState()
+
+            # Smoothness sees every frame (ungated angle), so jerk is ready when a
+            # rep starts; it is only evaluated on frames that feed a rep
+            state.jerk.record(drive_flex, now)
+
+            # -----------------------------
+            # State machine per limb
+            # -----------------------------
+            if state.state == EXTENDED:
+                # Small cooldown after a rep
+                if (state.last_rep_end_time is not None
+                        and now - state.last_rep_end_time < self.min_rep_duration):
+                    continue
+
+                # Start rep when we bend enough
+                if flex_amount > self.flexed_threshold:
+                    state.state = FLEXED
+                    state.rep_start_time = now
+                    state.start_rep(get("center_hip_y", 0.0),
+                                    get(knee_key, 180.0),
+                                    get(elbow_key, 180.0),
+                                    get("torso_dev_frame", 0.0),
+                                    avg_confidence,
+                                    drive_flex, asymmetry, state.jerk.value())
+                continue
+
+            # FLEXED: accumulate during rep
+            state.add_frame(get("center_hip_y", 0.0),
+                            get(knee_key, 180.0),
+                            get(elbow_key, 180.0),
+                            get("torso_dev_frame", 0.0),
+                            avg_confidence,
+                            drive_flex, asymmetry, state.jerk.value())
+
+            # Rep ends when nearly straight again
+            if flex_amount < self.extended_threshold:
+                rep_summary = self._end_rep(state, limb_id, now)
+                if rep_summary is not None:
+                    completed_reps.append(rep_summary)
+
+        return completed_reps
+
+    def limb_flex(self, features: Dict[str, Any]) -> List[float]:
+        """
+        The flex update() holds against the thresholds on this frame, per limb
+        in self.limbs order: the more bent side for "global", a side's own flex
+        for "left" / "right", 0.0 while use_limb_delta gates that side off.
+        """
+        return [gated for _, gated in self._flex(features.get)[0]]
+
+    def _end_rep(self, state: SingleLimbState, limb_id: str, end_time: float):
+        """FLEXED → EXTENDED; the rep summary, or None for a too-short (noise) rep."""
+        state.state = EXTENDED
+        start_time = state.rep_start_time if state.rep_start_time is not None else end_time
+        duration = end_time - start_time
+
+        # Ignore ultra-short reps (noise)
+        if duration < self.min_rep_duration:
+            state.clear_rep()
+            state.last_rep_end_time = end_time
+            return None
+
+        # Valid rep
+        state.rep_id += 1
+
+        # A FLEXED rep always has at least its start frame, so the
+        # aggregates are never empty here
+        rep_summary = {
+            "rep_id": state.rep_id,
+            "limb_id": limb_id,
+            "duration_s": float(duration),
+            "hip_vertical_range": float(state.hip_y.max - state.hip_y.min),
+            "knee_min_angle": float(state.knee_angle.min),
+            "elbow_min_angle": float(state.elbow_angle.min),
+            "torso_max_lean_deg": float(state.torso_dev.max),
+            "left_right_asymmetry": float(state.asymmetry.mean()),
+            "movement_smoothness": movement_smoothness(
+                state.jerk_sq, duration, state.flex.max - state.flex.min
+            ),
+            "avg_confidence": float(state.confidence.mean()),
+            "exercise_hint": self.exercise_hint,
+        }
+
+        state.last_rep_end_time = end_time
+        state.clear_rep()
+        return rep_summary
+
+
+def compile_tracker(exercise_hint: Optional[str] = None,
+                    cfg: Optional[Dict[str, Any]] = None) -> ExerciseTracker:
+    """ExerciseTracker for an exercise (or an explicit config dict, e.g. a tuned copy)."""
+    return ExerciseTracker(cfg if cfg is not None else get_exercise_config(exercise_hint),
+                           exercise_hint)
+
+
+# exercise_hint → compiled tracker. The config is read once, at compile time:
+# after editing EXERCISE_CONFIG (threshold tuning) call clear_tracker_cache().
+_TRACKERS: Dict[Optional[str], ExerciseTracker] = {}
+
+
+def get_tracker(exercise_hint: Optional[str] = None) -> ExerciseTracker:
+    tracker = _TRACKERS.get(exercise_hint)
+    if tracker is None:
+        tracker = _TRACKERS[exercise_hint] = compile_tracker(exercise_hint)
+    return tracker
+
+
+def clear_tracker_cache() -> None:
+    """Drop the compiled trackers so the next frame recompiles from EXERCISE_CONFIG."""
+    _TRACKERS.clear()
+
+
 # -------------------------------------------------------------
 # Main update function
 # -------------------------------------------------------------
@@ -116,166 +553,315 @@ def update_multi_rep_state(
     multi_state: MultiRepState,
     features: Dict[str, Any],
     avg_confidence: float,
-    exercise_hint: Optional[str] = None
+    exercise_hint: Optional[str] = None,
+    timestamp: Optional[float] = None
 ) -> List[Dict[str, Any]]:
     """
     Generic multi-limb rep detection.
 
     - For exercises with limbs=["global"], we track a single state.
-    - For limbs=["left","right"], we *can* track separate states for each side
-      (useful for future alternating exercises if needed).
+    - For limbs=["left","right"] (lunges, mountain climbers) each side has its
+      own state and rep_id. With use_limb_delta a side only counts as bent while
+      its gate_joint is limb_activation_delta more bent than the other side's.
     - A rep is counted when state: EXTENDED -> FLEXED -> EXTENDED,
-      with min_rep_duration and min_rest_time checks.
+      Reps shorter than min_rep_duration are dropped, and after every rep
+      the limb waits min_rep_duration before it can start the next one.
+    - timestamp: when this frame was captured, in seconds, on any clock that
+      doesn't jump (capture time, video position, time.monotonic()). Rep
+      durations and cooldowns only use differences, so recorded sessions can
+      be replayed at any speed (see replay.py). Defaults to time.monotonic()
+      at the call.
+
+    The work is done by the exercise's compiled ExerciseTracker (get_tracker).
     """
-    now = time.time()
-    cfg = get_exercise_config(exercise_hint)
+    now = time.monotonic() if timestamp is None else timestamp
+    return get_tracker(exercise_hint).update(multi_state, features, avg_confidence, now)
+
+
+# -------------------------------------------------------------
+# Batch (whole-trace) segmentation
+# -------------------------------------------------------------
 
-    limbs = cfg["limbs"]
-    primary_joint = cfg["primary_joint"]
+# Per-frame feature keys the state machine reads, with the defaults
+# update_multi_rep_state uses when a key is missing
+FEATURE_DEFAULTS: Dict[str, float] = {
+    "left_knee_angle_frame": 180.0,
+    "right_knee_angle_frame": 180.0,
+    "left_elbow_angle_frame": 180.0,
+    "right_elbow_angle_frame": 180.0,
+    "left_hip_angle_frame": 180.0,
+    "right_hip_angle_frame": 180.0,
+    "knee_min_angle_frame": 180.0,
+    "elbow_min_angle_frame": 180.0,
+    "torso_dev_frame": 0.0,
+    "center_hip_y": 0.0,
+}
+
+
+def stack_features(frames: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """List of per-frame feature dicts → {key: (N,) float64 array} for segment_reps."""
+    return {
+        key: np.array([f.get(key, default) for f in frames], dtype=np.float64)
+        for key, default in FEATURE_DEFAULTS.items()
+    }
+
+
+def _limb_flex(cfg: Dict[str, Any], col):
+    """
+    Per-limb flex for every frame, same rules as ExerciseTracker.update:
+    ({limb: gated flex}, {limb: ungated driving flex}, |left - right| angle).
+    """
+    joint = "knee" if cfg["primary_joint"] == "knee" else "elbow"
+    gate_joint = cfg.get("gate_joint") or joint
+    left_angle = col(f"left_{joint}_angle_frame")
+    right_angle = col(f"right_{joint}_angle_frame")
+    left = 180.0 - left_angle
+    right = 180.0 - right_angle
+    # where(right > left, ...) picks exactly what the stream's conditional does
+    drive = {"left": left, "right": right, "global": np.where(right > left, right, left)}
+    flex = dict(drive)
+
+    if cfg["use_limb_delta"]:
+        delta = cfg["limb_activation_delta"]
+        left_gate = 180.0 - col(f"left_{gate_joint}_angle_frame")
+        right_gate = 180.0 - col(f"right_{gate_joint}_angle_frame")
+        flex["left"] = np.where(left_gate < right_gate + delta, 0.0, left)
+        flex["right"] = np.where(right_gate < left_gate + delta, 0.0, right)
+    return flex, drive, np.abs(left_angle - right_angle)
+
+
+def _jerk_weights(x: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """JerkMeter.push for every frame at once (same float ops, same order)."""
+    n = len(x)
+    out = np.zeros(n)
+    lag = JERK_LAG
+    if n < _JERK_SPAN:
+        return out
+    x0 = x[3 * lag:]
+    x1 = x[2 * lag:n - lag]
+    x2 = x[lag:n - 2 * lag]
+    x3 = x[:n - 3 * lag]
+    h = (t[3 * lag:] - t[:n - 3 * lag]) / (3 * lag)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step = lag * h
+        jerk = (x0 - 3.0 * x1 + 3.0 * x2 - x3) / (step * step * step)
+        out[3 * lag:] = np.where(h > 0.0, jerk * jerk * h, 0.0)
+    return out
+
+
+def _rises(mask: np.ndarray) -> List[int]:
+    """Indices where mask turns on (0 too if it starts on)."""
+    rises = np.flatnonzero(mask[1:] & ~mask[:-1]) + 1
+    if len(mask) and mask[0]:
+        rises = np.concatenate(([0], rises))
+    return rises.tolist()
+
+
+def _segment_limb(t: np.ndarray, flex: np.ndarray, cfg: Dict[str, Any]):
+    """
+    (starts, ends) frame-index arrays of every FLEXED span for one limb,
+    short ones included (they still restart the cooldown). t must be non-decreasing.
+
+    Leaving the cooldown aside, the spans follow from the threshold masks: a
+    frame bent past flexed_threshold starts a rep when the last frame before
+    it past either threshold was an extended one, and the rep ends on the next
+    extended frame. Those are array ops. If no start then falls inside the
+    previous rep's cooldown (the usual case) that is the answer; otherwise
+    _walk_spans carries on, one rep at a time, from the first clash.
+    """
     flexed_threshold = cfg["flexed_threshold"]
     extended_threshold = cfg["extended_threshold"]
     min_rep_duration = cfg["min_rep_duration"]
-    min_rest_time = cfg["min_rest_time"]
-    use_limb_delta = cfg["use_limb_delta"]
-    limb_activation_delta = cfg["limb_activation_delta"]
-
-    # Ensure limb states exist
-    for limb_id in limbs:
-        if limb_id not in multi_state.limb_states:
-            multi_state.limb_states[limb_id] = SingleLimbState()
-
-    # Extract angles & positions from features
-    left_knee_angle = features.get("left_knee_angle_frame", 180.0)
-    right_knee_angle = features.get("right_knee_angle_frame", 180.0)
-    left_elbow_angle = features.get("left_elbow_angle_frame", 180.0)
-    right_elbow_angle = features.get("right_elbow_angle_frame", 180.0)
-
-    knee_min_angle = features.get("knee_min_angle_frame", 180.0)
-    elbow_min_angle = features.get("elbow_min_angle_frame", 180.0)
-    torso_dev = features.get("torso_dev_frame", 0.0)
-    center_hip_y = features.get("center_hip_y", 0.0)
-
-    # Flex amounts: bigger = more bent
-    left_knee_flex = 180.0 - left_knee_angle
-    right_knee_flex = 180.0 - right_knee_angle
-    left_elbow_flex = 180.0 - left_elbow_angle
-    right_elbow_flex = 180.0 - right_elbow_angle
-
-    completed_reps: List[Dict[str, Any]] = []
-
-    def get_limb_joint_flex(limb: str):
-        if primary_joint == "knee":
-            if limb == "left":
-                return left_knee_angle, left_knee_flex
-            elif limb == "right":
-                return right_knee_angle, right_knee_flex
-            else:
-                # "global" → use the most bent knee as driver
-                return knee_min_angle, max(left_knee_flex, right_knee_flex)
+    up = flex > flexed_threshold
+    down = flex < extended_threshold
+    n = len(t)
+
+    keep = 0
+    starts = ends = np.empty(0, dtype=np.intp)
+    # Only when a frame can't be past both thresholds at once
+    if n and flexed_threshold >= extended_threshold:
+        last = np.maximum.accumulate(np.where(up | down, np.arange(n), -1))
+        before = np.empty(n, dtype=np.intp)
+        before[0] = -1
+        before[1:] = last[:-1]
+        extended = (before < 0) | down[before]      # before == -1 → EXTENDED from the start
+        starts = np.flatnonzero(up & extended)
+        down_at = np.flatnonzero(down)
+        k = np.searchsorted(down_at, starts, side="right")
+        closed = k < len(down_at)                   # only the last rep can stay open
+        starts, ends = starts[closed], down_at[k[closed]]
+        clash = np.flatnonzero(t[starts[1:]] - t[ends[:-1]] < min_rep_duration)
+        if not len(clash):
+            return starts, ends
+        keep = int(clash[0]) + 1
+    return _walk_spans(t, up, down, min_rep_duration, starts[:keep].tolist(), ends[:keep].tolist())
+
+
+def _walk_spans(t, up, down, min_rep_duration, starts, ends):
+    """
+    _segment_limb one rep at a time, after the reps already in starts / ends:
+    cooldown, next frame past flexed_threshold, next one under
+    extended_threshold, repeat. Only the frames where a threshold mask turns
+    on are pulled into Python, so it is O(reps log crossings), not O(frames).
+    """
+    up_rises, down_rises = _rises(up), _rises(down)
+    n = len(t)
+    # Plain lists: indexing numpy scalars one at a time costs more than the
+    # whole tolist() once the trace has a few hundred reps
+    times, up, down = t.tolist(), up.tolist(), down.tolist()
+
+    def after_cooldown(e):
+        # First frame with t - end_time >= min_rep_duration. bisect finds the
+        # spot; the while loops settle rounding with the exact test
+        end_time = times[e]
+        i = max(e + 1, bisect.bisect_left(times, end_time + min_rep_duration))
+        while i > e + 1 and times[i - 1] - end_time >= min_rep_duration:
+            i -= 1
+        while i < n and times[i] - end_time < min_rep_duration:
+            i += 1
+        return i
+
+    i = after_cooldown(ends[-1]) if ends else 0
+    while i < n:
+        # EXTENDED: first frame >= i bent past flexed_threshold
+        if up[i]:
+            s = i
         else:
-            if limb == "left":
-                return left_elbow_angle, left_elbow_flex
-            elif limb == "right":
-                return right_elbow_angle, right_elbow_flex
-            else:
-                # "global" → use the most bent elbow as driver
-                return elbow_min_angle, max(left_elbow_flex, right_elbow_flex)
-
-    for limb_id in limbs:
-        state = multi_state.limb_states[limb_id]
-        joint_angle, flex_amount = get_limb_joint_flex(limb_id)
-
-        # ---------- Limb activation gating (currently only useful if we use left/right) ----------
-        if use_limb_delta and limb_id in ("left", "right"):
-            # Compare with the other side (for future alternating exercises)
-            if limb_id == "left":
-                _, other_flex = get_limb_joint_flex("right")
-            else:
-                _, other_flex = get_limb_joint_flex("left")
-
-            # If THIS limb is not clearly more bent, treat it as almost straight
-            # so it can't cross flexed_threshold and start a rep.
-            if flex_amount < other_flex + limb_activation_delta:
-                flex_amount = 0.0  # effectively "not active" this frame
-
-        # -----------------------------
-        # State machine per limb
-        # -----------------------------
-        if state.state == "EXTENDED":
-            # Small cooldown after a rep
-            if state.last_rep_end_time is not None:
-                time_since_last = now - state.last_rep_end_time
-                if time_since_last < min_rep_duration:
-                    continue
+            k = bisect.bisect_left(up_rises, i)
+            if k == len(up_rises):
+                break
+            s = up_rises[k]
+        # FLEXED: the first later frame back under extended_threshold
+        if s + 1 < n and down[s + 1]:
+            e = s + 1
+        else:
+            k = bisect.bisect_left(down_rises, s + 1)
+            if k == len(down_rises):
+                break
+            e = down_rises[k]
 
-            # Start rep when we bend enough
-            if flex_amount > flexed_threshold:
-                state.state = "FLEXED"
-                state.rep_start_time = now
-
-                state.hip_positions = [center_hip_y]
-                state.knee_angles = [knee_min_angle]
-                state.elbow_angles = [elbow_min_angle]
-                state.torso_devs = [torso_dev]
-                state.confidences = [avg_confidence]
-
-        elif state.state == "FLEXED":
-            # Accumulate during rep
-            state.hip_positions.append(center_hip_y)
-            state.knee_angles.append(knee_min_angle)
-            state.elbow_angles.append(elbow_min_angle)
-            state.torso_devs.append(torso_dev)
-            state.confidences.append(avg_confidence)
+        starts.append(s)
+        ends.append(e)
+        i = after_cooldown(e)
+    return np.array(starts, dtype=np.intp), np.array(ends, dtype=np.intp)
+
+
+def _span_sums(values: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+               max_cells: int = 1 << 20) -> np.ndarray:
+    """
+    Sum of values[s:e+1] for each span, added strictly in frame order so it
+    matches the streaming running sums bit for bit (add.reduceat sums pairwise).
+    Spans are zero-padded into one (reps, longest) block and accumulated
+    along rows; very long holds fall back to one accumulate per span.
+    """
+    lengths = ends - starts + 1
+    longest = int(lengths.max())
+    if len(starts) * longest > max_cells:
+        return np.array([np.add.accumulate(values[s:e + 1])[-1]
+                         for s, e in zip(starts.tolist(), ends.tolist())])
+
+    offsets = np.arange(longest)
+    rows = starts[:, None] + offsets
+    inside = offsets < lengths[:, None]
+    block = np.where(inside, values[np.minimum(rows, len(values) - 1)], 0.0)
+    return np.add.accumulate(block, axis=1)[:, -1]
+
+
+def _span_extreme(reduce, values: np.ndarray, bounds: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Per-span min (reduce=np.fmin) or max (np.fmax) with RunningStats' NaN
+    behaviour: the span's first value seeds it, later NaNs lose every
+    comparison and are skipped, but a NaN first value is never replaced.
+    """
+    out = reduce.reduceat(values, bounds)[0::2]
+    first = values[starts]
+    return np.where(np.isnan(first), first, out)
 
-            # Rep ends when nearly straight again
-            if flex_amount < extended_threshold:
-                state.state = "EXTENDED"
-                end_time = now
-                start_time = state.rep_start_time or end_time
-                duration = end_time - start_time
-
-                # Ignore ultra-short reps (noise)
-                if duration < min_rep_duration:
-                    state.rep_start_time = None
-                    state.hip_positions.clear()
-                    state.knee_angles.clear()
-                    state.elbow_angles.clear()
-                    state.torso_devs.clear()
-                    state.confidences.clear()
-                    state.last_rep_end_time = end_time
-                    continue
 
-                # Valid rep
-                state.rep_id += 1
-
-                hip_vertical_range = 0.0
-                if state.hip_positions:
-                    hip_vertical_range = (
-                        max(state.hip_positions) - min(state.hip_positions)
-                    )
-
-                rep_summary = {
-                    "rep_id": state.rep_id,
-                    "limb_id": limb_id,
-                    "duration_s": float(duration),
-                    "hip_vertical_range": float(hip_vertical_range),
-                    "knee_min_angle": float(min(state.knee_angles)) if state.knee_angles else 180.0,
-                    "elbow_min_angle": float(min(state.elbow_angles)) if state.elbow_angles else 180.0,
-                    "torso_max_lean_deg": float(max(state.torso_devs)) if state.torso_devs else 0.0,
-                    "left_right_asymmetry": 0.0,
-                    "movement_smoothness": 0.8,
-                    "avg_confidence": float(np.mean(state.confidences)) if state.confidences else 0.0,
-                    "exercise_hint": exercise_hint,
-                }
-
-                state.last_rep_end_time = end_time
-                state.rep_start_time = None
-                state.hip_positions.clear()
-                state.knee_angles.clear()
-                state.elbow_angles.clear()
-                state.torso_devs.clear()
-                state.confidences.clear()
-
-                completed_reps.append(rep_summary)
-
-    return completed_reps
+def segment_reps(
+    features: Dict[str, np.ndarray],
+    avg_confidence: np.ndarray,
+    timestamps: np.ndarray,
+    exercise_hint: Optional[str] = None,
+    cfg: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Whole-trace version of update_multi_rep_state for recorded sessions.
+
+    features:       {key: (N,) array} with the per-frame feature keys
+                    (see FEATURE_DEFAULTS / stack_features); missing keys use
+                    the same defaults as the streaming code
+    avg_confidence: (N,) per-frame confidence
+    timestamps:     (N,) non-decreasing seconds
+    cfg:            explicit config (e.g. a user's thresholds swapped in),
+                    like compile_tracker; default is exercise_hint's
+
+    Returns the same rep summaries, in the same order, as calling
+    update_multi_rep_state on every frame from a fresh MultiRepState.
+    Threshold crossings are found with array ops; the only Python loop is
+    one iteration per rep.
+    """
+    if cfg is None:
+        cfg = get_exercise_config(exercise_hint)
+    t = np.asarray(timestamps, dtype=np.float64)
+    n = len(t)
+
+    def col(key):
+        if key in features:
+            return np.asarray(features[key], dtype=np.float64)
+        return np.full(n, FEATURE_DEFAULTS[key])
+
+    flex, drive, asymmetry = _limb_flex(cfg, col)
+    confidence = np.asarray(avg_confidence, dtype=np.float64)
+    hip_y = col("center_hip_y")
+    torso = col("torso_dev_frame")
+
+    keyed = []
+    for order, limb_id in enumerate(cfg["limbs"]):
+        knee_key, elbow_key = _LIMB_ANGLE_KEYS[limb_id]
+        knee, elbow = col(knee_key), col(elbow_key)
+        starts, ends = _segment_limb(t, flex[limb_id], cfg)
+        durations = t[ends] - t[starts]
+        valid = durations >= cfg["min_rep_duration"]
+        if not valid.any():
+            continue
+        starts, ends, durations = starts[valid], ends[valid], durations[valid]
+
+        # [s0, e0+1, s1, e1+1, ...] → reduceat's even outputs are the rep spans
+        bounds = np.empty(2 * len(starts), dtype=np.intp)
+        bounds[0::2] = starts
+        bounds[1::2] = ends + 1
+        if bounds[-1] == n:
+            bounds = bounds[:-1]
+        hip_range = (_span_extreme(np.fmax, hip_y, bounds, starts)
+                     - _span_extreme(np.fmin, hip_y, bounds, starts)).tolist()
+        knee_lo = _span_extreme(np.fmin, knee, bounds, starts).tolist()
+        elbow_lo = _span_extreme(np.fmin, elbow, bounds, starts).tolist()
+        torso_hi = _span_extreme(np.fmax, torso, bounds, starts).tolist()
+        lengths = ends - starts + 1
+        conf_mean = (_span_sums(confidence, starts, ends) / lengths).tolist()
+        asym_mean = (_span_sums(asymmetry, starts, ends) / lengths).tolist()
+        jerk_sq = _span_sums(_jerk_weights(drive[limb_id], t), starts, ends).tolist()
+        amplitude = (_span_extreme(np.fmax, drive[limb_id], bounds, starts)
+                     - _span_extreme(np.fmin, drive[limb_id], bounds, starts)).tolist()
+
+        for rep_index, (e, duration) in enumerate(zip(ends.tolist(), durations.tolist())):
+            rep_summary = {
+                "rep_id": rep_index + 1,
+                "limb_id": limb_id,
+                "duration_s": float(duration),
+                "hip_vertical_range": hip_range[rep_index],
+                "knee_min_angle": knee_lo[rep_index],
+                "elbow_min_angle": elbow_lo[rep_index],
+                "torso_max_lean_deg": torso_hi[rep_index],
+                "left_right_asymmetry": asym_mean[rep_index],
+                "movement_smoothness": movement_smoothness(
+                    jerk_sq[rep_index], duration, amplitude[rep_index]
+                ),
+                "avg_confidence": conf_mean[rep_index],
+                "exercise_hint": exercise_hint,
+            }
+            keyed.append((e, order, rep_summary))
+
+    keyed.sort(key=lambda item: (item[0], item[1]))
+    return [rep_summary for _, _, rep_summary in keyed]
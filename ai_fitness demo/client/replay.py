@@ -0,0 +1,239 @@
+# client/replay.py
+
+"""
+Faster-than-real-time replay of recorded sessions through the rep logic.
+
+A session is a feature trace: per-frame timestamps plus the features
+update_multi_rep_state reads. Traces come from
+  - .npz files written by FeatureRecorder (python rep_demo.py --record ...), or
+  - video files, via offline.py's landmark cache (pose runs once per video).
+
+A recording also keeps the exercise and, when the user was calibrated, the
+rep thresholds the live session counted with; replay uses them too.
+
+Replay feeds every frame to update_multi_rep_state with its *recorded*
+timestamp and never sleeps, so rep durations and counts are the live ones
+while a 10-minute session takes milliseconds.
+
+    python replay.py sessions/*.npz --exercise squat [--check]
+"""
+
+import sys
+import time
+import argparse
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+from rep_logic import (
+    MultiRepState,
+    compile_tracker,
+    get_exercise_config,
+    segment_reps,
+    stack_features,
+    FEATURE_DEFAULTS,
+)
+from calibration import user_config
+
+
+# ----------------- Recording -----------------
+
+# Per-user thresholds (see calibration.py) saved alongside the features
+THRESHOLD_KEYS = ("flexed_threshold", "extended_threshold")
+
+
+class FeatureRecorder:
+    """Collects (timestamp, features) for every tracked frame; save() writes a replayable .npz."""
+
+    def __init__(self):
+        self.timestamps: List[float] = []
+        self.frames: List[Dict[str, Any]] = []
+
+    def append(self, timestamp: float, features: Dict[str, Any]):
+        self.timestamps.append(float(timestamp))
+        self.frames.append(features)
+
+    def save(self, path: str, exercise: Optional[str] = None,
+             thresholds: Optional[Dict[str, Any]] = None):
+        """thresholds: the user's calibrated ones the session counted with (None → shared)."""
+        arrays = stack_features(self.frames)
+        arrays["confidence_frame"] = np.array(
+            [f.get("confidence_frame", 0.0) for f in self.frames], dtype=np.float64
+        )
+        if thresholds:
+            for key in THRESHOLD_KEYS:
+                arrays[key] = np.array(thresholds[key], dtype=np.float64)
+        np.savez(
+            path,
+            timestamps=np.array(self.timestamps, dtype=np.float64),
+            exercise=np.array(exercise or ""),
+            **arrays,
+        )
+
+
+# ----------------- Loading -----------------
+
+@dataclass
+class FeatureTrace:
+    timestamps: np.ndarray                  # (N,) seconds, non-decreasing
+    arrays: Dict[str, np.ndarray]           # FEATURE_DEFAULTS keys + "confidence_frame", each (N,)
+    exercise: Optional[str] = None
+    thresholds: Optional[Dict[str, float]] = None   # the user's, for `exercise`
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def duration_s(self) -> float:
+        return float(self.timestamps[-1] - self.timestamps[0]) if len(self) else 0.0
+
+    def frames(self):
+        """(timestamp, features dict) per frame, in the shape the live loop produces."""
+        keys = list(self.arrays)
+        columns = [self.arrays[k].tolist() for k in keys]
+        for t, values in zip(self.timestamps.tolist(), zip(*columns)):
+            yield t, dict(zip(keys, values))
+
+
+def load_feature_trace(path: str) -> FeatureTrace:
+    with np.load(path, allow_pickle=False) as data:
+        exercise = str(data["exercise"]) if "exercise" in data else ""
+        arrays = {key: data[key] for key in FEATURE_DEFAULTS if key in data}
+        arrays["confidence_frame"] = data["confidence_frame"]
+        thresholds = None
+        if all(key in data for key in THRESHOLD_KEYS):
+            thresholds = {key: float(data[key]) for key in THRESHOLD_KEYS}
+        return FeatureTrace(data["timestamps"], arrays, exercise or None, thresholds)
+
+
+def video_feature_trace(path: str, estimator_kwargs: Optional[Dict[str, Any]] = None,
+                        cache_dir: Optional[str] = None,
+                        exercise: Optional[str] = None) -> FeatureTrace:
+    """Feature trace of a video; landmarks come from (and go to) offline's cache."""
+    from offline import iter_cached_video_features, DEFAULT_CACHE_DIR
+
+    recorder = FeatureRecorder()
+    for _, ts, features, _ in iter_cached_video_features(path, estimator_kwargs,
+                                                         cache_dir or DEFAULT_CACHE_DIR):
+        if features is not None:
+            recorder.append(ts, features)
+
+    arrays = stack_features(recorder.frames)
+    arrays["confidence_frame"] = np.array(
+        [f["confidence_frame"] for f in recorder.frames], dtype=np.float64
+    )
+    return FeatureTrace(np.array(recorder.timestamps, dtype=np.float64), arrays, exercise)
+
+
+def load_session(path: str, cache_dir: Optional[str] = None,
+                 exercise: Optional[str] = None) -> FeatureTrace:
+    """
+    .npz recording or video file. Video frames are gated like the live
+    PoseEstimator for exercise (its primary_joint / min_confidence).
+    """
+    if path.endswith(".npz"):
+        return load_feature_trace(path)
+    cfg = get_exercise_config(exercise)
+    estimator_kwargs = {
+        "primary_joint": cfg["primary_joint"],
+        "min_confidence": cfg["min_confidence"],
+    }
+    return video_feature_trace(path, estimator_kwargs, cache_dir, exercise)
+
+
+def trace_config(trace: FeatureTrace, exercise: Optional[str] = None) -> Dict[str, Any]:
+    """Config the session counted with: the recorded user thresholds, if for this exercise."""
+    exercise = exercise or trace.exercise
+    thresholds = trace.thresholds if exercise == trace.exercise else None
+    return user_config(exercise, thresholds)
+
+
+# ----------------- Replay -----------------
+
+@dataclass
+class ReplayResult:
+    reps: List[Dict[str, Any]] = field(default_factory=list)
+    frames: int = 0
+    elapsed_s: float = 0.0
+    recorded_s: float = 0.0
+
+    @property
+    def speedup(self) -> float:
+        """How many times faster than real time the replay ran."""
+        return self.recorded_s / self.elapsed_s if self.elapsed_s > 0 else float("inf")
+
+
+def replay(trace: FeatureTrace, exercise: Optional[str] = None) -> ReplayResult:
+    """Push every frame of trace through the rep tracker, as fast as possible."""
+    exercise = exercise or trace.exercise
+    tracker = compile_tracker(exercise, trace_config(trace, exercise))
+    frames = list(trace.frames())
+
+    multi_state = MultiRepState()
+    reps: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    for t, features in frames:
+        reps += tracker.update(multi_state, features, features["confidence_frame"], t)
+    elapsed = time.perf_counter() - start
+    return ReplayResult(reps, len(frames), elapsed, trace.duration_s)
+
+
+def check_against_batch(trace: FeatureTrace, result: ReplayResult,
+                        exercise: Optional[str] = None) -> bool:
+    """True if the streaming replay and segment_reps agree on every summary."""
+    exercise = exercise or trace.exercise
+    batch = segment_reps(trace.arrays, trace.arrays["confidence_frame"], trace.timestamps,
+                         exercise, trace_config(trace, exercise))
+    return batch == result.reps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded sessions through the rep logic.")
+    parser.add_argument("sessions", nargs="+", help=".npz feature traces or video files")
+    parser.add_argument("--exercise", default=None,
+                        help="exercise config to use (default: the one saved in the trace)")
+    parser.add_argument("--cache", default=None, metavar="DIR",
+                        help="landmark cache dir for video sessions")
+    parser.add_argument("--check", action="store_true",
+                        help="also run segment_reps and verify identical summaries")
+    parser.add_argument("--verbose", action="store_true", help="print every rep summary")
+    args = parser.parse_args()
+
+    total_frames = 0
+    total_elapsed = 0.0
+    total_recorded = 0.0
+    mismatches = 0
+    for path in args.sessions:
+        trace = load_session(path, args.cache, args.exercise)
+        exercise = args.exercise or trace.exercise
+        if exercise is None:
+            print(f"{path}: no exercise saved in the trace, pass --exercise", file=sys.stderr)
+            continue
+
+        result = replay(trace, exercise)
+        total_frames += result.frames
+        total_elapsed += result.elapsed_s
+        total_recorded += result.recorded_s
+
+        line = (f"{path}: {exercise}, {len(result.reps)} reps, {result.frames} frames, "
+                f"{result.recorded_s:.1f}s recorded in {result.elapsed_s * 1000:.1f} ms "
+                f"({result.speedup:.0f}x real time)")
+        if trace.thresholds and exercise == trace.exercise:
+            line += (f" [user thresholds {trace.thresholds['flexed_threshold']:.0f}/"
+                     f"{trace.thresholds['extended_threshold']:.0f}]")
+        if args.check:
+            ok = check_against_batch(trace, result, exercise)
+            mismatches += not ok
+            line += " [batch: identical]" if ok else " [batch: MISMATCH]"
+        print(line)
+        if args.verbose:
+            for rep_summary in result.reps:
+                print("   ", rep_summary)
+
+    if total_elapsed > 0:
+        print(f"Total: {total_frames} frames, {total_recorded:.1f}s recorded in "
+              f"{total_elapsed:.2f}s → {total_frames / total_elapsed:.0f} frames/s, "
+              f"{total_recorded / total_elapsed:.0f}x real time")
+    if mismatches:
+        sys.exit(1)
@@ -0,0 +1,128 @@
+# client/stage_timer.py
+#
+# Low-overhead per-stage latency spans for the client pipeline.
+#
+#   timer = StageTimer()
+#   with timer.span("pose"):
+#       ...
+#   timer.summary()   # {stage: {p50_ms, p95_ms, p99_ms, ...}}
+#
+# NULL_TIMER has the same interface and does nothing, so instrumented code
+# pays one attribute lookup + an empty with-block when profiling is off.
+
+import csv
+import json
+from contextlib import nullcontext
+from time import perf_counter
+
+import numpy as np
+
+
+class RollingHistogram:
+    """Last `window` durations (ms) in a ring buffer; percentiles on demand."""
+
+    __slots__ = ("values", "count", "total")
+
+    def __init__(self, window=1000):
+        self.values = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, ms):
+        self.values[self.count % self.values.shape[0]] = ms
+        self.count += 1
+        self.total += ms
+
+    def percentiles(self, qs=(50, 95, 99)):
+        n = min(self.count, self.values.shape[0])
+        if n == 0:
+            return [0.0] * len(qs)
+        return np.percentile(self.values[:n], qs).tolist()
+
+
+class _Span:
+    """Reusable timing context for one stage (not thread-safe: one timer per thread)."""
+
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.add((perf_counter() - self.start) * 1000.0)
+        return False
+
+
+class StageTimer:
+    enabled = True
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.stages = {}        # name → RollingHistogram, in first-seen order
+        self._spans = {}
+
+    def span(self, name):
+        span = self._spans.get(name)
+        if span is None:
+            hist = self.stages[name] = RollingHistogram(self.window)
+            span = self._spans[name] = _Span(hist)
+        return span
+
+    def summary(self):
+        out = {}
+        for name, hist in self.stages.items():
+            p50, p95, p99 = hist.percentiles()
+            out[name] = {
+                "count": hist.count,
+                "mean_ms": round(hist.total / max(hist.count, 1), 3),
+                "p50_ms": round(p50, 3),
+                "p95_ms": round(p95, 3),
+                "p99_ms": round(p99, 3),
+            }
+        return out
+
+    def overlay_lines(self):
+        """One short text line per stage for the video overlay."""
+        return [
+            f"{name:<15} p50 {s['p50_ms']:6.2f}  p95 {s['p95_ms']:6.2f}  p99 {s['p99_ms']:6.2f} ms"
+            for name, s in self.summary().items()
+        ]
+
+    def dump(self, path):
+        """Write the summary to .json, or .csv for any other extension."""
+        summary = self.summary()
+        if str(path).endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=2)
+            return
+
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+            for name, s in summary.items():
+                writer.writerow([name, s["count"], s["mean_ms"], s["p50_ms"], s["p95_ms"], s["p99_ms"]])
+
+
+class NullTimer:
+    enabled = False
+    _span = nullcontext()
+
+    def span(self, name):
+        return self._span
+
+    def summary(self):
+        return {}
+
+    def overlay_lines(self):
+        return []
+
+    def dump(self, path):
+        pass
+
+
+NULL_TIMER = NullTimer()
@@ -0,0 +1,140 @@
+# client/synthetic.py
+
+"""
+Synthetic rep traces: a sin² flex curve per rep, turned into joint angles.
+
+  - synthetic_trace:    landmark time series (what the pose model would give),
+                        for benchmarks and the bootstrap exercise index
+  - synthetic_features: the per-frame features straight from the angles
+                        (no landmarks), for the backend's rep engine
+
+numpy only, so the backend's rep engine tests and benchmark import it from
+client/ as well (see backend/rep_engine.py).
+"""
+
+import numpy as np
+
+# exercise → (primary joint, peak flex in degrees, rep period s, rest between reps s)
+TRACE_PROFILES = {
+    "squat": ("knee", 95.0, 2.0, 0.8),
+    "pushup": ("elbow", 90.0, 1.6, 0.6),
+    "bicep_curl": ("elbow", 130.0, 2.5, 1.0),
+    "lunge": ("knee", 90.0, 2.2, 0.8),
+    "mountain_climber": ("knee", 100.0, 0.6, 0.0),
+}
+
+
+def trace_angles(exercise, n_reps=10, fps=30.0, peak=None, rest_flex=0.0, sway=0.0):
+    """
+    Noise-free (timestamps (N,), {name: (N,) array}) for n_reps of an exercise:
+    left/right_knee and left/right_elbow angles, left/right_hip_flex (degrees
+    the thigh swings forward) and hip_y (pixels).
+
+    Per-user variation: peak overrides the profile's peak flex, rest_flex is
+    how bent the joint stays between reps, sway the amplitude of a slow
+    1 Hz wobble around rest_flex between reps.
+    """
+    joint, profile_peak, period, rest = TRACE_PROFILES[exercise]
+    peak = profile_peak if peak is None else peak
+
+    cycle = period + rest
+    n_frames = int(round((n_reps * cycle + 1.0) * fps))
+    t = np.arange(n_frames) / fps
+    rep, phase = np.divmod(t - 0.5, cycle)
+    in_rep = (rep >= 0) & (rep < n_reps) & (phase < period)
+    flex = np.where(in_rep, rest_flex + (peak - rest_flex) * np.sin(np.pi * phase / period) ** 2,
+                    rest_flex + sway * np.sin(2.0 * np.pi * t) if sway else rest_flex)
+
+    # Mountain climbers and lunges alternate legs, everything else is symmetric
+    front_left = rep % 2 == 0
+    left = right = flex
+    left_hip = right_hip = np.zeros(n_frames)
+    if exercise == "mountain_climber":
+        left, right = np.where(front_left, flex, 0.0), np.where(front_left, 0.0, flex)
+    elif exercise == "lunge":
+        # both knees bend; only the front leg is flexed at the hip
+        left = np.where(front_left, flex, 0.9 * flex)
+        right = np.where(front_left, 0.9 * flex, flex)
+        left_hip = np.where(front_left, 0.9 * flex, 0.0)
+        right_hip = np.where(front_left, 0.0, 0.9 * flex)
+
+    if joint == "knee":
+        knees, elbows = (180.0 - left, 180.0 - right), (np.full(n_frames, 170.0),) * 2
+        hip_y = 400.0 + (0.8 * flex if exercise != "mountain_climber" else 0.0)
+    else:
+        knees, elbows = (np.full(n_frames, 178.0),) * 2, (180.0 - left, 180.0 - right)
+        hip_y = 400.0
+    return t, {
+        "left_knee": knees[0], "right_knee": knees[1],
+        "left_elbow": elbows[0], "right_elbow": elbows[1],
+        "left_hip_flex": left_hip, "right_hip_flex": right_hip,
+        "hip_y": np.broadcast_to(hip_y, (n_frames,)),
+    }
+
+
+def _pose_from_angles(out, left_knee, right_knee, left_elbow, right_elbow, hip_y=400.0,
+                      left_hip_flex=0.0, right_hip_flex=0.0):
+    """Fill a (33, 4) standing-figure landmark array with the given joint angles."""
+    out[:] = (640.0, 300.0, 0.0, 0.95)
+
+    def limb(root, mid, end, x, root_y, upper, lower, angle, swing=0.0):
+        # upper segment swung forward by `swing` degrees, lower one at `angle` to it
+        phi = np.radians(swing)
+        dx, dy = -np.sin(phi), np.cos(phi)
+        out[root, :2] = (x, root_y)
+        out[mid, :2] = (x + upper * dx, root_y + upper * dy)
+        theta = np.radians(angle)
+        c, s = np.cos(theta), np.sin(theta)
+        out[end, 0] = out[mid, 0] + lower * (-dx * c + dy * s)
+        out[end, 1] = out[mid, 1] + lower * (-dx * s - dy * c)
+
+    limb(23, 25, 27, 600.0, hip_y, 110.0, 110.0, left_knee, left_hip_flex)     # left leg
+    limb(24, 26, 28, 680.0, hip_y, 110.0, 110.0, right_knee, right_hip_flex)   # right leg
+    limb(11, 13, 15, 590.0, hip_y - 150.0, 80.0, 75.0, left_elbow)    # left arm
+    limb(12, 14, 16, 690.0, hip_y - 150.0, 80.0, 75.0, right_elbow)   # right arm
+
+
+def synthetic_trace(exercise, n_reps=10, fps=30.0, noise_px=0.8, seed=0,
+                    peak=None, rest_flex=0.0, sway=0.0):
+    """
+    Landmark time series for n_reps of an exercise (variation kwargs as trace_angles).
+    Returns (timestamps (N,), landmarks (N, 33, 4) float32, true_reps).
+    """
+    timestamps, a = trace_angles(exercise, n_reps, fps, peak, rest_flex, sway)
+    rng = np.random.default_rng(seed)
+    landmarks = np.empty((len(timestamps), 33, 4), dtype=np.float32)
+    columns = zip(*(a[k].tolist() for k in ("left_knee", "right_knee", "left_elbow", "right_elbow",
+                                            "hip_y", "left_hip_flex", "right_hip_flex")))
+    for out, angles in zip(landmarks, columns):
+        _pose_from_angles(out, *angles)
+
+    landmarks[..., :2] += rng.normal(0.0, noise_px, landmarks[..., :2].shape)
+    return timestamps, landmarks, n_reps
+
+
+def synthetic_features(exercise, n_reps=40, fps=30.0, noise_deg=1.5, seed=0):
+    """
+    (timestamps (N,), {feature key: (N,) array}) for n_reps of an exercise,
+    the rep_logic FEATURE_DEFAULTS keys generated straight from trace_angles
+    with noise_deg of angle noise (no pose model, no landmarks).
+    """
+    t, a = trace_angles(exercise, n_reps, fps)
+    rng = np.random.default_rng(seed)
+
+    def noisy(angle):
+        return angle + rng.normal(0.0, noise_deg, len(t))
+
+    knees = noisy(a["left_knee"]), noisy(a["right_knee"])
+    elbows = noisy(a["left_elbow"]), noisy(a["right_elbow"])
+    return t, {
+        "left_knee_angle_frame": knees[0],
+        "right_knee_angle_frame": knees[1],
+        "left_elbow_angle_frame": elbows[0],
+        "right_elbow_angle_frame": elbows[1],
+        "left_hip_angle_frame": noisy(180.0 - a["left_hip_flex"]),
+        "right_hip_angle_frame": noisy(180.0 - a["right_hip_flex"]),
+        "knee_min_angle_frame": np.minimum(*knees),
+        "elbow_min_angle_frame": np.minimum(*elbows),
+        "torso_dev_frame": np.abs(rng.normal(5.0, 2.0, len(t))),
+        "center_hip_y": noisy(a["hip_y"]),
+    }
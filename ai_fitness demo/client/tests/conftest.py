@@ -0,0 +1,46 @@
+# client/tests/conftest.py
+#
+# The client modules import each other by bare name (they're run from
+# client/, e.g. python rep_demo.py), so put client/ on the path for the tests.
+# Also the landmark-cache fixtures shared by the offline.py cache tests.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """A stand-in video file (only its bytes are hashed) and the pose frames for it."""
+    from synthetic import synthetic_trace
+
+    video = tmp_path / "session.avi"
+    video.write_bytes(b"not really a video " * 1000)
+    ts, landmarks, _ = synthetic_trace("squat", n_reps=2)
+    frames = [(i, float(t), None, None if i % 7 == 3 else landmarks[i])    # some frames: no pose
+              for i, t in enumerate(ts.tolist())]
+    return video, frames
+
+
+@pytest.fixture
+def counted(monkeypatch, recording):
+    """Count pose runs and full-file hashes; pose 'runs' by replaying recording."""
+    offline = pytest.importorskip("offline")
+    calls = {"pose": 0, "hash": 0}
+    _, frames = recording
+    video_content_hash = offline.video_content_hash
+
+    def fake_pose(path, workers=None, estimator_kwargs=None):
+        calls["pose"] += 1
+        yield from frames
+
+    def counting_hash(path, *args, **kwargs):
+        calls["hash"] += 1
+        return video_content_hash(path, *args, **kwargs)
+
+    monkeypatch.setattr(offline, "iter_video_features_parallel", fake_pose)
+    monkeypatch.setattr(offline, "video_content_hash", counting_hash)
+    return calls
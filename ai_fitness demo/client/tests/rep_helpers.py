@@ -0,0 +1,47 @@
+# client/tests/rep_helpers.py
+#
+# Shared by the rep-counting tests: synthetic feature traces, feeding them
+# through the per-frame tracker, and field-for-field summary comparison.
+
+import math
+
+import numpy as np
+
+import rep_logic
+from synthetic import synthetic_features
+
+
+def feature_trace(exercise, n_reps=12, seed=0):
+    """(timestamps, {feature key: (N,) array}, confidence) for n_reps of an exercise."""
+    ts, arrays = synthetic_features(exercise, n_reps=n_reps, seed=seed)
+    confidence = np.random.default_rng(seed).uniform(0.5, 1.0, len(ts))
+    return ts, arrays, confidence
+
+
+def stream_reps(ts, arrays, confidence, exercise, tracker=None):
+    """Reps from feeding every frame through update_multi_rep_state (or tracker.update)."""
+    columns = {key: values.tolist() for key, values in arrays.items()}
+    state = rep_logic.MultiRepState()
+    reps = []
+    for i, (t, c) in enumerate(zip(ts.tolist(), confidence.tolist())):
+        features = {key: column[i] for key, column in columns.items()}
+        if tracker is None:
+            reps += rep_logic.update_multi_rep_state(state, features, c, exercise, timestamp=t)
+        else:
+            reps += tracker.update(state, features, c, t)
+    return reps
+
+
+def assert_same_reps(got, expected, skip=()):
+    """Field-for-field equality, NaN matching NaN."""
+    assert len(got) == len(expected)
+    for k, (a, b) in enumerate(zip(got, expected)):
+        assert a.keys() == b.keys()
+        for key, value in a.items():
+            if key in skip:
+                continue
+            other = b[key]
+            if isinstance(value, float) and math.isnan(value):
+                assert isinstance(other, float) and math.isnan(other), f"rep {k} {key}: NaN vs {other}"
+            else:
+                assert value == other, f"rep {k} {key}: {value} vs {other}"
@@ -0,0 +1,31 @@
+# client/tests/test_cache_key.py
+
+"""
+The landmark cache key: frame gating (primary_joint, min_confidence) only
+filters cached landmarks, so it must not split the cache; model settings
+and the video's content must.
+"""
+
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+import offline
+
+
+def test_key_ignores_gating_and_follows_content(tmp_path, recording, counted):
+    video, _ = recording
+    cache_dir = str(tmp_path / "cache")
+    key, _ = offline.landmark_cache_key(video, {"primary_joint": "knee"}, cache_dir)
+    assert offline.landmark_cache_key(video, {"primary_joint": "elbow", "min_confidence": 0.9},
+                                      cache_dir)[0] == key
+    assert offline.landmark_cache_key(video, {"model_complexity": 2}, cache_dir)[0] != key
+
+    copy = tmp_path / "renamed.avi"
+    copy.write_bytes(video.read_bytes())
+    assert offline.landmark_cache_key(copy, None, cache_dir)[0] == key
+
+    video.write_bytes(b"a different recording")
+    assert offline.landmark_cache_key(video, None, cache_dir)[0] != key
+    assert counted["hash"] == 3      # first sight of each file + the modified one
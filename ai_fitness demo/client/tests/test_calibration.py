@@ -0,0 +1,34 @@
+# client/tests/test_calibration.py
+
+"""ThresholdCalibrator learns from the flex the exercise's tracker thresholds."""
+
+import pytest
+
+from calibration import CalibratedTracker, ThresholdCalibrator
+from rep_logic import compile_tracker
+from synthetic import synthetic_features
+
+
+def test_limb_flex_gates_the_idle_side():
+    # lunge: front (left) leg flexed at the hip, both knees bent
+    tracker = compile_tracker("lunge")
+    frame = {"left_knee_angle_frame": 90.0, "right_knee_angle_frame": 100.0,
+             "left_hip_angle_frame": 100.0, "right_hip_angle_frame": 178.0}
+    assert tracker.limb_flex(frame) == [90.0, 0.0]
+    assert compile_tracker("squat").limb_flex(frame) == [90.0]
+
+
+@pytest.mark.parametrize("exercise", ["squat", "lunge", "mountain_climber"])
+def test_calibration_watches_each_limb(exercise):
+    ts, arrays = synthetic_features(exercise, n_reps=12)
+    frames = [dict(zip(arrays, values)) for values in zip(*(v.tolist() for v in arrays.values()))]
+
+    calibrator = ThresholdCalibrator(exercise)
+    assert len(calibrator.detectors) == len(compile_tracker(exercise).limbs)
+    assert any(calibrator.push(f) for f in frames)
+
+    tracker = CalibratedTracker(exercise, user_id="test")
+    reps = [rep for t, f in zip(ts.tolist(), frames) for rep in tracker.update(f, 0.9, t)]
+    reps += tracker.finish()
+    assert not tracker.timed_out and tracker.thresholds is not None
+    assert len(reps) == 12
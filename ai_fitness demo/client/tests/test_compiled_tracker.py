@@ -0,0 +1,31 @@
+# client/tests/test_compiled_tracker.py
+
+"""Compiled ExerciseTracker: explicit-config trackers and the per-exercise cache."""
+
+import pytest
+
+from rep_logic import EXERCISE_CONFIG, clear_tracker_cache, compile_tracker
+from rep_helpers import feature_trace, stream_reps, assert_same_reps
+
+
+@pytest.mark.parametrize("exercise", sorted(EXERCISE_CONFIG))
+def test_explicit_config_tracker_matches_update_multi_rep_state(exercise):
+    ts, arrays, confidence = feature_trace(exercise)
+    expected = stream_reps(ts, arrays, confidence, exercise)
+    assert expected
+    tracker = compile_tracker(exercise, dict(EXERCISE_CONFIG[exercise]))
+    assert_same_reps(stream_reps(ts, arrays, confidence, exercise, tracker=tracker), expected)
+
+
+def test_config_edits_apply_after_clearing_the_cache(monkeypatch):
+    ts, arrays, confidence = feature_trace("squat", n_reps=3)
+    assert len(stream_reps(ts, arrays, confidence, "squat")) == 3
+
+    # the cached tracker keeps the thresholds it was compiled with
+    monkeypatch.setitem(EXERCISE_CONFIG["squat"], "flexed_threshold", 170.0)
+    assert len(stream_reps(ts, arrays, confidence, "squat")) == 3
+    clear_tracker_cache()
+    assert stream_reps(ts, arrays, confidence, "squat") == []
+    monkeypatch.undo()
+    clear_tracker_cache()
+    assert len(stream_reps(ts, arrays, confidence, "squat")) == 3
@@ -0,0 +1,52 @@
+# client/tests/test_multi_person.py
+
+"""Track bookkeeping in MultiPersonTracker: tracks that converge on one person collapse to one."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+from multi_person import MultiPersonTracker
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def _tracker(detections, **kwargs):
+    """Tracker fed scripted detections; every track 'finds' a pose and keeps its box."""
+    tracker = MultiPersonTracker("squat", workers=1, detect_every=1000, **kwargs)
+    tracker.detector.detect = lambda frame: detections
+    tracker._process_track = lambda track, frame: (None, object())
+    return tracker
+
+
+def test_converged_tracks_collapse_to_the_older_one():
+    tracker = _tracker([(100, 100, 300, 400), (110, 105, 305, 410)], duplicate_frames=5)
+    try:
+        for _ in range(4):
+            assert [p.track_id for p in tracker.process(FRAME)] == [1, 2]
+        tracker.process(FRAME)
+        assert list(tracker.tracks) == [1]
+    finally:
+        tracker.close()
+
+
+def test_separate_and_briefly_overlapping_tracks_are_kept():
+    tracker = _tracker([(0, 0, 200, 400), (300, 0, 500, 400)], duplicate_frames=3)
+    try:
+        for _ in range(10):
+            tracker.process(FRAME)
+        assert sorted(tracker.tracks) == [1, 2]
+
+        # the two boxes cross for two frames, then separate again
+        first, second = tracker.tracks[1], tracker.tracks[2]
+        for _ in range(2):
+            second.box = first.box
+            tracker.process(FRAME)
+        second.box = (300, 0, 500, 400)
+        for _ in range(5):
+            tracker.process(FRAME)
+        assert sorted(tracker.tracks) == [1, 2]
+    finally:
+        tracker.close()
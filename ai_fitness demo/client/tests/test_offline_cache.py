@@ -0,0 +1,42 @@
+# client/tests/test_offline_cache.py
+
+"""
+offline.py's landmark cache: what goes in comes back out, and a hit never
+runs pose or re-reads the video.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+import offline
+from pose_utils import NUM_LANDMARKS, confidence_landmarks, frame_features
+
+
+def test_round_trip(tmp_path, recording, counted):
+    video, frames = recording
+    cache_dir = str(tmp_path / "cache")
+    kwargs = {"primary_joint": "knee", "min_confidence": 0.3}
+
+    first = list(offline.iter_cached_video_features(video, kwargs, cache_dir))
+    assert counted == {"pose": 1, "hash": 1}
+    second = list(offline.iter_cached_video_features(video, kwargs, cache_dir))
+    assert counted == {"pose": 1, "hash": 1}     # hit: no pose, no re-hash
+
+    indices = confidence_landmarks("knee")
+    work = np.empty((NUM_LANDMARKS + 3, 2), dtype=np.float64)
+    assert len(first) == len(second) == len(frames)
+    for (i, t, _, landmarks), a, b in zip(frames, first, second):
+        assert a[:2] == b[:2] == (i, t)
+        if landmarks is None:
+            assert a[2:] == b[2:] == (None, None)
+            continue
+        np.testing.assert_array_equal(b[3], landmarks)
+        assert b[2] == a[2] == frame_features(landmarks, work, indices, 0.3)
+
+
+def test_load_cached_landmarks_miss(tmp_path, recording):
+    video, _ = recording
+    assert offline.load_cached_landmarks(video, cache_dir=str(tmp_path / "cache")) is None
@@ -0,0 +1,35 @@
+# client/tests/test_overlay.py
+
+"""SkeletonRenderer draws the same pixels as MediaPipe's draw_landmarks."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+mp = pytest.importorskip("mediapipe")
+
+from mediapipe.framework.formats import landmark_pb2
+
+from overlay import CONNECTION_SPEC, LANDMARK_SPEC, SkeletonRenderer
+from pose_utils import PoseEstimator
+
+
+# seeds 15 and 43 put a joint where cv2 clips its circle at the frame edge
+@pytest.mark.parametrize("seed", [0, 1, 15, 43])
+def test_skeleton_matches_draw_landmarks(seed):
+    h, w = 240, 320
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    # fractional pixel positions, some off the frame, some below the visibility cut-off
+    lm_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, vis in zip(rng.uniform(-0.1, 1.1, 33), rng.uniform(-0.1, 1.1, 33),
+                            rng.random(33), rng.random(33)):
+        lm_list.landmark.add(x=x, y=y, z=z, visibility=vis)
+
+    expected = frame.copy()
+    mp.solutions.drawing_utils.draw_landmarks(expected, lm_list, mp.solutions.pose.POSE_CONNECTIONS,
+                                              LANDMARK_SPEC, CONNECTION_SPEC)
+    # the pixel-space buffer the live loop hands the renderer
+    points = PoseEstimator()._fill_landmark_buffer(lm_list.landmark, w, h)
+    got = SkeletonRenderer().draw(frame.copy(), points)
+    np.testing.assert_array_equal(got, expected)
@@ -0,0 +1,78 @@
+# client/tests/test_segment_reps.py
+
+"""
+Whole-trace segment_reps against per-frame update_multi_rep_state (the
+reference), with the exercise's config or an explicit one.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from rep_logic import EXERCISE_CONFIG, compile_tracker, segment_reps
+from synthetic import TRACE_PROFILES
+from rep_helpers import feature_trace, stream_reps, assert_same_reps
+
+
+@pytest.mark.parametrize("exercise", sorted(TRACE_PROFILES))
+def test_segment_reps_matches_stream(exercise):
+    ts, arrays, confidence = feature_trace(exercise)
+    expected = stream_reps(ts, arrays, confidence, exercise)
+    assert len(expected) >= 12
+    assert_same_reps(segment_reps(arrays, confidence, ts, exercise), expected)
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_segment_reps_matches_stream_with_nan_dropouts(seed):
+    exercises = sorted(TRACE_PROFILES)
+    exercise = exercises[seed % len(exercises)]
+    ts, arrays, confidence = feature_trace(exercise, n_reps=8, seed=seed)
+    rng = np.random.default_rng(seed)
+    keys = sorted(arrays)
+    for _ in range(rng.integers(1, 8)):
+        start = rng.integers(len(ts))
+        arrays[keys[rng.integers(len(keys))]][start:start + rng.integers(1, 30)] = np.nan
+
+    expected = stream_reps(ts, arrays, confidence, exercise)
+    assert_same_reps(segment_reps(arrays, confidence, ts, exercise), expected)
+
+
+def test_segment_reps_keeps_nan_when_a_rep_starts_on_one():
+    # the stream seeds min/max with a rep's first value, so a NaN there sticks
+    ts, arrays, confidence = feature_trace("squat", n_reps=4)
+    arrays["center_hip_y"][:len(ts) // 2] = np.nan
+    arrays["torso_dev_frame"][len(ts) // 2:] = np.nan
+
+    expected = stream_reps(ts, arrays, confidence, "squat")
+    got = segment_reps(arrays, confidence, ts, "squat")
+    assert_same_reps(got, expected)
+    assert math.isnan(got[0]["hip_vertical_range"]) and not math.isnan(got[-1]["hip_vertical_range"])
+    assert math.isnan(got[-1]["torso_max_lean_deg"])
+
+
+@pytest.mark.parametrize("exercise", ["squat", "bicep_curl", "lunge", "mountain_climber"])
+def test_explicit_cfg_matches_compiled_tracker(exercise):
+    # e.g. a calibrated user's thresholds swapped into the exercise config
+    base = EXERCISE_CONFIG[exercise]
+    cfg = dict(base, flexed_threshold=0.6 * base["flexed_threshold"],
+               extended_threshold=0.5 * base["extended_threshold"])
+    ts, arrays, confidence = feature_trace(exercise)
+
+    expected = stream_reps(ts, arrays, confidence, exercise, tracker=compile_tracker(exercise, cfg))
+    assert expected
+    assert_same_reps(segment_reps(arrays, confidence, ts, exercise, cfg=cfg), expected)
+
+
+@pytest.mark.parametrize("exercise", ["squat", "bicep_curl"])
+@pytest.mark.parametrize("overrides", [
+    # low thresholds: long reps, short gaps, so the cooldown cuts into later reps
+    {"flexed_threshold": 10.0, "extended_threshold": 5.0, "min_rep_duration": 1.5},
+    {"flexed_threshold": 10.0, "extended_threshold": 30.0},  # thresholds overlap
+])
+def test_segment_reps_walks_when_masks_alone_dont_decide(exercise, overrides):
+    cfg = dict(EXERCISE_CONFIG[exercise], **overrides)
+    ts, arrays, confidence = feature_trace(exercise)
+    expected = stream_reps(ts, arrays, confidence, exercise, tracker=compile_tracker(exercise, cfg))
+    assert expected
+    assert_same_reps(segment_reps(arrays, confidence, ts, exercise, cfg=cfg), expected)